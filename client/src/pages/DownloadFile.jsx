@@ -1,5 +1,6 @@
 import { useState, useEffect, useRef } from "react";
 import { localPost } from "../services/api";
+import { LOCAL_API } from "../config/api";
 import { useNavigate } from "react-router-dom";
 
 export default function DownloadFile() {
@@ -35,7 +36,7 @@ const pqc = "/pqc"
           {
             id: result.id,
             filename: result.filename,
-            fileData: result.file_data,
+            downloadUrl: result.download_url,
             fileSize: result.file_size,
             encryptedAesKey: result.encrypted_aes_key,
             signature: result.signature,
@@ -59,23 +60,13 @@ const pqc = "/pqc"
 
     const triggerDownload = (file) => {
     try {
-      const binary = atob(file.fileData);
-      const bytes = new Uint8Array(binary.length);
-
-      for (let i = 0; i < binary.length; i++) {
-        bytes[i] = binary.charCodeAt(i);
-      }
-
-      const blob = new Blob([bytes], { type: "application/pdf" });
-      const url = URL.createObjectURL(blob);
-
+      // Streamed by the backend (Content-Disposition: attachment),
+      // so the browser writes it straight to disk
       const a = document.createElement("a");
-      a.href = url;
+      a.href = `${LOCAL_API}${file.downloadUrl}`;
       a.download = file.filename;
       document.body.appendChild(a);
       a.click();
-
-      URL.revokeObjectURL(url);
       document.body.removeChild(a);
 
       setTimeout(() => navigate("/filedownload"), 1500);
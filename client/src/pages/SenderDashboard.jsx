@@ -23,7 +23,8 @@ export default function SenderDashboard() {
     setError(null);
     
     try {
-      const res = await localPost(`${pqc}/sender/discover`);
+      // Answered at once if a receiver was already heard, else waits up to 10 s
+      const res = await localPost(`${pqc}/sender/discover`, { wait: 10 });
       
       if (!res.receiver_ip || !res.receiver_port) {
         throw new Error("Invalid receiver data: missing IP or port");
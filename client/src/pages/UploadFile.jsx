@@ -1,6 +1,6 @@
 import { useState } from "react";
 import { useNavigate } from "react-router-dom";
-import { localPost, peerPost } from "../services/api";
+import { localPost, localGet, peerPost } from "../services/api";
 import { PEER_API } from "../config/api";
 
 export default function UploadFile() {
@@ -23,6 +23,28 @@ export default function UploadFile() {
   
   const navigate = useNavigate();
 
+  // /pqc/encrypt queues a job; poll it until the result is ready.
+  // Jobs live in server memory: a restart (or expiry) loses them.
+  const JOB_POLL_INTERVAL = 500; // ms
+  const JOB_POLL_LIMIT = 10 * 60 * 1000; // ms
+
+  const encryptFile = async (formData) => {
+    const job = await localPost(pqc + "/encrypt", formData, true);
+    if (!job.job_id) throw new Error(job.error || "Encryption was not queued");
+
+    const deadline = Date.now() + JOB_POLL_LIMIT;
+    while (Date.now() < deadline) {
+      await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL));
+      const status = await localGet(job.status_url);
+      if (status.status === "DONE") return status.result;
+      if (status.status === "FAILED") throw new Error(status.error);
+      if (status.status !== "QUEUED" && status.status !== "RUNNING") {
+        throw new Error(status.error || "Encryption job was lost");
+      }
+    }
+    throw new Error("Encryption did not finish in time");
+  };
+
   const handleFileSelect = async (e) => {
     const file = e.target.files[0];
     
@@ -44,7 +66,7 @@ export default function UploadFile() {
         const formData = new FormData();
         formData.append("file", file);
         
-        const result = await localPost(pqc + "/encrypt", formData,true);
+        const result = await encryptFile(formData);
 
         setSelectedFile(file);
         setEncryptedFile(result.encrypted_file);
@@ -90,7 +112,7 @@ export default function UploadFile() {
         const formData = new FormData();
         formData.append("file", file);
         
-        const result = await localPost(pqc + "/encrypt", formData, true);
+        const result = await encryptFile(formData);
         
         setSelectedFile(file);
         setEncryptedFile(result.encrypted_file);
@@ -1,6 +1,12 @@
+import os
 from app import create_app
 
-app = create_app()
+# With the debug reloader, this file runs twice: in a watcher process
+# and in the child that serves requests (WERKZEUG_RUN_MAIN=true).
+# Only the serving process starts workers, listeners and the inbox.
+app = create_app(
+    start_services=__name__ != "__main__" or os.environ.get("WERKZEUG_RUN_MAIN") == "true"
+)
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5050, debug=True)
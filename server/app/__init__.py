@@ -1,8 +1,14 @@
+import multiprocessing
 from flask import Flask
 from flask_cors import CORS
 from .config import Config
 
-def create_app():
+def create_app(start_services: bool = True):
+    """
+    start_services=False builds the app without the process pool,
+    discovery listener or inbox recovery (e.g. in the debug reloader's
+    watcher process, which never serves requests).
+    """
     app = Flask(__name__)
     app.config["MAX_CONTENT_LENGTH"] = 50 * 1024 * 1024  # 50 MB
     app.config.from_object(Config)
@@ -17,6 +23,9 @@ def create_app():
     from app.routes.pqc_file_routes import file_pqc_bp
     from app.routes.pqc_handshake_routes import pqc_handshake_bp
     from app.routes.pqc_control_routes import pqc_control_bp
+    from app.routes.pqc_transfer_routes import pqc_transfer_bp
+    from app.routes.pqc_job_routes import pqc_job_bp
+    from app.routes.pqc_batch_routes import pqc_batch_bp
     
     app.register_blueprint(file_bp)
     app.register_blueprint(health_bp)
@@ -25,5 +34,29 @@ def create_app():
     app.register_blueprint(file_pqc_bp)
     app.register_blueprint(pqc_handshake_bp)
     app.register_blueprint(pqc_control_bp)
+    app.register_blueprint(pqc_transfer_bp)
+    app.register_blueprint(pqc_job_bp)
+    app.register_blueprint(pqc_batch_bp)
+
+    # PQC worker processes re-import the entry script (spawn); their
+    # name is set before that import runs, unlike parent_process()
+    if not start_services or multiprocessing.current_process().name != "MainProcess":
+        return app
+
+    # PQC worker processes (PQC_EXECUTION_MODE=process)
+    from app.services.pqc_process_service import start_process_pool
+    start_process_pool(app)
+
+    # Listen for receiver broadcasts from start-up
+    from app.services.discovery_service import start_discovery
+    start_discovery(app)
+
+    # Reload the receiver inboxes and recover files spooled before a crash
+    from app.extensions import app_state
+    from app.services.inbox_service import InboxStore
+
+    inbox_store = InboxStore(app.config["INBOX_DB_PATH"])
+    app_state.received_inbox.attach(inbox_store)
+    app_state.pqc_received_inbox.attach(inbox_store, app.config["DECRYPTED_FOLDER"])
 
     return app
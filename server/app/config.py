@@ -7,4 +7,93 @@ class Config:
     DECRYPTED_FOLDER = os.path.join(BASE_DIR,"..","decrypted_files")
     PQC_KEY_FOLDER = os.path.join(BASE_DIR, "..", "pqc_keys")
 
+    # Durable receiver inbox index (SQLite)
+    INBOX_DB_PATH = os.environ.get(
+        "INBOX_DB_PATH", os.path.join(BASE_DIR, "..", "inbox.sqlite3")
+    )
+
+    # Background listener for receiver broadcasts (/sender/discover);
+    # peers not heard from for PEER_DISCOVERY_TTL seconds are dropped
+    PEER_DISCOVERY_ENABLED = os.environ.get("PEER_DISCOVERY_ENABLED", "1") == "1"
+    PEER_DISCOVERY_TTL = float(os.environ.get("PEER_DISCOVERY_TTL", 15))
+
+    # HTTP port of peers, used for the handshake fallback when UDP is blocked
+    PEER_API_PORT = int(os.environ.get("PEER_API_PORT", 5050))
+
+    # Server-side directories /pqc/encrypt-directory may read
+    # (os.pathsep-separated); empty = multipart uploads only
+    SEND_DIRECTORY_ROOTS = [
+        root for root in os.environ.get("SEND_DIRECTORY_ROOTS", "").split(os.pathsep) if root
+    ]
+
     MAX_CONTENT_LENGTH = 50 * 1024 * 1024  # 20 MB
+
+    # PQC algorithms (must match the C helpers in services/PQC)
+    PQC_KEM_ALGORITHM = "Kyber512"
+    PQC_SIG_ALGORITHM = "ML-DSA-44"
+
+    # KEM / signature backends:
+    # "oqs" (in-process), "daemon" (pooled pqc_daemon workers),
+    # "subprocess" (one-shot C binaries) or "auto"
+    PQC_KEM_BACKEND = os.environ.get("PQC_KEM_BACKEND", "auto")
+    PQC_SIG_BACKEND = os.environ.get("PQC_SIG_BACKEND", "auto")
+    PQC_DAEMON_WORKERS = int(os.environ.get("PQC_DAEMON_WORKERS", 2))
+
+    # Plaintext bytes per AES-GCM chunk in encrypted containers
+    PQC_CHUNK_SIZE = int(os.environ.get("PQC_CHUNK_SIZE", 1024 * 1024))
+
+    # Threads sealing / opening chunks per file (1 = serial)
+    PQC_CRYPTO_WORKERS = int(os.environ.get("PQC_CRYPTO_WORKERS", 1))
+
+    # Where the encrypt / decrypt workflows run: "thread" (in the
+    # request / job thread) or "process" (PQC_PROCESS_WORKERS worker
+    # processes, started with the app, each holding the keys in memory)
+    PQC_EXECUTION_MODE = os.environ.get("PQC_EXECUTION_MODE", "thread")
+    PQC_PROCESS_WORKERS = int(os.environ.get("PQC_PROCESS_WORKERS", os.cpu_count() or 1))
+
+    # Session-level Kyber: one encapsulation per peer session, per-file
+    # AES keys derived with HKDF; rekey after this many files or bytes.
+    # Receivers handle both modes; per-file encapsulation stays the default.
+    PQC_KEM_SESSION = os.environ.get("PQC_KEM_SESSION", "0") == "1"
+    PQC_SESSION_MAX_FILES = int(os.environ.get("PQC_SESSION_MAX_FILES", 1000))
+    PQC_SESSION_MAX_BYTES = int(os.environ.get("PQC_SESSION_MAX_BYTES", 16 * 1024 ** 3))
+
+    # /pqc/encrypt-batch: files encrypted concurrently per request,
+    # and the most files accepted in one request
+    PQC_BATCH_WORKERS = int(os.environ.get("PQC_BATCH_WORKERS", 4))
+    PQC_BATCH_MAX_FILES = int(os.environ.get("PQC_BATCH_MAX_FILES", 256))
+
+    # Seconds a receiver keeps a verified batch manifest (/pqc/batch/open)
+    PQC_BATCH_TTL = int(os.environ.get("PQC_BATCH_TTL", 24 * 3600))
+
+    # Sign a Merkle root over per-chunk digests instead of one linear hash
+    PQC_MERKLE_MANIFEST = os.environ.get("PQC_MERKLE_MANIFEST", "0") == "1"
+    PQC_MERKLE_CHUNK_SIZE = int(os.environ.get("PQC_MERKLE_CHUNK_SIZE", 4 * 1024 * 1024))
+
+    # zlib stage before encryption: "auto" (sample the input and skip
+    # incompressible files), "always" or "off". Receivers of any mode
+    # decompress transparently; keep "off" while older peers exist.
+    PQC_COMPRESSION = os.environ.get("PQC_COMPRESSION", "off")
+    PQC_COMPRESSION_LEVEL = int(os.environ.get("PQC_COMPRESSION_LEVEL", 6))
+
+    # Sender → receiver transport: pooled keep-alive connections per
+    # receiver; read timeout = base + payload size / minimum rate
+    TRANSFER_POOL_SIZE = int(os.environ.get("TRANSFER_POOL_SIZE", 4))
+    TRANSFER_CONNECT_TIMEOUT = float(os.environ.get("TRANSFER_CONNECT_TIMEOUT", 5))
+    TRANSFER_BASE_TIMEOUT = float(os.environ.get("TRANSFER_BASE_TIMEOUT", 20))
+    TRANSFER_MIN_RATE = int(os.environ.get("TRANSFER_MIN_RATE", 1024 * 1024))  # bytes / s
+
+    # Background jobs for /pqc/encrypt: worker threads, pending jobs
+    # accepted before returning 503, seconds finished jobs are kept
+    PQC_JOB_WORKERS = int(os.environ.get("PQC_JOB_WORKERS", 2))
+    PQC_JOB_QUEUE_DEPTH = int(os.environ.get("PQC_JOB_QUEUE_DEPTH", 32))
+    PQC_JOB_RETENTION = int(os.environ.get("PQC_JOB_RETENTION", 3600))
+
+    # Resumable chunked transfers (/pqc/transfer/*), used by
+    # /pqc/send-file for files above TRANSFER_RESUMABLE_THRESHOLD
+    TRANSFER_RESUMABLE_THRESHOLD = int(os.environ.get("TRANSFER_RESUMABLE_THRESHOLD", 32 * 1024 * 1024))
+    TRANSFER_CHUNK_SIZE = int(os.environ.get("TRANSFER_CHUNK_SIZE", 4 * 1024 * 1024))
+    TRANSFER_PARALLEL_CHUNKS = int(os.environ.get("TRANSFER_PARALLEL_CHUNKS", 4))
+    TRANSFER_CHUNK_RETRIES = int(os.environ.get("TRANSFER_CHUNK_RETRIES", 4))
+    TRANSFER_MAX_FILE_SIZE = int(os.environ.get("TRANSFER_MAX_FILE_SIZE", 64 * 1024 ** 3))
+    TRANSFER_SESSION_TTL = int(os.environ.get("TRANSFER_SESSION_TTL", 24 * 3600))
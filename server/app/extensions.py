@@ -1,3 +1,6 @@
+from app.services.inbox_service import ReceivedInbox
+
+
 class AppState:
     role = "IDLE"   # IDLE | SENDER | RECEIVER
     receiver_ip = None
@@ -9,5 +12,9 @@ class AppState:
     discovery_thread = None
     accepting_files = False
 
+    # Received files: metadata only, payloads stay on disk
+    received_inbox = ReceivedInbox("legacy")
+    pqc_received_inbox = ReceivedInbox("pqc")
+
 
 app_state = AppState()
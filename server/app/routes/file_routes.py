@@ -1,11 +1,13 @@
 import uuid
 from flask import Blueprint, request, jsonify, current_app
-from app.services.file_service import save_uploaded_file
+from werkzeug.utils import secure_filename
+from app.services.file_service import save_uploaded_file, stream_file_response, send_stored_file
+from app.services.inbox_service import inbox_page
+from app.services.transport_service import post_file_to_receiver
 from app.services.encryption_service import aes_encrypt_file
 from app.extensions import app_state
 import os
 import requests
-import base64
 from cryptography.hazmat.primitives import serialization
 from app.services.workflow_service import decrypt_file_workflow
 from app.services.key_service import load_rsa_private_key
@@ -59,10 +61,14 @@ def encrypt_file():
 
     uploaded_file = request.files["file"]
 
-    # Save original file
+    # Save original file (unique, safe name: it also names the .enc
+    # file that /encrypted/<name> serves)
     upload_dir = current_app.config["UPLOAD_FOLDER"]
     os.makedirs(upload_dir, exist_ok=True)
-    input_path = os.path.join(upload_dir, uploaded_file.filename)
+    input_path = os.path.join(
+        upload_dir,
+        f"{uuid.uuid4().hex}_{secure_filename(uploaded_file.filename)}"
+    )
     uploaded_file.save(input_path)
 
     # Load sender signature private key
@@ -82,14 +88,15 @@ def encrypt_file():
     except Exception as e:
         print(f"Failed to delete original file: {e}")
 
-    # Read encrypted file and send as base64
-    with open(result["encrypted_file_path"], 'rb') as f:
-        encrypted_file_data = base64.b64encode(f.read()).decode('utf-8')
+    # Metadata + handle only; the .enc file is fetched from /encrypted/<name>
+    encrypted_file_name = os.path.basename(result["encrypted_file_path"])
 
     return jsonify({
         "message": "File encrypted successfully",
-        "encrypted_file": encrypted_file_data,
-        "encrypted_file_name": os.path.basename(result["encrypted_file_path"]),
+        "encrypted_file_name": encrypted_file_name,
+        "original_filename": uploaded_file.filename,
+        "encrypted_file_size": os.path.getsize(result["encrypted_file_path"]),
+        "download_url": f"/encrypted/{encrypted_file_name}",
         "aes_key": result["aes_key"].hex(),
         "encrypted_aes_key": result["encrypted_aes_key"].hex(),
         "receiver_public_key": app_state.peer_rsa_public_key.hex() if isinstance(app_state.peer_rsa_public_key, bytes) else str(app_state.peer_rsa_public_key),
@@ -103,6 +110,20 @@ def encrypt_file():
     })
 
 
+@file_bp.route("/encrypted/<encrypted_file_name>", methods=["GET"])
+def download_encrypted_file(encrypted_file_name):
+    """Streams a .enc file with Range and ETag support"""
+    response = stream_file_response(
+        current_app.config["ENCRYPTED_FOLDER"],
+        encrypted_file_name
+    )
+
+    if response is None:
+        return jsonify({"error": "Encrypted file not found"}), 404
+
+    return response
+
+
 @file_bp.route("/send-file", methods=["POST"])
 def send_file():
     """
@@ -136,28 +157,20 @@ def send_file():
     if not os.path.exists(encrypted_path):
         return jsonify({"error": "Encrypted file not found"}), 404
 
+    data = {
+        "encrypted_aes_key": encrypted_aes_key,  # already hex
+        "signature": signature,                  # already hex
+        "original_filename": original_filename
+    }
+
     try:
-        with open(encrypted_path, "rb") as f:
-            files = {
-                "file": (
-                    encrypted_file_name,
-                    f,
-                    "application/octet-stream"
-                )
-            }
-
-            data = {
-                "encrypted_aes_key": encrypted_aes_key,  # already hex
-                "signature": signature,                  # already hex
-                "original_filename": original_filename
-            }
-
-            response = requests.post(
-                f"{receiver_ip}/decrypt",
-                files=files,
-                data=data,
-                timeout=15
-            )
+        response, transfer = post_file_to_receiver(
+            f"{receiver_ip}/decrypt",
+            data,
+            "file",
+            encrypted_file_name,
+            encrypted_path
+        )
 
         # Forward receiver response to sender UI
         if response.status_code != 200:
@@ -169,7 +182,8 @@ def send_file():
 
         return jsonify({
             "message": "File sent successfully",
-            "receiver_response": response.json()
+            "receiver_response": response.json(),
+            "transfer": transfer
         }), 200
 
     except requests.exceptions.RequestException as e:
@@ -215,6 +229,8 @@ def decrypt_file():
     
     
 
+    file_id = str(uuid.uuid4())
+
     try: 
         decrypted_path = decrypt_file_workflow(
             encrypted_file_path=encrypted_path,
@@ -223,7 +239,8 @@ def decrypt_file():
             rsa_private_key=rsa_private_key,
             signer_public_key=sender_signature_public_key,
             decrypted_output_dir=current_app.config["DECRYPTED_FOLDER"],
-            original_filename = original_filename
+            # Unique on-disk name; original_filename is kept in the inbox
+            original_filename = f"{file_id}_{secure_filename(original_filename)}"
         )
 
         os.remove(encrypted_path)
@@ -232,35 +249,20 @@ def decrypt_file():
         print(str(e))
         return jsonify({"error": str(e)}), 400
 
-    # (Optional UI demo)
-    with open(decrypted_path, "rb") as f:
-        decrypted_file_data = base64.b64encode(f.read()).decode("utf-8")
-
-    file_size = os.path.getsize(decrypted_path)
-
-    file_id = str(uuid.uuid4())
-    app_state.received_files_queue = getattr(
-        app_state, "received_files_queue", []
-    )
     # sender_public_key_pem = sender_signature_public_key.public_bytes(
     #     encoding=serialization.Encoding.PEM,
     #     format=serialization.PublicFormat.SubjectPublicKeyInfo
     # ).decode("utf-8")
 
-    rsa_private_key_pem = rsa_private_key.private_bytes(
-        encoding=serialization.Encoding.PEM,
-        format=serialization.PrivateFormat.PKCS8,
-        encryption_algorithm=serialization.NoEncryption()
-    ).decode("utf-8")
-    app_state.received_files_queue.append({
+    # Queue metadata only; the payload is streamed from /inbox/<id>
+    app_state.received_inbox.add({
         "id": file_id,
         "filename": original_filename,
         "encrypted_aes_key": encrypted_aes_key,
         "signature": signature,
+        "sender": request.remote_addr,
         "sender_public_key": sender_signature_public_key,
-        "rsa_private_key": rsa_private_key_pem,
-        "decrypted_file": decrypted_file_data,
-        "file_size": file_size,
+        "file_size": os.path.getsize(decrypted_path),
         "path": decrypted_path,
         "status": "READY"
     })
@@ -272,31 +274,56 @@ def decrypt_file():
 
 @file_bp.route("/next-file", methods=["POST"])
 def next_file():
-    """Get next file from queue and delete from backend"""
+    """Get next file's metadata and download handle"""
     if app_state.role != "RECEIVER":
         return jsonify({"error": "Not in receiver mode"}), 403
 
-    if not hasattr(app_state, 'received_files_queue') or not app_state.received_files_queue:
+    file_entry = app_state.received_inbox.next_file()
+    if file_entry is None:
         return jsonify({"message": "No files available"}), 204  # No Content
 
-    # Get first file from queue
-    file_entry = app_state.received_files_queue.pop(0)
-    
-    # Delete file from disk
-    try:
-        if os.path.exists(file_entry["path"]):
-            os.remove(file_entry["path"])
-    except Exception as e:
-        print(f"Failed to delete file from disk: {e}")
-    
-    # Return entire file data
     return jsonify({
         "id": file_entry["id"],
         "filename": file_entry["filename"],
-        "file_data": file_entry["decrypted_file"],
+        "download_url": f"/inbox/{file_entry['id']}",
         "file_size": file_entry["file_size"],
          "encrypted_aes_key": file_entry["encrypted_aes_key"],
         "signature": file_entry["signature"],
         "sender_public_key": file_entry["sender_public_key"],
-        "rsa_private_key": file_entry["rsa_private_key"]
+        # Private key is not stored in the (persisted) inbox entry
+        "rsa_private_key": load_rsa_private_key().private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption()
+        ).decode("utf-8")
     }), 200
+
+
+@file_bp.route("/inbox", methods=["GET"])
+def list_received_files():
+    """Pages through the inbox (?sender=&status=&limit=&offset=)"""
+    try:
+        page = inbox_page(app_state.received_inbox, request.args, "/inbox")
+    except ValueError:
+        return jsonify({"error": "limit and offset must be integers"}), 400
+
+    return jsonify(page), 200
+
+
+@file_bp.route("/inbox/<file_id>", methods=["GET"])
+def download_received_file(file_id):
+    """Streams a decrypted file; removed from the inbox once fully downloaded"""
+    file_entry = app_state.received_inbox.get(file_id)
+    if file_entry is None:
+        return jsonify({"error": "File not found"}), 404
+
+    response = send_stored_file(
+        file_entry["path"],
+        file_entry["filename"],
+        on_complete=lambda: app_state.received_inbox.remove(file_id)
+    )
+    if response is None:
+        app_state.received_inbox.remove(file_id)
+        return jsonify({"error": "File not found"}), 404
+
+    return response
@@ -1,32 +1,21 @@
 from flask import Blueprint, request, jsonify, current_app
-from app.utils.network_utils import get_local_ip, listen_for_acknowledgment, send_acknowledgment, broadcast_receiver, listen_for_receiver, listen_for_handshake, send_handshake, BroadcastState
+from app.utils.network_utils import get_local_ip, listen_for_acknowledgment, send_acknowledgment, broadcast_receiver, listen_for_handshake, send_handshake, handshake_fallback_url, BroadcastState
 import threading
 from app.extensions import app_state
 from app.services.key_service import load_rsa_public_key, load_signature_public_key
+from app.services.discovery_service import discover_response
 
 handshake_bp = Blueprint("handshake", __name__)
 
+
 @handshake_bp.route("/sender/discover", methods=["POST"])
 def discover_receiver():
     print(app_state.role , "is the current role")
     if app_state.role != "SENDER":
         return jsonify({"error": "Not in sender mode"}), 403
 
-    ip, port, name = listen_for_receiver()
-
-    if not ip:
-        return jsonify({"error": "No receiver found"}), 404
-    print(f"Discovered receiver at {ip}:{port} with name {name}")
-    app_state.receiver_ip = ip
-    app_state.receiver_port = port
-    app_state.receiver_name = name
-
-    return jsonify({
-        "message": "Receiver discovered",
-        "receiver_ip": ip,
-        "receiver_port": port,
-        "receiver_name": name,
-    })
+    body, code = discover_response(request.get_json(silent=True) or {})
+    return jsonify(body), code
 
 @handshake_bp.route("/receiver/start", methods=["POST"])
 def start_receiver():
@@ -125,6 +114,7 @@ def receiver_acknowledge():
         receiver_ip, 
         receiver_port, 
         receiver_name,
+        fallback_url=handshake_fallback_url(sender_ip, current_app.config["PEER_API_PORT"])
     )
 
     if success:
@@ -156,34 +146,36 @@ def sender_handshake():
     sender_rsa_public_key = load_rsa_public_key()
     sender_signature_public_key = load_signature_public_key()
 
+    # Listen before sending: the acknowledgment may follow immediately
+    ack_state = BroadcastState()
+    app_state.ack_state = ack_state
+
+    ack_thread = threading.Thread(
+        target=listen_for_acknowledgment,
+        args=(sender_port, ack_state),
+        daemon=True
+    )
+    ack_thread.start()
+    app_state.ack_thread = ack_thread
+
     # Send handshake with public keys
     success = send_handshake(
         receiver_ip, 
         receiver_port, 
         sender_ip, 
         sender_port, 
-        sender_name
+        sender_name,
+        fallback_url=handshake_fallback_url(receiver_ip, current_app.config["PEER_API_PORT"])
     )
 
     if success:
-        # Start listening for acknowledgment
-        ack_state = BroadcastState()
-        app_state.ack_state = ack_state
-        
-        ack_thread = threading.Thread(
-            target=listen_for_acknowledgment,
-            args=(sender_port, ack_state),
-            daemon=True
-        )
-        ack_thread.start()
-        app_state.ack_thread = ack_thread
-
         return jsonify({
             "message": "Handshake sent, waiting for acknowledgment",
             "sender_ip": sender_ip,
             "sender_port": sender_port
         })
     else:
+        ack_state.should_stop = True
         return jsonify({"error": "Failed to send handshake"}), 500
 
 
@@ -0,0 +1,316 @@
+import os
+import json
+import uuid
+import base64
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
+from werkzeug.utils import secure_filename
+
+from app.routes.pqc_file_routes import encrypt_upload
+from app.services.pqc_workflow_service import pqc_sign_batch
+from app.services.job_service import get_job_queue, QueueFullError
+from app.services.file_service import manifest_sidecar_path, key_context_sidecar_path
+from app.services.batch_service import (
+    batches,
+    received_batch_dir,
+    save_sender_batch
+)
+
+# ------------------------------------------------------
+# Blueprint
+# ------------------------------------------------------
+pqc_batch_bp = Blueprint("pqc_batch", __name__)
+
+
+# ======================================================
+# SENDER: Encrypt many uploads in one request
+# ======================================================
+
+# Stages reported by the batch job
+PQC_BATCH_STAGES = ("encrypt", "sign")
+
+SIGNING_MODES = ("batch", "file")
+
+
+def _discard_upload(input_path: str):
+    try:
+        os.remove(input_path)
+    except OSError:
+        pass
+
+
+def _discard_encrypted(result: dict):
+    """Removes an unsigned .enc file and its sidecars"""
+    encrypted_path = result["encrypted_file_path"]
+    for path in (encrypted_path, manifest_sidecar_path(encrypted_path), key_context_sidecar_path(encrypted_path)):
+        _discard_upload(path)
+
+
+def _sign_batch(app, results: dict):
+    """
+    Signs the encrypted files in results ({index: workflow result})
+    as one batch, in upload order, and saves the batch for /pqc/send-file.
+
+    Returns:
+        (manifest, signature, ordered results)
+    """
+    ordered = [results[index] for index in sorted(results)]
+    with app.app_context():
+        manifest, signature = pqc_sign_batch(ordered)
+    save_sender_batch(
+        app.config["ENCRYPTED_FOLDER"],
+        manifest,
+        signature,
+        [result["encrypted_file_path"] for result in ordered]
+    )
+    return manifest, signature, ordered
+
+
+def iter_pqc_encrypt_batch(uploads: list, signing: str = "batch"):
+    """
+    uploads: [(saved input path, original filename)]
+
+    Encrypts the uploads concurrently (at most PQC_BATCH_WORKERS at a
+    time) and yields one item per file as it finishes:
+        {"type": "file", "index", ...the /pqc/encrypt result body}
+        {"type": "error", "index", "original_filename", "error"}
+
+    signing "batch": files are not signed one by one; a final
+        {"type": "batch", "batch_id", "signature", "files"}
+    item carries the one signature over the batch manifest, which
+    /pqc/send-file finds through each file's sidecar.
+    signing "file": every file carries its own signature.
+    """
+    app = current_app._get_current_object()
+    sign_each = signing == "file"
+    results = {}
+
+    def encrypt_one(index):
+        input_path, original_filename = uploads[index]
+        with app.app_context():
+            return encrypt_upload(input_path, original_filename, sign=sign_each)
+
+    workers = max(1, min(app.config["PQC_BATCH_WORKERS"], len(uploads)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(encrypt_one, index): index for index in range(len(uploads))}
+        try:
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    result, body = future.result()
+                except Exception as e:
+                    print(f"Batch file {uploads[index][1]} failed: {e}")
+                    yield {
+                        "type": "error",
+                        "index": index,
+                        "original_filename": uploads[index][1],
+                        "error": str(e)
+                    }
+                    continue
+                results[index] = result
+                yield dict(body, type="file", index=index)
+        except GeneratorExit:
+            # Client went away: skip (and drop) uploads not started yet
+            for future, index in futures.items():
+                if future.cancel():
+                    _discard_upload(uploads[index][0])
+
+            if not sign_each:
+                # Files already encrypted must not stay unsigned (and
+                # unsendable): wait for the running ones, sign them all
+                for future, index in futures.items():
+                    if future.cancelled() or index in results:
+                        continue
+                    try:
+                        results[index] = future.result()[0]
+                    except Exception as e:
+                        print(f"Batch file {uploads[index][1]} failed: {e}")
+
+                if results:
+                    try:
+                        manifest, _, _ = _sign_batch(app, results)
+                        print(f"Batch {manifest['batch_id']} signed after the client disconnected")
+                    except Exception as e:
+                        print(f"Could not sign interrupted batch, removing its files: {e}")
+                        for result in results.values():
+                            _discard_encrypted(result)
+            raise
+
+    if sign_each or not results:
+        return
+
+    # One signature over every encrypted file, in upload order
+    manifest, signature, ordered = _sign_batch(app, results)
+
+    yield {
+        "type": "batch",
+        "batch_id": manifest["batch_id"],
+        "signature": base64.b64encode(signature).decode("utf-8"),
+        "files": len(ordered)
+    }
+
+
+def run_pqc_encrypt_batch(uploads: list, signing: str = "batch", on_item=None) -> dict:
+    """
+    Runs iter_pqc_encrypt_batch to the end (on_item(item) sees each
+    item as it arrives) and returns the combined result: files in
+    upload order, errors, and batch_id / signature in batch mode.
+    """
+    files = []
+    errors = []
+    batch = None
+
+    for item in iter_pqc_encrypt_batch(uploads, signing):
+        if on_item is not None:
+            on_item(item)
+        if item["type"] == "file":
+            files.append(item)
+        elif item["type"] == "error":
+            errors.append(item)
+        else:
+            batch = item
+
+    files.sort(key=lambda item: item["index"])
+    if batch is not None:
+        for batch_index, body in enumerate(files):
+            body.update(
+                signature=batch["signature"],
+                batch_id=batch["batch_id"],
+                batch_index=batch_index
+            )
+
+    result = {
+        "message": f"{len(files)} of {len(uploads)} files encrypted",
+        "signing": signing,
+        "files": files,
+        "errors": errors
+    }
+    if batch is not None:
+        result.update(batch_id=batch["batch_id"], signature=batch["signature"])
+    return result
+
+
+def _encrypt_batch_job(job, uploads, signing):
+    job.set_stage("encrypt")
+
+    def on_item(item):
+        if item["type"] == "batch":
+            job.set_stage("sign")
+        else:
+            job.add_item(item)
+
+    return run_pqc_encrypt_batch(uploads, signing, on_item)
+
+
+@pqc_batch_bp.route("/pqc/encrypt-batch", methods=["POST"])
+def pqc_encrypt_batch():
+    """
+    Multipart upload of many files (field "files", repeated).
+    Form / query "signing": "batch" (default, one signature for the
+    whole batch) or "file".
+
+    Default: queues one job (202 + job id); its status lists each
+    file's result as it completes.
+    ?stream=1: streams the items of iter_pqc_encrypt_batch as NDJSON,
+    one line per file as it finishes.
+    """
+    uploaded_files = request.files.getlist("files") or request.files.getlist("file")
+    if not uploaded_files:
+        return jsonify({"error": "No files uploaded"}), 400
+    if len(uploaded_files) > current_app.config["PQC_BATCH_MAX_FILES"]:
+        return jsonify({
+            "error": f"At most {current_app.config['PQC_BATCH_MAX_FILES']} files per batch"
+        }), 413
+
+    signing = (request.values.get("signing") or "batch").lower()
+    if signing not in SIGNING_MODES:
+        return jsonify({"error": "signing must be 'batch' or 'file'"}), 400
+
+    # Save every upload first (unique names), then hand the paths over
+    upload_dir = current_app.config["UPLOAD_FOLDER"]
+    os.makedirs(upload_dir, exist_ok=True)
+    uploads = []
+    for uploaded_file in uploaded_files:
+        input_path = os.path.join(
+            upload_dir,
+            f"{uuid.uuid4().hex}_{secure_filename(uploaded_file.filename)}"
+        )
+        uploaded_file.save(input_path)
+        uploads.append((input_path, uploaded_file.filename))
+
+    if request.args.get("stream", "").lower() in ("1", "true"):
+        def stream():
+            for item in iter_pqc_encrypt_batch(uploads, signing):
+                yield json.dumps(item) + "\n"
+
+        return Response(
+            stream_with_context(stream()),
+            mimetype="application/x-ndjson",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+
+    try:
+        job = get_job_queue(current_app._get_current_object()).submit(
+            "encrypt-batch", PQC_BATCH_STAGES, _encrypt_batch_job,
+            uploads, signing
+        )
+    except QueueFullError as e:
+        for input_path, _ in uploads:
+            _discard_upload(input_path)
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "5"}
+
+    return jsonify({
+        "message": f"Batch of {len(uploads)} files queued",
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/pqc/jobs/{job.id}",
+        "result_url": f"/pqc/jobs/{job.id}/result",
+        "events_url": f"/pqc/jobs/{job.id}/events"
+    }), 202
+
+
+# ======================================================
+# RECEIVER: Verify a batch manifest (once per batch)
+# ======================================================
+@pqc_batch_bp.route("/pqc/batch/open", methods=["POST"])
+def pqc_batch_open():
+    """
+    Body: {manifest, signature}. Verifies the Dilithium signature over
+    the manifest; files of the batch then reference it by batch_id +
+    batch_index instead of being verified one by one.
+    """
+    data = request.get_json()
+    if not data or not data.get("manifest") or not data.get("signature"):
+        return jsonify({"error": "Missing manifest or signature"}), 400
+
+    try:
+        signature = base64.b64decode(data["signature"])
+    except Exception:
+        return jsonify({"error": "Invalid Base64 encoding"}), 400
+
+    directory = received_batch_dir()
+    batches.expire(directory, current_app.config["PQC_BATCH_TTL"])
+
+    try:
+        batch = batches.open(directory, data["manifest"], signature)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({
+        "message": "Batch verified",
+        "batch_id": batch["manifest"]["batch_id"],
+        "files": len(batch["manifest"]["files"])
+    }), 200
+
+
+@pqc_batch_bp.route("/pqc/batch/<batch_id>", methods=["GET"])
+def pqc_batch_status(batch_id):
+    batch = batches.get(received_batch_dir(), batch_id)
+    if batch is None:
+        return jsonify({"error": "Unknown batch"}), 404
+
+    return jsonify({
+        "batch_id": batch_id,
+        "files": len(batch["manifest"]["files"]),
+        "created_at": batch["manifest"].get("created_at")
+    }), 200
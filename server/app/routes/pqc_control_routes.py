@@ -2,6 +2,8 @@ import os
 import subprocess
 from flask import Blueprint, request, jsonify, current_app
 from app.extensions import app_state
+from app.services.keystore_service import keystore, peer_key_cache
+from app.services.pqc_session_service import sender_sessions, receiver_sessions
 
 pqc_control_bp = Blueprint("pqc_control", __name__)
 
@@ -228,7 +230,13 @@ def pqc_verify_keys():
         "all_required_present": (
             (app_state.role == "SENDER" and keys_status["dilithium_public_key"]) or
             (app_state.role == "RECEIVER" and keys_status["kyber_public_key"])
-        ) if hasattr(app_state, 'role') else False
+        ) if hasattr(app_state, 'role') else False,
+        "keystore": keystore.stats(),
+        "peer_key_cache": peer_key_cache.stats(),
+        "kem_sessions": {
+            "sender": sender_sessions.stats(),
+            "receiver": receiver_sessions.stats()
+        }
     }), 200
 
 
@@ -246,6 +254,11 @@ def pqc_reset_role():
         app_state.role = None
     else:
         old_role = None
+
+    # Drop cached key material; next request reloads from disk
+    keystore.clear()
+    sender_sessions.reset()
+    receiver_sessions.clear()
     
     if clear_keys:
         try:
@@ -1,14 +1,55 @@
 import os
+import json
 import uuid
 import base64
+import shutil
 import requests
 from flask import Blueprint, request, jsonify, current_app
+from werkzeug.utils import secure_filename
 from app.extensions import app_state
 
 # PQC workflow services
 from app.services.pqc_workflow_service import (
     pqc_encrypt_file_workflow,
-    pqc_decrypt_file_workflow
+    PQC_ENCRYPT_STAGES
+)
+from app.services.pqc_process_service import (
+    run_encrypt_workflow,
+    run_decrypt_workflow
+)
+from app.services.job_service import get_job_queue, QueueFullError
+
+from app.services.crypto_service import new_file_hasher
+from app.services.file_service import (
+    stream_upload_to_spool,
+    save_manifest_sidecar,
+    load_manifest_sidecar,
+    save_key_context_sidecar,
+    load_key_context_sidecar,
+    stream_file_response,
+    send_stored_file,
+    send_directory_archive
+)
+from app.services.inbox_service import inbox_page
+from app.services.archive_service import (
+    collect_directory_entries,
+    TarStreamReader,
+    payload_size
+)
+from app.services.pqc_session_service import validate_key_context
+from app.services.transport_service import (
+    post_file_to_receiver,
+    send_file_resumable,
+    open_batch_on_receiver,
+    forget_batch_on_receiver,
+    receiver_lost_batch,
+    TransferError
+)
+from app.services.batch_service import (
+    batches,
+    received_batch_dir,
+    load_sender_batch,
+    UNKNOWN_BATCH_ERROR
 )
 
 # Key storage helpers (used during handshake elsewhere)
@@ -25,8 +66,73 @@ file_pqc_bp = Blueprint("file_pqc", __name__)
 # ======================================================
 # SENDER: Encrypt file using PQC
 # ======================================================
+def run_pqc_encrypt(input_path: str, original_filename: str, progress=None) -> dict:
+    """Encrypts a saved upload and returns the /pqc/encrypt result body"""
+    return encrypt_upload(input_path, original_filename, progress)[1]
+
+
+def encrypt_upload(input_path: str, original_filename: str, progress=None, sign: bool = True):
+    """
+    Runs the encryption workflow on a saved upload, deletes the
+    upload and stores the sidecars next to the .enc file.
+
+    Returns:
+        (workflow result, /pqc/encrypt result body)
+    """
+    try:
+        # Full PQC encryption workflow
+        result = run_encrypt_workflow(input_path, progress=progress, sign=sign)
+    finally:
+        # Delete original file after encryption
+        try:
+            os.remove(input_path)
+        except Exception as e:
+            print(f"Failed to delete original file: {e}")
+
+    return result, store_encrypt_result(result, original_filename)
+
+
+def store_encrypt_result(result: dict, original_filename: str) -> dict:
+    """Saves the sidecars for /pqc/send-file and returns the /pqc/encrypt result body"""
+    # Keep the Merkle manifest next to the .enc file for /pqc/send-file
+    if result["manifest"] is not None:
+        save_manifest_sidecar(result["encrypted_file_path"], result["manifest"])
+
+    # Session mode: the receiver needs the key context to derive the file key
+    if result["key_context"] is not None:
+        save_key_context_sidecar(result["encrypted_file_path"], result["key_context"])
+
+    # Metadata + handle only; the .enc file is fetched from /pqc/encrypted/<name>
+    encrypted_file_name = os.path.basename(result["encrypted_file_path"])
+
+    return {
+        "message": "File encrypted using PQC",
+        "encrypted_file_name": encrypted_file_name,
+        "encrypted_file_size": os.path.getsize(result["encrypted_file_path"]),
+        "compressed": result["compressed"],
+        "kem_session": result["key_context"] is not None,
+        "download_url": f"/pqc/encrypted/{encrypted_file_name}",
+        "kyber_ciphertext": base64.b64encode(
+            result["kyber_ciphertext"]
+        ).decode("utf-8"),
+        # None until the batch is signed (sign=False)
+        "signature": base64.b64encode(
+            result["signature"]
+        ).decode("utf-8") if result["signature"] is not None else None,
+        "original_filename": original_filename
+    }
+
+
+def _encrypt_job(job, input_path, original_filename):
+    return run_pqc_encrypt(input_path, original_filename, job.set_stage)
+
+
 @file_pqc_bp.route("/pqc/encrypt", methods=["POST"])
 def pqc_encrypt_file():
+    """
+    Saves the upload and queues the encryption job (202 + job id).
+    ?wait=1 runs it in the request instead and returns the result.
+    """
     # if app_state.role != "SENDER":
     #     return jsonify({"error": "Not in sender mode"}), 403
     
@@ -36,38 +142,176 @@ def pqc_encrypt_file():
     uploaded_file = request.files["file"]
     upload_dir = current_app.config["UPLOAD_FOLDER"]
     os.makedirs(upload_dir, exist_ok=True)
-    input_path = os.path.join(upload_dir, uploaded_file.filename)
+    # Unique name so concurrent uploads of the same file never collide
+    input_path = os.path.join(
+        upload_dir,
+        f"{uuid.uuid4().hex}_{secure_filename(uploaded_file.filename)}"
+    )
     uploaded_file.save(input_path)
 
-    try:
-        # Full PQC encryption workflow
-        result = pqc_encrypt_file_workflow(input_path)
-    except Exception as e:
-        print(f"Error during PQC encryption: {e}")
-        return jsonify({"error": str(e)}), 500
+    if request.args.get("wait", "").lower() in ("1", "true"):
+        try:
+            return jsonify(run_pqc_encrypt(input_path, uploaded_file.filename)), 200
+        except Exception as e:
+            print(f"Error during PQC encryption: {e}")
+            return jsonify({"error": str(e)}), 500
 
-    # Delete original file after encryption
     try:
+        job = get_job_queue(current_app._get_current_object()).submit(
+            "encrypt", PQC_ENCRYPT_STAGES, _encrypt_job,
+            input_path, uploaded_file.filename
+        )
+    except QueueFullError as e:
         os.remove(input_path)
-    except Exception as e:
-        print(f"Failed to delete original file: {e}")
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "5"}
+
+    return jsonify({
+        "message": "Encryption queued",
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/pqc/jobs/{job.id}",
+        "result_url": f"/pqc/jobs/{job.id}/result",
+        "events_url": f"/pqc/jobs/{job.id}/events"
+    }), 202
+
+
+# ======================================================
+# SENDER: Encrypt a whole directory (streamed tar)
+# ======================================================
+def run_pqc_encrypt_directory(directory: str, archive_name: str, staged: bool = False,
+                              progress=None) -> dict:
+    """
+    Archives `directory` as a tar stream built on the fly and feeds
+    it straight into the chunk sealer: no tarball is ever written.
+    staged: the directory holds uploaded files and is removed after.
+    """
+    try:
+        source = TarStreamReader(collect_directory_entries(directory))
+        # Names the .enc file only; nothing is written at this path
+        name_path = os.path.join(
+            current_app.config["UPLOAD_FOLDER"],
+            f"{uuid.uuid4().hex}_{secure_filename(archive_name) or 'archive'}.tar"
+        )
+        result = pqc_encrypt_file_workflow(name_path, progress=progress, source=source)
+    finally:
+        if staged:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    body = store_encrypt_result(result, archive_name)
+    body.update(
+        message="Directory encrypted using PQC",
+        archive={"files": source.files, "bytes": source.size}
+    )
+    return body
+
+
+def _encrypt_directory_job(job, directory, archive_name, staged):
+    return run_pqc_encrypt_directory(directory, archive_name, staged, job.set_stage)
+
+
+def _stage_directory_upload(uploaded_files) -> str:
+    """
+    Saves a multipart collection (filenames are relative paths, as
+    sent for a folder picker) into a fresh staging directory.
+    """
+    staging_dir = os.path.join(current_app.config["UPLOAD_FOLDER"], uuid.uuid4().hex)
+    os.makedirs(staging_dir)
+
+    for uploaded_file in uploaded_files:
+        parts = [
+            secure_filename(part)
+            for part in uploaded_file.filename.replace("\\", "/").split("/")
+        ]
+        parts = [part for part in parts if part]
+        if not parts:
+            continue
+        path = os.path.join(staging_dir, *parts)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        uploaded_file.save(path)
+
+    return staging_dir
+
+
+def _directory_allowed(path: str) -> bool:
+    real = os.path.realpath(path)
+    for root in current_app.config["SEND_DIRECTORY_ROOTS"]:
+        root = os.path.realpath(root)
+        if os.path.commonpath([root, real]) == root:
+            return True
+    return False
+
+
+@file_pqc_bp.route("/pqc/encrypt-directory", methods=["POST"])
+def pqc_encrypt_directory():
+    """
+    Encrypts a directory as one archive, either
+    - JSON {"path": ..., "name": optional} for a server-side directory
+      below one of SEND_DIRECTORY_ROOTS, or
+    - multipart "files" whose filenames are relative paths (+ "name").
+    Queues a job like /pqc/encrypt; ?wait=1 runs it in the request.
+    The receiver unpacks the archive into a directory as it decrypts.
+    """
+    data = request.get_json(silent=True)
+
+    if data and data.get("path"):
+        directory = data["path"]
+        if not _directory_allowed(directory):
+            return jsonify({"error": "Directory is outside SEND_DIRECTORY_ROOTS"}), 403
+        if not os.path.isdir(directory):
+            return jsonify({"error": "Directory not found"}), 404
+        archive_name = data.get("name") or os.path.basename(os.path.normpath(directory))
+        staged = False
+    else:
+        uploaded_files = request.files.getlist("files")
+        if not uploaded_files:
+            return jsonify({"error": "Directory path or files missing"}), 400
+        first = uploaded_files[0].filename.replace("\\", "/").split("/")
+        archive_name = request.form.get("name") or (first[0] if len(first) > 1 else "archive")
+        directory = _stage_directory_upload(uploaded_files)
+        staged = True
+
+    if request.args.get("wait", "").lower() in ("1", "true"):
+        try:
+            return jsonify(run_pqc_encrypt_directory(directory, archive_name, staged)), 200
+        except Exception as e:
+            print(f"Error during PQC directory encryption: {e}")
+            return jsonify({"error": str(e)}), 500
 
-    # Read encrypted file → base64
-    with open(result["encrypted_file_path"], "rb") as f:
-        encrypted_b64 = base64.b64encode(f.read()).decode("utf-8")
+    try:
+        job = get_job_queue(current_app._get_current_object()).submit(
+            "encrypt-directory", PQC_ENCRYPT_STAGES, _encrypt_directory_job,
+            directory, archive_name, staged
+        )
+    except QueueFullError as e:
+        if staged:
+            shutil.rmtree(directory, ignore_errors=True)
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "5"}
 
     return jsonify({
-        "message": "File encrypted using PQC",
-        "encrypted_file": encrypted_b64,
-        "encrypted_file_name": os.path.basename(result["encrypted_file_path"]),
-        "kyber_ciphertext": base64.b64encode(
-            result["kyber_ciphertext"]
-        ).decode("utf-8"),
-        "signature": base64.b64encode(
-            result["signature"]
-        ).decode("utf-8"),
-        "original_filename": uploaded_file.filename
-    }), 200
+        "message": "Directory encryption queued",
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/pqc/jobs/{job.id}",
+        "result_url": f"/pqc/jobs/{job.id}/result",
+        "events_url": f"/pqc/jobs/{job.id}/events"
+    }), 202
+
+
+# ======================================================
+# SENDER: Download encrypted file (streamed)
+# ======================================================
+@file_pqc_bp.route("/pqc/encrypted/<encrypted_file_name>", methods=["GET"])
+def pqc_download_encrypted_file(encrypted_file_name):
+    """Streams a .enc file with Range and ETag support"""
+    response = stream_file_response(
+        current_app.config["ENCRYPTED_FOLDER"],
+        encrypted_file_name
+    )
+
+    if response is None:
+        return jsonify({"error": "Encrypted file not found"}), 404
+
+    return response
 
 
 # ======================================================
@@ -110,27 +354,91 @@ def pqc_send_file():
     if not os.path.exists(encrypted_path):
         return jsonify({"error": "Encrypted file not found"}), 404
 
+    form_data = {
+        "signature": signature,
+        "kyber_ciphertext": kyber_ciphertext,
+        "original_filename": original_filename
+    }
+
+    manifest_json = load_manifest_sidecar(encrypted_path)
+    if manifest_json is not None:
+        form_data["manifest"] = manifest_json
+
+    key_context_json = load_key_context_sidecar(encrypted_path)
+    if key_context_json is not None:
+        form_data["key_context"] = key_context_json
+
+    # Batch files: the receiver verifies the batch signature once,
+    # then only matches this file's digest against the manifest
+    batch, batch_index = load_sender_batch(current_app.config["ENCRYPTED_FOLDER"], encrypted_path)
+    if batch is not None:
+        try:
+            open_batch_on_receiver(receiver_api, batch)
+        except (TransferError, requests.exceptions.RequestException) as e:
+            return jsonify({"error": "Failed to open batch on receiver", "details": str(e)}), 502
+        form_data["batch_id"] = batch["manifest"]["batch_id"]
+        form_data["batch_index"] = batch_index
+
+    def reopen_batch():
+        # The receiver expired or lost the batch (e.g. restarted): send
+        # the manifest again so the caller can retry the file once
+        print(f"Receiver no longer holds batch {form_data['batch_id']}, reopening")
+        forget_batch_on_receiver(receiver_api, form_data["batch_id"])
+        open_batch_on_receiver(receiver_api, batch)
+
+    # Large files (or on request): resumable chunked transfer
+    if data.get("resumable") or os.path.getsize(encrypted_path) > current_app.config["TRANSFER_RESUMABLE_THRESHOLD"]:
+        if manifest_json is not None:
+            form_data["manifest"] = json.loads(manifest_json)
+        if key_context_json is not None:
+            form_data["key_context"] = json.loads(key_context_json)
+
+        try:
+            try:
+                status, transfer = send_file_resumable(receiver_api, form_data, encrypted_path)
+            except TransferError as e:
+                if batch is None or not receiver_lost_batch(e.status_code, str(e)):
+                    raise
+                reopen_batch()
+                status, transfer = send_file_resumable(receiver_api, form_data, encrypted_path)
+        except (TransferError, requests.exceptions.RequestException) as e:
+            return jsonify({
+                "error": "Transfer interrupted; send again to resume",
+                "details": str(e)
+            }), 502
+
+        if status["status"] != "COMPLETE":
+            return jsonify({
+                "error": "Receiver failed to decrypt",
+                "receiver_response": status
+            }), 500
+
+        return jsonify({
+            "message": "File sent successfully",
+            "receiver_response": {
+                "message": "File decrypted and stored",
+                "file_id": status["file_id"]
+            },
+            "transfer": transfer
+        }), 200
+
     try:
-        with open(encrypted_path, "rb") as f:
-            files = {
-                "file": (
-                    encrypted_file_name,
-                    f,
-                    "application/octet-stream"
-                )
-            }
-            
-            form_data = {
-                "signature": signature,
-                "kyber_ciphertext": kyber_ciphertext,
-                "original_filename": original_filename
-            }
-
-            response = requests.post(
+        response, transfer = post_file_to_receiver(
+            f"{receiver_api}/pqc/decrypt",
+            form_data,
+            "file",
+            encrypted_file_name,
+            encrypted_path
+        )
+
+        if batch is not None and receiver_lost_batch(response.status_code, _reply_error(response)):
+            reopen_batch()
+            response, transfer = post_file_to_receiver(
                 f"{receiver_api}/pqc/decrypt",
-                files=files,
-                data=form_data,
-                timeout=20
+                form_data,
+                "file",
+                encrypted_file_name,
+                encrypted_path
             )
 
         # Forward receiver response to sender UI
@@ -143,9 +451,12 @@ def pqc_send_file():
 
         return jsonify({
             "message": "File sent successfully",
-            "receiver_response": response.json()
+            "receiver_response": response.json(),
+            "transfer": transfer
         }), 200
 
+    except TransferError as e:
+        return jsonify({"error": "Failed to open batch on receiver", "details": str(e)}), 502
     except requests.exceptions.RequestException as e:
         return jsonify({
             "error": "Failed to contact receiver",
@@ -153,6 +464,15 @@ def pqc_send_file():
         }), 500
 
 
+def _reply_error(response):
+    """The "error" field of a receiver's JSON reply, if any"""
+    try:
+        body = response.json()
+    except ValueError:
+        return None
+    return body.get("error") if isinstance(body, dict) else None
+
+
 # ======================================================
 # RECEIVER: Decrypt file using PQC
 # ======================================================
@@ -161,17 +481,41 @@ def pqc_decrypt_file():
     # if app_state.role != "RECEIVER":
     #     return jsonify({"error": "Not in receiver mode"}), 403
     
-    if "file" not in request.files:
+    # Stream the encrypted upload straight to its spool file,
+    # hashing the ciphertext on the way (no full read into memory)
+    encrypted_dir = current_app.config["ENCRYPTED_FOLDER"]
+    os.makedirs(encrypted_dir, exist_ok=True)
+    encrypted_path = os.path.join(
+        encrypted_dir,
+        f"recv_{uuid.uuid4().hex}.enc"
+    )
+
+    hasher = new_file_hasher()
+    form, files, spool = stream_upload_to_spool(
+        request.environ,
+        encrypted_path,
+        hasher,
+        current_app.config["MAX_CONTENT_LENGTH"]
+    )
+    if spool is not None:
+        spool.close()
+
+    def discard_spool():
+        if os.path.exists(encrypted_path):
+            os.remove(encrypted_path)
+
+    if "file" not in files:
+        discard_spool()
         return jsonify({"error": "Encrypted file missing"}), 400
 
-    encrypted_file = request.files["file"]
-    signature_b64 = request.form.get("signature")
-    kyber_ct_b64 = request.form.get("kyber_ciphertext")
-    original_filename = request.form.get(
+    signature_b64 = form.get("signature")
+    kyber_ct_b64 = form.get("kyber_ciphertext")
+    original_filename = form.get(
         "original_filename", "received_file"
     )
 
     if not signature_b64 or not kyber_ct_b64:
+        discard_spool()
         return jsonify({"error": "Missing signature or Kyber ciphertext"}), 400
 
     # Decode Base64 inputs
@@ -179,33 +523,57 @@ def pqc_decrypt_file():
         signature = base64.b64decode(signature_b64)
         kyber_ct = base64.b64decode(kyber_ct_b64)
     except Exception:
+        discard_spool()
         return jsonify({"error": "Invalid Base64 encoding"}), 400
 
-    # Save encrypted file exactly as received
-    encrypted_dir = current_app.config["ENCRYPTED_FOLDER"]
-    os.makedirs(encrypted_dir, exist_ok=True)
-    encrypted_path = os.path.join(
-        encrypted_dir,
-        f"recv_{uuid.uuid4().hex}.enc"
-    )
-    
-    encrypted_file.stream.seek(0)
-    with open(encrypted_path, "wb") as f:
-        f.write(encrypted_file.read())
-
-    # Store Kyber ciphertext for decapsulation
-    kyber_ct_path = os.path.join(
-        current_app.config["PQC_KEY_FOLDER"],
-        "kyber_ct.bin"
-    )
-    with open(kyber_ct_path, "wb") as f:
-        f.write(kyber_ct)
+    # Optional Merkle manifest (signature covers its root)
+    manifest = None
+    if form.get("manifest"):
+        try:
+            manifest = json.loads(form["manifest"])
+        except ValueError:
+            discard_spool()
+            return jsonify({"error": "Invalid manifest"}), 400
+
+    # Session mode: per-file key context for the session Kyber ciphertext
+    key_context = None
+    if form.get("key_context"):
+        try:
+            key_context = validate_key_context(json.loads(form["key_context"]))
+        except ValueError as e:
+            discard_spool()
+            return jsonify({"error": f"Invalid key context: {e}"}), 400
+
+    # Batch mode: the batch signature was verified at /pqc/batch/open
+    batch_entry = None
+    if form.get("batch_id"):
+        try:
+            batch_index = int(form.get("batch_index", ""))
+        except ValueError:
+            discard_spool()
+            return jsonify({"error": "batch_index must be an integer"}), 400
+        batch_entry = batches.entry(received_batch_dir(), form["batch_id"], batch_index)
+        if batch_entry is None:
+            discard_spool()
+            return jsonify({"error": UNKNOWN_BATCH_ERROR}), 404
+
+    # Finish hash: encrypted file + Kyber ciphertext
+    hasher.update(kyber_ct)
+    file_hash = hasher.digest()
+
+    file_id = str(uuid.uuid4())
 
     try:
-        decrypted_path = pqc_decrypt_file_workflow(
+        decrypted_path = run_decrypt_workflow(
             encrypted_file_path=encrypted_path,
             signature=signature,
-            original_filename=original_filename
+            # Unique on-disk name; original_filename is kept in the queue
+            original_filename=f"{file_id}_{secure_filename(original_filename)}",
+            kyber_ct=kyber_ct,
+            file_hash=file_hash,
+            manifest=manifest,
+            key_context=key_context,
+            batch_entry=batch_entry
         )
         
         # Delete encrypted file after successful decryption
@@ -215,25 +583,15 @@ def pqc_decrypt_file():
         print(f"Decryption error: {str(e)}")
         return jsonify({"error": str(e)}), 400
 
-    # Read decrypted file for queue storage
-    with open(decrypted_path, "rb") as f:
-        decrypted_b64 = base64.b64encode(f.read()).decode("utf-8")
-    
-    file_size = os.path.getsize(decrypted_path)
-    file_id = str(uuid.uuid4())
-
-    # Initialize queue if not exists
-    if not hasattr(app_state, 'pqc_received_files_queue'):
-        app_state.pqc_received_files_queue = []
-
-    # Add to queue
-    app_state.pqc_received_files_queue.append({
+    # Queue metadata only; the payload is streamed from /pqc/inbox/<id>
+    app_state.pqc_received_inbox.add({
         "id": file_id,
         "filename": original_filename,
         "kyber_ciphertext": kyber_ct_b64,
         "signature": signature_b64,
-        "decrypted_file": decrypted_b64,
-        "file_size": file_size,
+        "sender": request.remote_addr,
+        "file_size": payload_size(decrypted_path),
+        "kind": "directory" if os.path.isdir(decrypted_path) else "file",
         "path": decrypted_path,
         "status": "READY"
     })
@@ -249,29 +607,67 @@ def pqc_decrypt_file():
 # ======================================================
 @file_pqc_bp.route("/pqc/next-file", methods=["POST"])
 def pqc_next_file():
-    """Get next PQC-encrypted file from queue and delete from backend"""
+    """Get next PQC-decrypted file's metadata and download handle"""
     if app_state.role != "RECEIVER":
         return jsonify({"error": "Not in receiver mode"}), 403
 
-    if not hasattr(app_state, 'pqc_received_files_queue') or not app_state.pqc_received_files_queue:
+    file_entry = app_state.pqc_received_inbox.next_file()
+    if file_entry is None:
         return jsonify({"message": "No files available"}), 204  # No Content
 
-    # Get first file from queue
-    file_entry = app_state.pqc_received_files_queue.pop(0)
-    
-    # Delete file from disk
-    try:
-        if os.path.exists(file_entry["path"]):
-            os.remove(file_entry["path"])
-    except Exception as e:
-        print(f"Failed to delete file from disk: {e}")
-    
-    # Return entire file data
     return jsonify({
         "id": file_entry["id"],
         "filename": file_entry["filename"],
-        "file_data": file_entry["decrypted_file"],
+        "download_url": f"/pqc/inbox/{file_entry['id']}",
         "file_size": file_entry["file_size"],
+        "kind": file_entry.get("kind", "file"),
         "kyber_ciphertext": file_entry["kyber_ciphertext"],
         "signature": file_entry["signature"]
-    }), 200
\ No newline at end of file
+    }), 200
+
+
+# ======================================================
+# RECEIVER: Download / discard a received file (streamed)
+# ======================================================
+@file_pqc_bp.route("/pqc/inbox", methods=["GET"])
+def pqc_list_received_files():
+    """Pages through the inbox (?sender=&status=&limit=&offset=)"""
+    try:
+        page = inbox_page(app_state.pqc_received_inbox, request.args, "/pqc/inbox")
+    except ValueError:
+        return jsonify({"error": "limit and offset must be integers"}), 400
+
+    return jsonify(page), 200
+
+
+@file_pqc_bp.route("/pqc/inbox/<file_id>", methods=["GET"])
+def pqc_download_received_file(file_id):
+    """
+    Streams a decrypted file with Range and ETag support; a received
+    directory is streamed as a tar archive instead.
+    The file is removed from the inbox once fully downloaded.
+    """
+    file_entry = app_state.pqc_received_inbox.get(file_id)
+    if file_entry is None:
+        return jsonify({"error": "File not found"}), 404
+
+    send = send_directory_archive if os.path.isdir(file_entry["path"]) else send_stored_file
+    response = send(
+        file_entry["path"],
+        file_entry["filename"],
+        on_complete=lambda: app_state.pqc_received_inbox.remove(file_id)
+    )
+    if response is None:
+        app_state.pqc_received_inbox.remove(file_id)
+        return jsonify({"error": "File not found"}), 404
+
+    return response
+
+
+@file_pqc_bp.route("/pqc/inbox/<file_id>", methods=["DELETE"])
+def pqc_delete_received_file(file_id):
+    """Discards a received file without downloading it"""
+    if app_state.pqc_received_inbox.remove(file_id) is None:
+        return jsonify({"error": "File not found"}), 404
+
+    return jsonify({"message": "File deleted", "file_id": file_id}), 200
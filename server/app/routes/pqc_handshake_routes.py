@@ -1,16 +1,18 @@
 import threading
 import base64
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 
 from app.extensions import app_state
 from app.utils.network_utils import (
     get_local_ip,
-    listen_for_receiver,
     broadcast_receiver,
     listen_for_handshake,
     listen_for_acknowledgment,
     send_handshake,
     send_acknowledgment,
+    handshake_fallback_url,
+    accept_handshake,
+    accept_acknowledgment,
     BroadcastState
 )
 
@@ -18,6 +20,8 @@ from app.services.pqc_key_service import (
     load_kyber_public_key,
     load_dilithium_public_key
 )
+from app.services.pqc_session_service import sender_sessions
+from app.services.discovery_service import discover_response
 
 # --------------------------------------------------
 # Blueprint
@@ -25,31 +29,23 @@ from app.services.pqc_key_service import (
 
 pqc_handshake_bp = Blueprint("pqc_handshake", __name__)
 
+
 # ==================================================
 # SENDER: Discover receiver
 # ==================================================
 
 @pqc_handshake_bp.route("/pqc/sender/discover", methods=["POST"])
 def discover_receiver():
+    """
+    Selects a receiver from the peers announced recently and lists
+    all of them. Body (optional): {receiver_ip, receiver_name, wait}
+    """
 
     if app_state.role != "SENDER":
         return jsonify({"error": "Not in sender mode"}), 403
 
-    ip, port, name = listen_for_receiver()
-
-    if not ip:
-        return jsonify({"error": "No receiver found"}), 404
-
-    app_state.receiver_ip = ip
-    app_state.receiver_port = port
-    app_state.receiver_name = name
-
-    return jsonify({
-        "message": "Receiver discovered",
-        "receiver_ip": ip,
-        "receiver_port": port,
-        "receiver_name": name
-    })
+    body, code = discover_response(request.get_json(silent=True) or {})
+    return jsonify(body), code
 
 
 # ==================================================
@@ -157,15 +153,19 @@ def receiver_acknowledge():
         "kyber_public_key": base64.b64encode(kyber_pk).decode("utf-8")
     }
 
-    success = send_acknowledgment(sender_ip, sender_port, receiver_ip, receiver_port, receiver_name)
+    transport = send_acknowledgment(
+        sender_ip, sender_port, receiver_ip, receiver_port, receiver_name,
+        fallback_url=handshake_fallback_url(sender_ip, current_app.config["PEER_API_PORT"])
+    )
 
-    if not success:
+    if not transport:
         return jsonify({"error": "Failed to send acknowledgment"}), 500
 
     return jsonify({
         "message": "Acknowledgment sent (PQC)",
         "receiver_ip": receiver_ip,
-        "receiver_port": receiver_port
+        "receiver_port": receiver_port,
+        "transport": transport
     })
 
 
@@ -200,11 +200,8 @@ def sender_handshake():
         "dilithium_public_key": base64.b64encode(dilithium_pk).decode("utf-8")
     }
     print("Prepared handshake payload:", payload)
-    success = send_handshake(receiver_ip, receiver_port, sender_ip, sender_port, sender_name)
-
-    if not success:
-        return jsonify({"error": "Handshake failed"}), 500
 
+    # Listen before sending: the acknowledgment may follow immediately
     ack_state = BroadcastState()
     app_state.ack_state = ack_state
 
@@ -214,10 +211,20 @@ def sender_handshake():
         daemon=True
     ).start()
 
+    transport = send_handshake(
+        receiver_ip, receiver_port, sender_ip, sender_port, sender_name,
+        fallback_url=handshake_fallback_url(receiver_ip, current_app.config["PEER_API_PORT"])
+    )
+
+    if not transport:
+        ack_state.should_stop = True
+        return jsonify({"error": "Handshake failed"}), 500
+
     return jsonify({
         "message": "Handshake sent (PQC)",
         "sender_ip": sender_ip,
-        "sender_port": sender_port
+        "sender_port": sender_port,
+        "transport": transport
     })
 
 
@@ -246,4 +253,41 @@ def sender_ack_status():
         receiver_info["kyber_public_key"]
     )
 
-    return jsonify({"status": "ACKNOWLEDGED"})
\ No newline at end of file
+    # Session mode: encapsulate once now, files reuse the session
+    if current_app.config["PQC_KEM_SESSION"]:
+        sender_sessions.establish(app_state.peer_kyber_public_key)
+
+    return jsonify({"status": "ACKNOWLEDGED"})
+
+
+# ==================================================
+# HTTP fallback for handshake messages (UDP blocked)
+# ==================================================
+
+@pqc_handshake_bp.route("/pqc/handshake/message", methods=["POST"])
+def handshake_message():
+    """
+    Takes a SENDER_HANDSHAKE (receiver) or RECEIVER_ACK (sender) over
+    HTTP, exactly as the UDP listener would; resends are deduplicated
+    by msg_id across both paths.
+    """
+    message = request.get_json(silent=True) or {}
+    msg_type = message.get("type")
+
+    if msg_type == "SENDER_HANDSHAKE":
+        state, accept = getattr(app_state, "broadcast_state", None), accept_handshake
+    elif msg_type == "RECEIVER_ACK":
+        state, accept = getattr(app_state, "ack_state", None), accept_acknowledgment
+    else:
+        return jsonify({"error": "Unknown handshake message type"}), 400
+
+    if state is None or (state.should_stop and message.get("msg_id") not in state.seen_messages):
+        return jsonify({"error": "Not waiting for this handshake message"}), 409
+
+    try:
+        accept(state, message)
+    except KeyError as e:
+        return jsonify({"error": f"Missing field: {e}"}), 400
+
+    print(f"{msg_type} received over HTTP from {request.remote_addr}")
+    return jsonify({"type": "MSG_ACK", "ack_id": message.get("msg_id")}), 200
@@ -0,0 +1,85 @@
+import json
+from flask import Blueprint, jsonify, current_app, Response
+from app.services.job_service import (
+    get_job_queue,
+    JOB_DONE,
+    JOB_FAILED,
+    JOB_FINAL_STATES
+)
+
+# ------------------------------------------------------
+# Blueprint
+# ------------------------------------------------------
+pqc_job_bp = Blueprint("pqc_job", __name__)
+
+# Seconds between keep-alive events while a job is unchanged
+EVENT_KEEPALIVE = 15
+
+
+def _get_job(job_id):
+    return get_job_queue(current_app._get_current_object()).get(job_id)
+
+
+# ======================================================
+# Job queue overview
+# ======================================================
+@pqc_job_bp.route("/pqc/jobs", methods=["GET"])
+def pqc_job_stats():
+    return jsonify(get_job_queue(current_app._get_current_object()).stats()), 200
+
+
+# ======================================================
+# Job status (poll)
+# ======================================================
+@pqc_job_bp.route("/pqc/jobs/<job_id>", methods=["GET"])
+def pqc_job_status(job_id):
+    """Status, current stage and progress; includes the result once DONE"""
+    job = _get_job(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+
+    return jsonify(job.to_dict()), 200
+
+
+# ======================================================
+# Job result
+# ======================================================
+@pqc_job_bp.route("/pqc/jobs/<job_id>/result", methods=["GET"])
+def pqc_job_result(job_id):
+    """200 with the result, 202 while pending, 500 if the job failed"""
+    job = _get_job(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+
+    if job.status == JOB_DONE:
+        return jsonify(job.result), 200
+    if job.status == JOB_FAILED:
+        return jsonify({"error": job.error, "job_id": job.id}), 500
+
+    return jsonify(job.to_dict()), 202
+
+
+# ======================================================
+# Job progress (server-sent events)
+# ======================================================
+@pqc_job_bp.route("/pqc/jobs/<job_id>/events", methods=["GET"])
+def pqc_job_events(job_id):
+    """Pushes one event per stage change until the job finishes"""
+    job = _get_job(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+
+    def stream():
+        version = -1
+        while True:
+            version = job.wait_for_change(version, EVENT_KEEPALIVE)
+            data = job.to_dict()
+            yield f"event: {job.status.lower()}\ndata: {json.dumps(data)}\n\n"
+            if job.status in JOB_FINAL_STATES:
+                break
+
+    return Response(
+        stream(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
@@ -0,0 +1,250 @@
+import os
+import uuid
+import base64
+from flask import Blueprint, request, jsonify, current_app
+from werkzeug.utils import secure_filename
+from app.extensions import app_state
+
+from app.services.pqc_process_service import run_decrypt_workflow
+from app.services.pqc_session_service import validate_key_context
+from app.services.batch_service import batches, received_batch_dir, UNKNOWN_BATCH_ERROR
+from app.services.archive_service import payload_size, remove_payload
+from app.services.transfer_service import (
+    transfers,
+    TRANSFER_ID_PATTERN,
+    CorruptChunkError,
+    TransferClosedError,
+    STATUS_OPEN,
+    STATUS_COMPLETE,
+    STATUS_FAILED
+)
+
+# ------------------------------------------------------
+# Blueprint
+# ------------------------------------------------------
+pqc_transfer_bp = Blueprint("pqc_transfer", __name__)
+
+
+def _transfer_dir():
+    return os.path.join(current_app.config["ENCRYPTED_FOLDER"], "transfers")
+
+
+def _finalize(transfer):
+    """
+    Verifies and decrypts a fully received transfer (once), then
+    queues the plaintext in the inbox like /pqc/decrypt does.
+    """
+    if not transfer.begin_finalize():
+        return transfer.to_status()
+
+    meta = transfer.meta
+    file_id = str(uuid.uuid4())
+
+    try:
+        # Batch files: digest checked against the verified batch manifest
+        batch_entry = None
+        if meta.get("batch_id"):
+            batch_entry = batches.entry(received_batch_dir(), meta["batch_id"], meta["batch_index"])
+            if batch_entry is None:
+                raise Exception(UNKNOWN_BATCH_ERROR)
+
+        decrypted_path = run_decrypt_workflow(
+            encrypted_file_path=transfer.enc_path,
+            signature=base64.b64decode(meta["signature"]),
+            original_filename=f"{file_id}_{secure_filename(meta['original_filename'])}",
+            kyber_ct=base64.b64decode(meta["kyber_ciphertext"]),
+            manifest=meta.get("manifest"),
+            key_context=meta.get("key_context"),
+            batch_entry=batch_entry
+        )
+    except Exception as e:
+        print(f"Transfer {transfer.id} failed verification: {e}")
+        transfer.finish(STATUS_FAILED, error=str(e))
+        return transfer.to_status()
+
+    # The transfer must always leave FINALIZING, or the sender keeps polling
+    try:
+        app_state.pqc_received_inbox.add({
+            "id": file_id,
+            "filename": meta["original_filename"],
+            "kyber_ciphertext": meta["kyber_ciphertext"],
+            "signature": meta["signature"],
+            "sender": meta.get("sender"),
+            "file_size": payload_size(decrypted_path),
+            "kind": "directory" if os.path.isdir(decrypted_path) else "file",
+            "path": decrypted_path,
+            "status": "READY"
+        })
+    except Exception as e:
+        print(f"Transfer {transfer.id}: could not queue the decrypted file: {e}")
+        app_state.pqc_received_inbox.remove(file_id, delete_file=False)
+        remove_payload(decrypted_path)
+        transfer.finish(STATUS_FAILED, error=str(e))
+        return transfer.to_status()
+
+    transfer.finish(STATUS_COMPLETE, file_id=file_id)
+    print(f"Transfer {transfer.id} complete ({meta['file_size']} bytes)")
+    return transfer.to_status()
+
+
+def _status_response(status: dict):
+    code = 400 if status["status"] == STATUS_FAILED else 200
+    return jsonify(status), code
+
+
+# ======================================================
+# RECEIVER: Open (or resume) a transfer
+# ======================================================
+@pqc_transfer_bp.route("/pqc/transfer/open", methods=["POST"])
+def pqc_transfer_open():
+    """
+    Body: transfer_id, file_size, chunk_size, signature,
+    kyber_ciphertext, original_filename, manifest (optional),
+    key_context (optional, session mode),
+    batch_id + batch_index (optional, batch mode)
+
+    Re-opening an existing transfer_id returns its missing chunks.
+    """
+    data = request.get_json()
+    if not data:
+        return jsonify({"error": "Invalid JSON payload"}), 400
+
+    transfer_id = data.get("transfer_id", "")
+    if not TRANSFER_ID_PATTERN.match(transfer_id):
+        return jsonify({"error": "transfer_id must be 32 hex characters"}), 400
+
+    if not data.get("signature") or not data.get("kyber_ciphertext"):
+        return jsonify({"error": "Missing signature or Kyber ciphertext"}), 400
+
+    try:
+        file_size = int(data.get("file_size"))
+        chunk_size = int(data.get("chunk_size"))
+    except (TypeError, ValueError):
+        return jsonify({"error": "file_size and chunk_size must be integers"}), 400
+
+    if file_size <= 0 or file_size > current_app.config["TRANSFER_MAX_FILE_SIZE"]:
+        return jsonify({"error": "Unsupported file size"}), 413
+    if chunk_size <= 0 or chunk_size > current_app.config["MAX_CONTENT_LENGTH"]:
+        return jsonify({"error": "chunk_size exceeds MAX_CONTENT_LENGTH"}), 400
+
+    key_context = data.get("key_context")
+    if key_context is not None:
+        try:
+            validate_key_context(key_context)
+        except ValueError as e:
+            return jsonify({"error": f"Invalid key context: {e}"}), 400
+
+    batch_id = data.get("batch_id")
+    if batch_id is not None:
+        try:
+            batch_index = int(data.get("batch_index"))
+        except (TypeError, ValueError):
+            return jsonify({"error": "batch_index must be an integer"}), 400
+        if batches.entry(received_batch_dir(), batch_id, batch_index) is None:
+            return jsonify({"error": UNKNOWN_BATCH_ERROR}), 404
+
+    directory = _transfer_dir()
+    transfers.expire(directory, current_app.config["TRANSFER_SESSION_TTL"])
+
+    try:
+        transfer = transfers.open(directory, transfer_id, {
+            "file_size": file_size,
+            "chunk_size": chunk_size,
+            "signature": data["signature"],
+            "kyber_ciphertext": data["kyber_ciphertext"],
+            "original_filename": data.get("original_filename", "received_file"),
+            "manifest": data.get("manifest"),
+            "key_context": key_context,
+            "batch_id": batch_id,
+            "batch_index": batch_index if batch_id is not None else None,
+            "sender": request.remote_addr
+        })
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 409
+    except OSError as e:
+        return jsonify({"error": str(e)}), 507
+
+    # Everything already arrived before a dropped response: finish now
+    if transfer.status == STATUS_OPEN and not transfer.missing():
+        return _status_response(_finalize(transfer))
+
+    return _status_response(transfer.to_status())
+
+
+# ======================================================
+# RECEIVER: Upload one chunk
+# ======================================================
+@pqc_transfer_bp.route("/pqc/transfer/<transfer_id>/chunks/<int:index>", methods=["PUT"])
+def pqc_transfer_chunk(transfer_id, index):
+    """
+    Raw chunk bytes in the body, optional X-Chunk-Sha256 header.
+    The request that stores the last missing chunk also runs
+    verification + decryption and returns the final status.
+    """
+    transfer = transfers.get(_transfer_dir(), transfer_id)
+    if transfer is None:
+        return jsonify({"error": "Unknown transfer"}), 404
+
+    try:
+        transfer.write_chunk(index, request.stream, request.headers.get("X-Chunk-Sha256"))
+    except TransferClosedError:
+        # Finalized, failed or aborted before or while this chunk arrived
+        if transfers.get(_transfer_dir(), transfer_id) is None:
+            return jsonify({"error": "Unknown transfer"}), 404
+        if transfer.status == STATUS_OPEN:
+            # Still open, but its spool file is gone: it cannot complete
+            transfer.finish(STATUS_FAILED, error="Transfer data missing on the receiver")
+        return _status_response(transfer.to_status())
+    except CorruptChunkError as e:
+        # Not a transport error (that is what X-Chunk-Sha256 catches):
+        # the sender's file is bad, so fail the whole transfer now
+        print(f"Transfer {transfer.id} rejected: {e}")
+        transfer.finish(STATUS_FAILED, error=str(e))
+        return _status_response(transfer.to_status())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if not transfer.missing():
+        return _status_response(_finalize(transfer))
+
+    return jsonify({"transfer_id": transfer.id, "chunk": index, "status": transfer.status}), 200
+
+
+# ======================================================
+# RECEIVER: Transfer status / missing chunks
+# ======================================================
+@pqc_transfer_bp.route("/pqc/transfer/<transfer_id>", methods=["GET"])
+def pqc_transfer_status(transfer_id):
+    transfer = transfers.get(_transfer_dir(), transfer_id)
+    if transfer is None:
+        return jsonify({"error": "Unknown transfer"}), 404
+
+    return jsonify(transfer.to_status()), 200
+
+
+# ======================================================
+# RECEIVER: Explicit finalize (retry after a lost response)
+# ======================================================
+@pqc_transfer_bp.route("/pqc/transfer/<transfer_id>/finalize", methods=["POST"])
+def pqc_transfer_finalize(transfer_id):
+    transfer = transfers.get(_transfer_dir(), transfer_id)
+    if transfer is None:
+        return jsonify({"error": "Unknown transfer"}), 404
+
+    if transfer.status == STATUS_OPEN and transfer.missing():
+        return jsonify(dict(transfer.to_status(), error="Chunks missing")), 409
+
+    return _status_response(_finalize(transfer))
+
+
+# ======================================================
+# RECEIVER: Abort a transfer
+# ======================================================
+@pqc_transfer_bp.route("/pqc/transfer/<transfer_id>", methods=["DELETE"])
+def pqc_transfer_abort(transfer_id):
+    transfer = transfers.get(_transfer_dir(), transfer_id)
+    if transfer is None:
+        return jsonify({"error": "Unknown transfer"}), 404
+
+    transfers.discard(transfer)
+    return jsonify({"message": "Transfer aborted", "transfer_id": transfer_id}), 200
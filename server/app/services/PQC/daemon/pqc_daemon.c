@@ -0,0 +1,225 @@
+/*
+ * Long-lived PQC helper.
+ *
+ * Replaces the one-shot kyber_encaps / kyber_decaps / dilithium_sign /
+ * dilithium_verify binaries for nodes without the oqs Python binding.
+ * Secret keys are loaded once from <key_dir> and kept in memory until
+ * a RELOAD request arrives.
+ *
+ * Usage: pqc_daemon <key_dir> [kem_alg] [sig_alg]
+ *
+ * Framing (stdin → stdout, big-endian lengths):
+ *   request  = op (1 byte) | length (4 bytes) | payload
+ *   response = status (1 byte, 0 = ok) | length (4 bytes) | payload
+ *
+ * Ops:
+ *   'E' encaps   payload = public key             → ciphertext || shared secret
+ *   'D' decaps   payload = ciphertext             → shared secret
+ *   'S' sign     payload = message                → signature
+ *   'V' verify   payload = pk || sig_len(4) || sig || message → 1 byte (1 = valid)
+ *   'R' reload   payload = empty                  → empty (drops cached secret keys)
+ */
+
+#include <stdio.h>
+#include <stdint.h>
+#include <stdlib.h>
+#include <string.h>
+#include <unistd.h>
+#include <oqs/oqs.h>
+
+#define MAX_PAYLOAD (1u << 20)
+
+static const char *key_dir;
+static OQS_KEM *kem;
+static OQS_SIG *sig;
+static uint8_t *kyber_sk;
+static uint8_t *dilithium_sk;
+
+/* ======================================================
+ * Pipe I/O
+ * ====================================================== */
+
+static int read_exact(uint8_t *buf, size_t len) {
+    while (len > 0) {
+        ssize_t n = read(STDIN_FILENO, buf, len);
+        if (n <= 0) return -1;
+        buf += n;
+        len -= (size_t)n;
+    }
+    return 0;
+}
+
+static int write_exact(const uint8_t *buf, size_t len) {
+    while (len > 0) {
+        ssize_t n = write(STDOUT_FILENO, buf, len);
+        if (n <= 0) return -1;
+        buf += n;
+        len -= (size_t)n;
+    }
+    return 0;
+}
+
+static uint32_t get_u32(const uint8_t *p) {
+    return ((uint32_t)p[0] << 24) | ((uint32_t)p[1] << 16) |
+           ((uint32_t)p[2] << 8) | (uint32_t)p[3];
+}
+
+static void put_u32(uint8_t *p, uint32_t v) {
+    p[0] = (uint8_t)(v >> 24);
+    p[1] = (uint8_t)(v >> 16);
+    p[2] = (uint8_t)(v >> 8);
+    p[3] = (uint8_t)v;
+}
+
+static int respond(uint8_t status, const uint8_t *data, size_t len) {
+    uint8_t header[5];
+    header[0] = status;
+    put_u32(header + 1, (uint32_t)len);
+    if (write_exact(header, sizeof(header)) != 0) return -1;
+    if (len > 0 && write_exact(data, len) != 0) return -1;
+    return 0;
+}
+
+static int respond_error(const char *msg) {
+    return respond(1, (const uint8_t *)msg, strlen(msg));
+}
+
+/* ======================================================
+ * Key loading (once, until RELOAD)
+ * ====================================================== */
+
+static uint8_t *load_key(const char *name, size_t len) {
+    char path[4096];
+    snprintf(path, sizeof(path), "%s/%s", key_dir, name);
+
+    FILE *f = fopen(path, "rb");
+    if (!f) return NULL;
+
+    uint8_t *key = malloc(len);
+    if (key && fread(key, 1, len, f) != len) {
+        free(key);
+        key = NULL;
+    }
+    fclose(f);
+    return key;
+}
+
+static void drop_keys(void) {
+    if (kyber_sk) {
+        OQS_MEM_secure_free(kyber_sk, kem->length_secret_key);
+        kyber_sk = NULL;
+    }
+    if (dilithium_sk) {
+        OQS_MEM_secure_free(dilithium_sk, sig->length_secret_key);
+        dilithium_sk = NULL;
+    }
+}
+
+/* ======================================================
+ * Operations
+ * ====================================================== */
+
+static int op_encaps(const uint8_t *pk, size_t len) {
+    if (len != kem->length_public_key) return respond_error("bad public key length");
+
+    size_t out_len = kem->length_ciphertext + kem->length_shared_secret;
+    uint8_t out[out_len];
+
+    if (OQS_KEM_encaps(kem, out, out + kem->length_ciphertext, pk) != OQS_SUCCESS)
+        return respond_error("encapsulation failed");
+
+    return respond(0, out, out_len);
+}
+
+static int op_decaps(const uint8_t *ct, size_t len) {
+    if (len != kem->length_ciphertext) return respond_error("bad ciphertext length");
+
+    if (!kyber_sk) kyber_sk = load_key("kyber_sk.bin", kem->length_secret_key);
+    if (!kyber_sk) return respond_error("could not load kyber_sk.bin");
+
+    uint8_t ss[kem->length_shared_secret];
+    if (OQS_KEM_decaps(kem, ss, ct, kyber_sk) != OQS_SUCCESS)
+        return respond_error("decapsulation failed");
+
+    return respond(0, ss, sizeof(ss));
+}
+
+static int op_sign(const uint8_t *msg, size_t len) {
+    if (!dilithium_sk) dilithium_sk = load_key("dilithium_sk.bin", sig->length_secret_key);
+    if (!dilithium_sk) return respond_error("could not load dilithium_sk.bin");
+
+    uint8_t signature[sig->length_signature];
+    size_t sig_len = 0;
+
+    if (OQS_SIG_sign(sig, signature, &sig_len, msg, len, dilithium_sk) != OQS_SUCCESS)
+        return respond_error("signing failed");
+
+    return respond(0, signature, sig_len);
+}
+
+static int op_verify(const uint8_t *payload, size_t len) {
+    size_t pk_len = sig->length_public_key;
+    if (len < pk_len + 4) return respond_error("bad verify payload");
+
+    const uint8_t *pk = payload;
+    size_t sig_len = get_u32(payload + pk_len);
+    if (len < pk_len + 4 + sig_len) return respond_error("bad verify payload");
+
+    const uint8_t *signature = payload + pk_len + 4;
+    const uint8_t *msg = signature + sig_len;
+    size_t msg_len = len - pk_len - 4 - sig_len;
+
+    uint8_t valid = OQS_SIG_verify(sig, msg, msg_len, signature, sig_len, pk) == OQS_SUCCESS;
+    return respond(0, &valid, 1);
+}
+
+/* ======================================================
+ * Main loop
+ * ====================================================== */
+
+int main(int argc, char **argv) {
+    if (argc < 2) {
+        fprintf(stderr, "usage: %s <key_dir> [kem_alg] [sig_alg]\n", argv[0]);
+        return 1;
+    }
+
+    key_dir = argv[1];
+    kem = OQS_KEM_new(argc > 2 ? argv[2] : "Kyber512");
+    sig = OQS_SIG_new(argc > 3 ? argv[3] : "ML-DSA-44");
+
+    if (kem == NULL || sig == NULL) {
+        fprintf(stderr, "ERROR: PQC algorithm not supported by liboqs\n");
+        return 1;
+    }
+
+    uint8_t *payload = malloc(MAX_PAYLOAD);
+    uint8_t header[5];
+
+    while (read_exact(header, sizeof(header)) == 0) {
+        uint8_t op = header[0];
+        uint32_t len = get_u32(header + 1);
+
+        if (len > MAX_PAYLOAD) {
+            fprintf(stderr, "ERROR: request too large\n");
+            break;
+        }
+        if (len > 0 && read_exact(payload, len) != 0) break;
+
+        int rc;
+        switch (op) {
+            case 'E': rc = op_encaps(payload, len); break;
+            case 'D': rc = op_decaps(payload, len); break;
+            case 'S': rc = op_sign(payload, len); break;
+            case 'V': rc = op_verify(payload, len); break;
+            case 'R': drop_keys(); rc = respond(0, NULL, 0); break;
+            default:  rc = respond_error("unknown op"); break;
+        }
+        if (rc != 0) break;
+    }
+
+    drop_keys();
+    free(payload);
+    OQS_KEM_free(kem);
+    OQS_SIG_free(sig);
+    return 0;
+}
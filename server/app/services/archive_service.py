@@ -0,0 +1,227 @@
+import os
+import stat
+import queue
+import shutil
+import tarfile
+import threading
+
+
+# ======================================================
+# Streaming tar archives (directory send)
+# ======================================================
+#
+# Sender: TarStreamReader produces a tar stream from a directory on
+# the fly (header, file contents, padding), so it can be fed straight
+# into the chunk sealer without a tarball on disk or in memory.
+# Receiver: TarExtractWriter takes the decrypted stream as it is
+# written and unpacks it incrementally on a helper thread.
+
+ARCHIVE_READ_BLOCK = 1024 * 1024  # 1 MB
+EXTRACT_QUEUE_DEPTH = 8
+
+
+def _padding(size: int) -> int:
+    return -size % tarfile.BLOCKSIZE
+
+
+def collect_directory_entries(root: str) -> list:
+    """
+    [(TarInfo, path or None)] for every directory and regular file
+    below root, names relative to root, in a stable order.
+    Symlinks and special files are skipped.
+    """
+    entries = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(
+            d for d in dirnames if not os.path.islink(os.path.join(dirpath, d))
+        )
+        relative = os.path.relpath(dirpath, root)
+
+        if relative != ".":
+            info = tarfile.TarInfo(relative.replace(os.sep, "/"))
+            info.type = tarfile.DIRTYPE
+            info.mode = 0o755
+            info.mtime = int(os.path.getmtime(dirpath))
+            entries.append((info, None))
+
+        for name in sorted(filenames):
+            path = os.path.join(dirpath, name)
+            st = os.lstat(path)
+            if not stat.S_ISREG(st.st_mode):
+                print(f"Skipping non-regular file {path}")
+                continue
+            arcname = name if relative == "." else f"{relative}/{name}"
+            info = tarfile.TarInfo(arcname.replace(os.sep, "/"))
+            info.size = st.st_size
+            info.mode = 0o755 if st.st_mode & stat.S_IXUSR else 0o644
+            info.mtime = int(st.st_mtime)
+            entries.append((info, path))
+
+    return entries
+
+
+class TarStreamReader:
+    """
+    File-like reader yielding a (PAX) tar archive of `entries`.
+    The total size is known up front; read(n) returns exactly n bytes
+    until the end of the archive.
+    """
+
+    def __init__(self, entries: list):
+        self._entries = entries
+        self._headers = [
+            info.tobuf(tarfile.PAX_FORMAT, "utf-8", "surrogateescape")
+            for info, _ in entries
+        ]
+        self.files = sum(1 for info, _ in entries if info.isfile())
+        self.size = sum(
+            len(header) + info.size + _padding(info.size)
+            for header, (info, _) in zip(self._headers, entries)
+        ) + 2 * tarfile.BLOCKSIZE
+        self._blocks = self._generate()
+        self._buffer = bytearray()
+
+    def _generate(self):
+        for header, (info, path) in zip(self._headers, self._entries):
+            yield header
+            if path is None:
+                continue
+
+            remaining = info.size
+            with open(path, "rb") as f:
+                while remaining:
+                    block = f.read(min(ARCHIVE_READ_BLOCK, remaining))
+                    if not block:
+                        raise ValueError(f"{path} shrank while it was being archived")
+                    remaining -= len(block)
+                    yield block
+            yield bytes(_padding(info.size))
+
+        # End-of-archive marker
+        yield bytes(2 * tarfile.BLOCKSIZE)
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = self.size
+        while len(self._buffer) < size:
+            block = next(self._blocks, None)
+            if block is None:
+                break
+            self._buffer += block
+
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def __iter__(self):
+        """Archive blocks, for streaming a download response"""
+        while True:
+            block = self.read(ARCHIVE_READ_BLOCK)
+            if not block:
+                return
+            yield block
+
+
+class _QueueReader:
+    """Read side of the bounded queue between writer and extractor"""
+
+    def __init__(self, blocks: queue.Queue):
+        self._blocks = blocks
+        self._buffer = bytearray()
+        self._eof = False
+
+    def read(self, size: int = -1) -> bytes:
+        while not self._eof and (size is None or size < 0 or len(self._buffer) < size):
+            block = self._blocks.get()
+            if block is None:
+                self._eof = True
+            else:
+                self._buffer += block
+
+        if size is None or size < 0:
+            size = len(self._buffer)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def drain(self):
+        while not self._eof:
+            if self._blocks.get() is None:
+                self._eof = True
+
+
+class TarExtractWriter:
+    """
+    File-like writer that unpacks a tar stream into target_dir while
+    it is being written. Only regular files and directories inside
+    target_dir are extracted. Call finish() at the end of the stream
+    (raises ValueError if the archive was invalid) or abort().
+    """
+
+    def __init__(self, target_dir: str):
+        self.target_dir = target_dir
+        self.files = 0
+        self._blocks = queue.Queue(maxsize=EXTRACT_QUEUE_DEPTH)
+        self._reader = _QueueReader(self._blocks)
+        self._error = None
+        os.makedirs(target_dir)
+        self._thread = threading.Thread(target=self._extract, name="tar-extract", daemon=True)
+        self._thread.start()
+
+    def _extract(self):
+        root = os.path.realpath(self.target_dir)
+        options = {"filter": "data"} if hasattr(tarfile, "data_filter") else {}
+        try:
+            with tarfile.open(fileobj=self._reader, mode="r|") as archive:
+                for member in archive:
+                    destination = os.path.realpath(os.path.join(root, member.name))
+                    if not (member.isfile() or member.isdir()) or \
+                            os.path.commonpath([root, destination]) != root:
+                        print(f"Skipping archive member {member.name!r}")
+                        continue
+                    archive.extract(member, root, **options)
+                    if member.isfile():
+                        self.files += 1
+        except Exception as e:
+            self._error = e
+        finally:
+            # Keep consuming so the writer never blocks on a full queue
+            self._reader.drain()
+
+    def write(self, data: bytes):
+        if self._error is not None:
+            raise ValueError(f"Archive extraction failed: {self._error}")
+        if data:
+            self._blocks.put(bytes(data))
+
+    def finish(self):
+        self._blocks.put(None)
+        self._thread.join()
+        if self._error is not None:
+            raise ValueError(f"Archive extraction failed: {self._error}")
+
+    def abort(self):
+        self._blocks.put(None)
+        self._thread.join()
+
+
+# ======================================================
+# Helpers for payloads that may be files or directories
+# ======================================================
+
+def payload_size(path: str) -> int:
+    """Size of a file, or total size of the files below a directory"""
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    return sum(
+        os.path.getsize(os.path.join(dirpath, name))
+        for dirpath, _, filenames in os.walk(path)
+        for name in filenames
+    )
+
+
+def remove_payload(path: str):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
@@ -0,0 +1,215 @@
+import os
+import re
+import json
+import time
+import uuid
+import hmac
+import base64
+import hashlib
+import threading
+from flask import current_app
+
+from app.services.pqc_signature_service import verify_dilithium_signature
+
+
+# ======================================================
+# Batch manifests (one Dilithium signature per batch)
+# ======================================================
+#
+# A batch manifest lists, for every file, the signed digest of its
+# ciphertext (SHA-512 over .enc + Kyber ct, or the Merkle root) and
+# its Kyber ciphertext. The sender signs the manifest once; the
+# receiver verifies it once when the batch is opened and afterwards
+# only compares each arriving file's digest with its manifest entry.
+
+BATCH_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+BATCH_MANIFEST_VERSION = 1
+
+# Keeps a batch signature from ever being valid for a single file digest
+BATCH_DIGEST_PREFIX = b"PQDS-BATCH\x01"
+
+# Receiver's 404 error for a batch it does not (or no longer) hold
+UNKNOWN_BATCH_ERROR = "Unknown batch or batch index"
+
+
+def build_batch_manifest(entries: list) -> dict:
+    """
+    entries: [{name, file_hash (bytes), kyber_ciphertext (bytes)}]
+    """
+    return {
+        "version": BATCH_MANIFEST_VERSION,
+        "batch_id": uuid.uuid4().hex,
+        "created_at": int(time.time()),
+        "files": [
+            {
+                "name": entry["name"],
+                "digest": entry["file_hash"].hex(),
+                "kyber_ciphertext": base64.b64encode(entry["kyber_ciphertext"]).decode("utf-8")
+            }
+            for entry in entries
+        ]
+    }
+
+
+def batch_manifest_digest(manifest: dict) -> bytes:
+    """SHA-512 over the canonical JSON encoding of the manifest"""
+    canonical = json.dumps(manifest, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha512(BATCH_DIGEST_PREFIX + canonical.encode("utf-8")).digest()
+
+
+def check_batch_entry(entry: dict, file_hash: bytes, kyber_ct: bytes):
+    """Raises unless the file matches its entry in a verified manifest"""
+    if not hmac.compare_digest(bytes.fromhex(entry["digest"]), file_hash):
+        raise Exception("File digest does not match the batch manifest")
+    if not hmac.compare_digest(base64.b64decode(entry["kyber_ciphertext"]), kyber_ct):
+        raise Exception("Kyber ciphertext does not match the batch manifest")
+
+
+# ======================================================
+# Sender side: signed batches on disk
+# ======================================================
+#
+# <ENCRYPTED_FOLDER>/batches/<batch_id>.json  manifest + signature
+# <file>.enc.batch.json                       {batch_id, index}
+
+def batch_sidecar_path(encrypted_path: str) -> str:
+    return encrypted_path + ".batch.json"
+
+
+def save_sender_batch(encrypted_folder: str, manifest: dict, signature: bytes, encrypted_paths: list):
+    directory = os.path.join(encrypted_folder, "batches")
+    os.makedirs(directory, exist_ok=True)
+
+    with open(os.path.join(directory, manifest["batch_id"] + ".json"), "w") as f:
+        json.dump({
+            "manifest": manifest,
+            "signature": base64.b64encode(signature).decode("utf-8")
+        }, f)
+
+    for index, path in enumerate(encrypted_paths):
+        with open(batch_sidecar_path(path), "w") as f:
+            json.dump({"batch_id": manifest["batch_id"], "index": index}, f)
+
+
+def load_sender_batch(encrypted_folder: str, encrypted_path: str):
+    """
+    Returns (batch {manifest, signature}, index) for a file encrypted
+    as part of a batch, or (None, None).
+    """
+    sidecar = batch_sidecar_path(encrypted_path)
+    if not os.path.exists(sidecar):
+        return None, None
+    with open(sidecar) as f:
+        ref = json.load(f)
+
+    with open(os.path.join(encrypted_folder, "batches", ref["batch_id"] + ".json")) as f:
+        return json.load(f), ref["index"]
+
+
+# ======================================================
+# Receiver side: verified batches
+# ======================================================
+
+def received_batch_dir() -> str:
+    return os.path.join(current_app.config["ENCRYPTED_FOLDER"], "received_batches")
+
+
+class BatchRegistry:
+    """
+    Batches whose signature has been verified, by id. Stored under
+    <ENCRYPTED_FOLDER>/received_batches so files of a batch can still
+    arrive after a receiver restart (the signature is checked again
+    on reload).
+    """
+
+    def __init__(self):
+        self._batches = {}
+        self._lock = threading.Lock()
+
+    def open(self, directory: str, manifest: dict, signature: bytes) -> dict:
+        """
+        Verifies the manifest signature (once per batch) and stores it.
+        Raises ValueError on a malformed manifest or a bad signature.
+        """
+        batch_id = manifest.get("batch_id") if isinstance(manifest, dict) else None
+        if not BATCH_ID_PATTERN.match(batch_id or ""):
+            raise ValueError("batch_id must be 32 hex characters")
+        if manifest.get("version") != BATCH_MANIFEST_VERSION or not isinstance(manifest.get("files"), list):
+            raise ValueError("Unsupported batch manifest")
+
+        existing = self.get(directory, batch_id)
+        if existing is not None:
+            if existing["digest"] != batch_manifest_digest(manifest):
+                raise ValueError("Batch id already used for a different manifest")
+            return existing
+
+        batch = self._verify(manifest, signature)
+
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, batch_id + ".json")
+        with open(path + ".tmp", "w") as f:
+            json.dump({
+                "manifest": manifest,
+                "signature": base64.b64encode(signature).decode("utf-8")
+            }, f)
+        os.replace(path + ".tmp", path)
+
+        with self._lock:
+            self._batches[batch_id] = batch
+        return batch
+
+    def _verify(self, manifest: dict, signature: bytes) -> dict:
+        digest = batch_manifest_digest(manifest)
+        if not verify_dilithium_signature(digest, signature):
+            raise ValueError("Batch signature verification failed")
+        print(f"Batch {manifest['batch_id']} verified ({len(manifest['files'])} files)")
+        return {"manifest": manifest, "digest": digest}
+
+    def get(self, directory: str, batch_id: str):
+        if not BATCH_ID_PATTERN.match(batch_id or ""):
+            return None
+
+        with self._lock:
+            batch = self._batches.get(batch_id)
+        if batch is not None:
+            return batch
+
+        path = os.path.join(directory, batch_id + ".json")
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            stored = json.load(f)
+        try:
+            batch = self._verify(stored["manifest"], base64.b64decode(stored["signature"]))
+        except ValueError:
+            return None
+
+        with self._lock:
+            self._batches[batch_id] = batch
+        return batch
+
+    def entry(self, directory: str, batch_id: str, index: int):
+        """Manifest entry for file `index` of a verified batch, or None"""
+        batch = self.get(directory, batch_id)
+        if batch is None:
+            return None
+        files = batch["manifest"]["files"]
+        if not 0 <= index < len(files):
+            return None
+        return files[index]
+
+    def expire(self, directory: str, ttl_seconds: float):
+        """Removes batches opened more than ttl_seconds ago"""
+        if not os.path.isdir(directory):
+            return
+        cutoff = time.time() - ttl_seconds
+        for name in os.listdir(directory):
+            batch_id, ext = os.path.splitext(name)
+            path = os.path.join(directory, name)
+            if ext == ".json" and os.path.getmtime(path) < cutoff:
+                with self._lock:
+                    self._batches.pop(batch_id, None)
+                os.remove(path)
+
+
+batches = BatchRegistry()
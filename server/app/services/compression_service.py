@@ -0,0 +1,130 @@
+import os
+import zlib
+
+
+# ======================================================
+# Optional compression stage (before AES-GCM)
+# ======================================================
+#
+# The codec is recorded in the container header flags byte, which is
+# part of every chunk's AAD, so it cannot be flipped in transit.
+# Compression runs as a stream (constant memory) in front of the
+# chunk sealer; decryption inflates chunk by chunk as it writes.
+
+CODEC_NONE = 0x00
+CODEC_ZLIB = 0x01
+CODEC_MASK = 0x01
+
+COMPRESS_READ_BLOCK = 256 * 1024
+DECOMPRESS_OUT_BLOCK = 1024 * 1024
+
+SAMPLE_SIZE = 64 * 1024
+MIN_COMPRESS_SIZE = 1024
+# Skip compression unless the samples shrink to at most this fraction
+MAX_SAMPLE_RATIO = 0.9
+
+# Formats that are already compressed (signature at offset 0)
+COMPRESSED_MAGIC = (
+    b"PK\x03\x04",          # ZIP / DOCX / XLSX / PPTX / JAR
+    b"\x1f\x8b",            # gzip
+    b"\xff\xd8\xff",        # JPEG
+    b"\x89PNG\r\n\x1a\n",   # PNG
+    b"7z\xbc\xaf\x27\x1c",  # 7-Zip
+    b"\xfd7zXZ\x00",        # xz
+    b"\x28\xb5\x2f\xfd",    # zstd
+    b"BZh",                 # bzip2
+    b"Rar!",                # RAR
+    b"GIF8",                # GIF
+    b"RIFF",                # WebP / AVI / WAV
+)
+
+
+def choose_codec(input_path: str, mode: str = "auto") -> int:
+    """
+    mode "off" / "always" / "auto". In auto mode known compressed
+    formats are skipped by signature, then up to three samples (start,
+    middle, end) are test-compressed and the file is only compressed
+    if they shrink below MAX_SAMPLE_RATIO.
+    """
+    if mode == "off":
+        return CODEC_NONE
+    if mode == "always":
+        return CODEC_ZLIB
+
+    size = os.path.getsize(input_path)
+    if size < MIN_COMPRESS_SIZE:
+        return CODEC_NONE
+
+    with open(input_path, "rb") as f:
+        head = f.read(SAMPLE_SIZE)
+        if head.startswith(COMPRESSED_MAGIC):
+            return CODEC_NONE
+
+        samples = [head]
+        if size > 3 * SAMPLE_SIZE:
+            for offset in (size // 2, size - SAMPLE_SIZE):
+                f.seek(offset)
+                samples.append(f.read(SAMPLE_SIZE))
+
+    raw = sum(len(s) for s in samples)
+    packed = sum(len(zlib.compress(s, 1)) for s in samples)
+
+    return CODEC_ZLIB if packed <= raw * MAX_SAMPLE_RATIO else CODEC_NONE
+
+
+class CompressingReader:
+    """
+    File-like reader yielding the zlib stream of `src`:
+    read(n) returns exactly n bytes until the stream is exhausted.
+    """
+
+    def __init__(self, src, level: int = 6):
+        self._src = src
+        self._compressor = zlib.compressobj(level)
+        self._buffer = bytearray()
+        self._eof = False
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def read(self, size: int) -> bytes:
+        while len(self._buffer) < size and not self._eof:
+            raw = self._src.read(COMPRESS_READ_BLOCK)
+            if raw:
+                self.bytes_in += len(raw)
+                self._buffer += self._compressor.compress(raw)
+            else:
+                self._buffer += self._compressor.flush()
+                self._eof = True
+
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        self.bytes_out += len(data)
+        return data
+
+
+class DecompressingWriter:
+    """
+    File-like writer that inflates a zlib stream into `dst`,
+    never producing more than DECOMPRESS_OUT_BLOCK bytes at a time.
+    """
+
+    def __init__(self, dst):
+        self._dst = dst
+        self._decompressor = zlib.decompressobj()
+
+    def write(self, data: bytes):
+        try:
+            out = self._decompressor.decompress(data, DECOMPRESS_OUT_BLOCK)
+            self._dst.write(out)
+            while self._decompressor.unconsumed_tail:
+                out = self._decompressor.decompress(
+                    self._decompressor.unconsumed_tail, DECOMPRESS_OUT_BLOCK
+                )
+                self._dst.write(out)
+        except zlib.error as e:
+            raise ValueError(f"Corrupt compressed stream: {e}")
+
+    def finish(self):
+        self._dst.write(self._decompressor.flush())
+        if not self._decompressor.eof:
+            raise ValueError("Compressed stream is truncated")
@@ -3,7 +3,9 @@ from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.backends import default_backend
+from concurrent.futures import ThreadPoolExecutor
 import os
+import struct
 
 
 # ======================================================
@@ -26,20 +28,50 @@ def derive_aes_key_from_shared_secret(shared_secret: bytes) -> bytes:
     return hkdf.derive(shared_secret)
 
 
+def derive_file_key_from_session_secret(session_secret: bytes, key_context: dict) -> bytes:
+    """
+    Per-file AES-256 key from a KEM session secret.
+    The session id is the salt; file id and counter go into info,
+    so no two files of a session share a key.
+    """
+
+    hkdf = HKDF(
+        algorithm=hashes.SHA256(),
+        length=32,  # AES-256
+        salt=bytes.fromhex(key_context["session_id"]),
+        info=(
+            b"pqc-document-encryption/file"
+            + bytes.fromhex(key_context["file_id"])
+            + struct.pack(">Q", key_context["counter"])
+        ),
+        backend=default_backend()
+    )
+
+    return hkdf.derive(session_secret)
+
+
 
 
 # ======================================================
 # Binary-safe hashing for PQC workflow
 # ======================================================
 
+def new_file_hasher():
+    """
+    Hash object for the signed digest (SHA-512 over the .enc file,
+    then the Kyber ciphertext). Lets the sender hash while encrypting.
+    """
+    return hashlib.sha512()
+
+
 def compute_hash_from_encrypted_file_and_kyber_ct(
     encrypted_file_path: str,
-    kyber_ct_path: str
+    kyber_ct
 ) -> bytes:
     """
     Computes SHA-512 hash over:
     1. Encrypted document (.enc file)
-    2. Kyber ciphertext (.bin)
+    2. Kyber ciphertext (raw bytes, or path to the .bin file)
 
     Returns:
         hash bytes (64 bytes)
@@ -48,10 +80,10 @@ def compute_hash_from_encrypted_file_and_kyber_ct(
     if not os.path.exists(encrypted_file_path):
         raise FileNotFoundError(f"Encrypted file not found: {encrypted_file_path}")
 
-    if not os.path.exists(kyber_ct_path):
-        raise FileNotFoundError(f"Kyber ciphertext not found: {kyber_ct_path}")
+    if not isinstance(kyber_ct, bytes) and not os.path.exists(kyber_ct):
+        raise FileNotFoundError(f"Kyber ciphertext not found: {kyber_ct}")
 
-    hasher = hashlib.sha512()
+    hasher = new_file_hasher()
 
     # Read encrypted document (binary)
     with open(encrypted_file_path, "rb") as f:
@@ -61,12 +93,211 @@ def compute_hash_from_encrypted_file_and_kyber_ct(
                 break
             hasher.update(chunk)
 
+    # Kyber ciphertext already in memory
+    if isinstance(kyber_ct, bytes):
+        hasher.update(kyber_ct)
+        return hasher.digest()
+
     # Read Kyber ciphertext (binary)
-    with open(kyber_ct_path, "rb") as f:
+    with open(kyber_ct, "rb") as f:
         while True:
             chunk = f.read(4096)
             if not chunk:
                 break
             hasher.update(chunk)
 
-    return hasher.digest()
\ No newline at end of file
+    return hasher.digest()
+
+
+# ======================================================
+# Merkle manifest (parallel, per-chunk integrity)
+# ======================================================
+#
+# Leaves are SHA-512 digests of fixed-size byte ranges of the .enc file,
+# plus one leaf for the Kyber ciphertext. Dilithium signs the root, so a
+# receiver can check every chunk independently against the manifest.
+# Domain-separation prefixes keep leaves and inner nodes distinct.
+
+MANIFEST_VERSION = 1
+_LEAF_PREFIX = b"\x00"
+_NODE_PREFIX = b"\x01"
+_KYBER_LEAF_PREFIX = b"\x02"
+
+
+def _new_leaf_hasher(index: int):
+    return hashlib.sha512(_LEAF_PREFIX + struct.pack(">Q", index))
+
+
+def _chunk_leaf(index: int, data: bytes) -> bytes:
+    leaf = _new_leaf_hasher(index)
+    leaf.update(data)
+    return leaf.digest()
+
+
+def _kyber_leaf(kyber_ct: bytes) -> bytes:
+    return hashlib.sha512(_KYBER_LEAF_PREFIX + kyber_ct).digest()
+
+
+def merkle_root(leaves: list) -> bytes:
+    """Root of a binary Merkle tree (an odd last node is carried up)"""
+    if not leaves:
+        raise ValueError("Merkle tree needs at least one leaf")
+
+    level = list(leaves)
+    while len(level) > 1:
+        next_level = [
+            hashlib.sha512(_NODE_PREFIX + level[i] + level[i + 1]).digest()
+            for i in range(0, len(level) - 1, 2)
+        ]
+        if len(level) % 2:
+            next_level.append(level[-1])
+        level = next_level
+
+    return level[0]
+
+
+def _hash_chunks_parallel(file_path: str, chunk_size: int, workers: int):
+    """
+    Yields (index, leaf digest) for every chunk, in order.
+    hashlib releases the GIL, so chunks are hashed on a thread pool.
+    """
+    file_size = os.path.getsize(file_path)
+    chunk_count = max(1, -(-file_size // chunk_size))
+
+    with open(file_path, "rb") as f:
+        fd = f.fileno()
+
+        def hash_chunk(index):
+            return _chunk_leaf(index, os.pread(fd, chunk_size, index * chunk_size))
+
+        pool = ThreadPoolExecutor(max_workers=max(1, workers))
+        try:
+            futures = [pool.submit(hash_chunk, index) for index in range(chunk_count)]
+            for index, future in enumerate(futures):
+                yield index, future.result()
+        finally:
+            # Stops pending chunks when the caller bails out early
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+class MerkleHasher:
+    """
+    Builds the Merkle manifest from the bytes of the .enc file as they
+    are written (same update() interface as new_file_hasher), so
+    manifest mode needs no second pass over the file.
+    """
+
+    def __init__(self, chunk_size: int):
+        self.chunk_size = chunk_size
+        self.file_size = 0
+        self._leaves = []
+        self._leaf = _new_leaf_hasher(0)
+        self._filled = 0
+
+    def update(self, data: bytes):
+        view = memoryview(data)
+        while view:
+            take = min(len(view), self.chunk_size - self._filled)
+            self._leaf.update(view[:take])
+            self._filled += take
+            self.file_size += take
+            view = view[take:]
+            if self._filled == self.chunk_size:
+                self._leaves.append(self._leaf.digest())
+                self._leaf = _new_leaf_hasher(len(self._leaves))
+                self._filled = 0
+
+    def manifest(self, kyber_ct: bytes) -> dict:
+        """
+        Returns:
+            { version, chunk_size, file_size, leaves (hex), root (bytes) }
+        """
+        leaves = list(self._leaves)
+        if self._filled or not leaves:
+            leaves.append(self._leaf.digest())
+
+        return {
+            "version": MANIFEST_VERSION,
+            "chunk_size": self.chunk_size,
+            "file_size": self.file_size,
+            "leaves": [leaf.hex() for leaf in leaves],
+            "root": merkle_root(leaves + [_kyber_leaf(kyber_ct)])
+        }
+
+
+def manifest_root(manifest: dict, kyber_ct: bytes) -> bytes:
+    """
+    Recomputes the Merkle root from a received manifest and the
+    received Kyber ciphertext. This is the value the signature covers.
+    """
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise ValueError("Unsupported manifest version")
+
+    leaves = [bytes.fromhex(leaf) for leaf in manifest["leaves"]]
+    return merkle_root(leaves + [_kyber_leaf(kyber_ct)])
+
+
+def verify_file_against_manifest(encrypted_file_path: str, manifest: dict, workers: int = 1):
+    """
+    Checks every chunk of the received file against the manifest,
+    in parallel. Raises at the first corrupt chunk.
+    """
+    chunk_size = manifest["chunk_size"]
+    leaves = manifest["leaves"]
+
+    if os.path.getsize(encrypted_file_path) != manifest["file_size"]:
+        raise ValueError("Encrypted file size does not match manifest")
+    if max(1, -(-manifest["file_size"] // chunk_size)) != len(leaves):
+        raise ValueError("Manifest chunk count does not match file size")
+
+    for index, leaf in _hash_chunks_parallel(encrypted_file_path, chunk_size, workers):
+        if leaf.hex() != leaves[index]:
+            raise ValueError(f"Encrypted file corrupt at chunk {index}")
+
+
+class ChunkLeafChecker:
+    """
+    Checks the bytes of one received range [offset, offset + length)
+    of the .enc file against the manifest while they arrive. Manifest
+    chunks that lie wholly inside the range are hashed and compared;
+    a chunk cut by the range boundary is left to the final check.
+    update() raises ValueError at the first corrupt chunk.
+    """
+
+    def __init__(self, manifest: dict, offset: int, length: int):
+        self.chunk_size = manifest["chunk_size"]
+        self.leaves = manifest["leaves"]
+        self.file_size = manifest["file_size"]
+        self.end = offset + length
+        self.position = offset
+
+        self.index = -(-offset // self.chunk_size)
+        self._leaf = None
+        if self._chunk_end(self.index) <= self.end and self.index < len(self.leaves):
+            self._leaf = _new_leaf_hasher(self.index)
+
+    def _chunk_end(self, index: int) -> int:
+        return min((index + 1) * self.chunk_size, self.file_size)
+
+    def update(self, data: bytes):
+        view = memoryview(data)
+        while view and self._leaf is not None:
+            start = self.index * self.chunk_size
+            if self.position < start:
+                skip = min(len(view), start - self.position)
+                view = view[skip:]
+                self.position += skip
+                continue
+
+            take = min(len(view), self._chunk_end(self.index) - self.position)
+            self._leaf.update(view[:take])
+            view = view[take:]
+            self.position += take
+
+            if self.position == self._chunk_end(self.index):
+                if self._leaf.hexdigest() != self.leaves[self.index]:
+                    raise ValueError(f"Encrypted file corrupt at chunk {self.index}")
+                self.index += 1
+                self._leaf = None
+                if self._chunk_end(self.index) <= self.end and self.index < len(self.leaves):
+                    self._leaf = _new_leaf_hasher(self.index)
@@ -0,0 +1,223 @@
+import json
+import time
+import socket
+import threading
+
+from app.extensions import app_state
+from app.utils.network_utils import DISCOVERY_PORT
+
+
+# ======================================================
+# Peer discovery (background listener + peer table)
+# ======================================================
+#
+# Receivers broadcast RECEIVER_AVAILABLE to DISCOVERY_PORT every few
+# seconds (network_utils.broadcast_receiver). One listener thread,
+# started with the app, records every announcement in a peer table;
+# /sender/discover answers from that table instead of binding the
+# port and blocking a request thread until the first broadcast.
+
+DISCOVERY_POLL_INTERVAL = 1.0   # seconds between stop checks
+DISCOVERY_BIND_RETRY = 5.0      # seconds between bind attempts
+DISCOVERY_MAX_WAIT = 10         # longest "wait" a discover request may ask for
+DISCOVERY_DEFAULT_WAIT = 3      # about one broadcast interval
+
+
+class PeerTable:
+    """
+    Receivers heard recently, keyed by (ip, port). Entries expire
+    ttl seconds after their last announcement.
+    """
+
+    def __init__(self, ttl: float = 15.0):
+        self.ttl = ttl
+        self._peers = {}
+        self._changed = threading.Condition()
+
+    def update(self, message: dict, source_ip: str):
+        """Records one RECEIVER_AVAILABLE announcement"""
+        ip = message.get("ip") or source_ip
+        port = int(message["port"])
+        now = time.time()
+
+        with self._changed:
+            peer = self._peers.get((ip, port))
+            if peer is None:
+                peer = self._peers[(ip, port)] = {"ip": ip, "port": port, "first_seen": now}
+                print(f"Discovered receiver {message.get('name')} at {ip}:{port}")
+            peer.update(name=message.get("name"), source_ip=source_ip, last_seen=now)
+            self._changed.notify_all()
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+        for key in [k for k, peer in self._peers.items() if peer["last_seen"] < cutoff]:
+            del self._peers[key]
+
+    def peers(self) -> list:
+        """Live peers, most recently seen first"""
+        with self._changed:
+            self._expire()
+            peers = [dict(peer) for peer in self._peers.values()]
+        return sorted(peers, key=lambda peer: peer["last_seen"], reverse=True)
+
+    def wait_for_peer(self, timeout: float) -> list:
+        """peers(), waiting up to timeout seconds while the table is empty"""
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while True:
+                self._expire()
+                remaining = deadline - time.monotonic()
+                if self._peers or remaining <= 0:
+                    break
+                self._changed.wait(remaining)
+        return self.peers()
+
+    def clear(self):
+        with self._changed:
+            self._peers.clear()
+
+
+class DiscoveryListener:
+    """Listens for receiver broadcasts on DISCOVERY_PORT until stopped"""
+
+    def __init__(self, table: PeerTable, port: int = DISCOVERY_PORT):
+        self.table = table
+        self.port = port
+        self.listening = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="peer-discovery", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _bind(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if hasattr(socket, "SO_REUSEPORT"):
+            # Lets a sender and a receiver on the same host both listen
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind(("", self.port))
+        sock.settimeout(DISCOVERY_POLL_INTERVAL)
+        return sock
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                sock = self._bind()
+            except OSError as e:
+                print(f"Peer discovery: cannot bind port {self.port} ({e}), retrying")
+                self._stop.wait(DISCOVERY_BIND_RETRY)
+                continue
+
+            self.listening = True
+            try:
+                while not self._stop.is_set():
+                    try:
+                        data, addr = sock.recvfrom(4096)
+                    except socket.timeout:
+                        continue
+
+                    # Anyone on the LAN can reach this port: no datagram
+                    # may take the listener down
+                    try:
+                        message = json.loads(data.decode())
+                        if isinstance(message, dict) and message.get("type") == "RECEIVER_AVAILABLE":
+                            self.table.update(message, addr[0])
+                    except Exception as e:
+                        print(f"Ignoring malformed discovery message from {addr[0]}: {e}")
+            except Exception as e:
+                print(f"Peer discovery socket error: {e}, rebinding")
+                self._stop.wait(DISCOVERY_POLL_INTERVAL)
+            finally:
+                self.listening = False
+                sock.close()
+
+
+peer_table = PeerTable()
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def start_discovery(app):
+    """Starts the process-wide discovery listener (once) at app start"""
+    global _listener
+    if not app.config["PEER_DISCOVERY_ENABLED"]:
+        return
+
+    with _listener_lock:
+        peer_table.ttl = app.config["PEER_DISCOVERY_TTL"]
+        if _listener is None:
+            _listener = DiscoveryListener(peer_table)
+        _listener.start()
+
+
+def discovery_listening() -> bool:
+    return _listener is not None and _listener.listening
+
+
+def pick_peer(peers: list, ip: str = None, name: str = None):
+    """Most recently seen peer matching ip / name (if given), or None"""
+    for peer in peers:
+        if (not ip or peer["ip"] == ip) and (not name or peer.get("name") == name):
+            return peer
+    return None
+
+
+def peer_summary(peer: dict) -> dict:
+    """A peer as reported by the discover routes"""
+    return {
+        "ip": peer["ip"],
+        "port": peer["port"],
+        "name": peer.get("name"),
+        "last_seen": peer["last_seen"],
+        "age": round(time.time() - peer["last_seen"], 3)
+    }
+
+
+def discover_response(data: dict):
+    """
+    Body of /sender/discover and /pqc/sender/discover: selects a
+    receiver (by receiver_ip / receiver_name, default the most
+    recently seen) and lists every live peer. "wait" (seconds, at
+    most DISCOVERY_MAX_WAIT) only applies while the table is empty.
+    The chosen receiver is recorded in app_state.
+
+    Returns:
+        (response body, status code)
+    """
+    try:
+        wait = min(max(float(data.get("wait", DISCOVERY_DEFAULT_WAIT)), 0), DISCOVERY_MAX_WAIT)
+    except (TypeError, ValueError):
+        return {"error": "wait must be a number"}, 400
+    peers = peer_table.wait_for_peer(wait) if wait else peer_table.peers()
+
+    peer = pick_peer(peers, data.get("receiver_ip"), data.get("receiver_name"))
+    if peer is None:
+        return {
+            "error": "No receiver found",
+            "listening": discovery_listening(),
+            "peers": [peer_summary(p) for p in peers]
+        }, 404
+
+    ip, port, name = peer["ip"], peer["port"], peer.get("name")
+    print(f"Discovered receiver at {ip}:{port} with name {name}")
+    app_state.receiver_ip = ip
+    app_state.receiver_port = port
+    app_state.receiver_name = name
+
+    return {
+        "message": "Receiver discovered",
+        "receiver_ip": ip,
+        "receiver_port": port,
+        "receiver_name": name,
+        "peers": [peer_summary(p) for p in peers]
+    }, 200
@@ -30,9 +30,10 @@ def encrypt_file(input_path, output_dir):
 
     return output_path
 
-def aes_encrypt_file(input_path, output_dir):
+def aes_encrypt_file(input_path, output_dir, hasher=None):
     """
     Encrypts a file using AES-256-CBC
+    hasher (optional) is updated with the bytes written to disk
     Returns: (encrypted_file_path, aes_key, iv)
     """
 
@@ -65,6 +66,10 @@ def aes_encrypt_file(input_path, output_dir):
         # prepend IV for later decryption
         f.write(iv + ciphertext)
 
+    if hasher is not None:
+        hasher.update(iv)
+        hasher.update(ciphertext)
+
     return encrypted_path, aes_key
 
 def aes_decrypt_file(encrypted_path, output_dir, aes_key,original_filename):
@@ -1,5 +1,11 @@
 import os
+import json
+import tempfile
 from werkzeug.utils import secure_filename
+from werkzeug.formparser import parse_form_data
+from flask import send_file, Response
+
+from app.services.archive_service import collect_directory_entries, TarStreamReader
 
 def save_uploaded_file(file, upload_dir):
     if not os.path.exists(upload_dir):
@@ -11,4 +17,209 @@ def save_uploaded_file(file, upload_dir):
 
     file.save(file_path)
     return file_path
-   
+
+
+# ======================================================
+# Streaming download (sendfile, Range, ETag)
+# ======================================================
+
+def stream_file_response(directory: str, filename: str):
+    """
+    Streams a stored file without loading it into Python.
+    Supports HTTP Range requests and ETag / If-None-Match.
+
+    Returns:
+        Flask response, or None if the file does not exist
+    """
+    if not filename or secure_filename(filename) != filename:
+        return None
+
+    return send_stored_file(os.path.join(directory, filename), filename)
+
+
+def send_stored_file(path: str, download_name: str, on_complete=None):
+    """
+    Same as stream_file_response for a known on-disk path
+    (e.g. a receiver inbox entry) served under download_name.
+
+    on_complete() runs only once every byte of a 200 body has been
+    handed to the server; an aborted download, Range (206) and 304
+    responses leave the file alone. Counting the bytes means the
+    body is iterated in Python, so such downloads skip sendfile.
+    """
+    if not os.path.isfile(path):
+        return None
+
+    response = send_file(
+        path,
+        mimetype="application/octet-stream",
+        as_attachment=True,
+        download_name=download_name,
+        conditional=True,
+        etag=True,
+        max_age=0
+    )
+
+    # close() also runs when the client goes away mid-download, so
+    # count what was actually sent instead of relying on it
+    if on_complete is not None and response.status_code == 200:
+        response.response = _run_when_sent(
+            response.response, response.content_length, on_complete
+        )
+
+    return response
+
+
+def _run_when_sent(body, expected: int, on_complete):
+    sent = 0
+    try:
+        for block in body:
+            sent += len(block)
+            yield block
+    finally:
+        if hasattr(body, "close"):
+            body.close()
+
+    if sent == expected:
+        on_complete()
+
+
+def send_directory_archive(path: str, download_name: str, on_complete=None):
+    """
+    Streams a received directory as a tar built on the fly (nothing
+    is written to disk), as download_name + ".tar". No Range support.
+
+    on_complete() runs only once the whole archive has been sent.
+    """
+    if not os.path.isdir(path):
+        return None
+
+    reader = TarStreamReader(collect_directory_entries(path))
+
+    def generate():
+        yield from reader
+        if on_complete is not None:
+            on_complete()
+
+    return Response(
+        generate(),
+        mimetype="application/x-tar",
+        headers={
+            "Content-Length": str(reader.size),
+            "Content-Disposition": f'attachment; filename="{secure_filename(download_name) or "archive"}.tar"',
+            "Cache-Control": "no-cache"
+        }
+    )
+
+
+# ======================================================
+# Streaming receive (hash while spooling to disk)
+# ======================================================
+
+SPOOL_BUFFER_SIZE = 1024 * 1024  # 1 MB
+
+
+class HashingSpoolFile:
+    """
+    Writable spool file that feeds every byte written to it
+    into `hasher`, so the upload is hashed as it arrives.
+    """
+
+    def __init__(self, path: str, hasher):
+        self._file = open(path, "w+b", buffering=SPOOL_BUFFER_SIZE)
+        self.path = path
+        self.hasher = hasher
+        self.bytes_written = 0
+
+    def write(self, data):
+        self.hasher.update(data)
+        self.bytes_written += len(data)
+        return self._file.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+
+def stream_upload_to_spool(environ, spool_path: str, hasher, max_content_length=None):
+    """
+    Parses a multipart request body, streaming the first uploaded file
+    directly into spool_path while updating hasher. The body is never
+    held in memory.
+
+    Returns:
+        (form, files, spool) — spool is None if no file was uploaded
+    Raises:
+        whatever parsing raised (e.g. RequestEntityTooLarge, client
+        disconnect), after closing and deleting the partial spool file
+    """
+    spools = []
+
+    def stream_factory(total_content_length, content_type, filename, content_length=None):
+        if not spools:
+            spools.append(HashingSpoolFile(spool_path, hasher))
+            return spools[0]
+        # Unexpected extra file parts go to an anonymous temp file
+        return tempfile.TemporaryFile("w+b")
+
+    try:
+        _, form, files = parse_form_data(
+            environ,
+            stream_factory=stream_factory,
+            max_content_length=max_content_length
+        )
+    except Exception:
+        if spools:
+            spools[0].close()
+            if os.path.exists(spool_path):
+                os.remove(spool_path)
+        raise
+
+    spool = spools[0] if spools else None
+    if spool is not None:
+        spool.flush()
+
+    return form, files, spool
+
+
+# ======================================================
+# Merkle manifest sidecar (<file>.enc.manifest.json)
+# ======================================================
+
+def manifest_sidecar_path(encrypted_path: str) -> str:
+    return encrypted_path + ".manifest.json"
+
+
+def save_manifest_sidecar(encrypted_path: str, manifest: dict):
+    with open(manifest_sidecar_path(encrypted_path), "w") as f:
+        json.dump(manifest, f)
+
+
+def load_manifest_sidecar(encrypted_path: str):
+    """Returns the manifest JSON string, or None if the file has none"""
+    path = manifest_sidecar_path(encrypted_path)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return f.read()
+
+
+# ======================================================
+# Session key context sidecar (<file>.enc.key.json)
+# ======================================================
+
+def key_context_sidecar_path(encrypted_path: str) -> str:
+    return encrypted_path + ".key.json"
+
+
+def save_key_context_sidecar(encrypted_path: str, key_context: dict):
+    with open(key_context_sidecar_path(encrypted_path), "w") as f:
+        json.dump(key_context, f)
+
+
+def load_key_context_sidecar(encrypted_path: str):
+    """Returns the key context JSON string, or None for per-file KEM"""
+    path = key_context_sidecar_path(encrypted_path)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return f.read()
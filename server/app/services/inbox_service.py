@@ -0,0 +1,358 @@
+import os
+import re
+import json
+import time
+import queue
+import sqlite3
+import threading
+from collections import deque
+from app.services.pqc_encryption_service import PARTIAL_SUFFIX
+from app.services.archive_service import payload_size, remove_payload
+
+
+# ======================================================
+# Durable inbox index (SQLite, WAL, group commit)
+# ======================================================
+#
+# The in-memory inbox stays authoritative for the hot path; every
+# change is mirrored to SQLite by a single writer thread that commits
+# whatever has queued up in one transaction. With WAL and
+# synchronous=NORMAL a commit does not fsync, so /decrypt never waits
+# on the disk. A crash can lose at most the last batch, which startup
+# recovery picks up again from the spool directory.
+
+INBOX_COLUMNS = ("id", "queue", "filename", "sender", "status", "file_size", "path", "received_at")
+
+# Received files are stored as "<uuid>_<secure filename>"
+SPOOL_NAME_PATTERN = re.compile(r"^([0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})_(.+)$")
+
+
+def _json_default(value):
+    return value.hex() if isinstance(value, bytes) else str(value)
+
+
+class InboxStore:
+    """SQLite mirror of the receiver inboxes"""
+
+    def __init__(self, db_path: str, batch_size: int = 256, batch_interval: float = 0.05):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self._pending = queue.Queue()
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS inbox ("
+                " id TEXT PRIMARY KEY, queue TEXT NOT NULL, filename TEXT,"
+                " sender TEXT, status TEXT, file_size INTEGER, path TEXT,"
+                " received_at REAL, metadata TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS inbox_status ON inbox (queue, status, received_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS inbox_sender ON inbox (queue, sender, received_at)")
+        conn.close()
+
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    # ------------------------------------------------------
+    # Writes (queued, group-committed)
+    # ------------------------------------------------------
+
+    def upsert(self, queue_name: str, entry: dict):
+        metadata = {k: v for k, v in entry.items() if k not in INBOX_COLUMNS}
+        self._pending.put((
+            "INSERT OR REPLACE INTO inbox VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                entry["id"], queue_name, entry.get("filename"), entry.get("sender"),
+                entry.get("status"), entry.get("file_size"), entry.get("path"),
+                entry.get("received_at"), json.dumps(metadata, default=_json_default)
+            )
+        ))
+
+    def set_status(self, file_id: str, status: str):
+        self._pending.put(("UPDATE inbox SET status = ? WHERE id = ?", (status, file_id)))
+
+    def delete(self, file_id: str):
+        self._pending.put(("DELETE FROM inbox WHERE id = ?", (file_id,)))
+
+    def flush(self, timeout: float = 5.0):
+        """Blocks until everything queued so far is committed"""
+        done = threading.Event()
+        self._pending.put(done)
+        done.wait(timeout)
+
+    def _write_loop(self):
+        conn = self._connect()
+        while True:
+            batch = [self._pending.get()]
+            deadline = time.monotonic() + self.batch_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._pending.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                with conn:
+                    for item in batch:
+                        if not isinstance(item, threading.Event):
+                            conn.execute(*item)
+            except sqlite3.Error as e:
+                print(f"Inbox index write failed ({len(batch)} ops): {e}")
+
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+
+    # ------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------
+
+    def _row_to_entry(self, row) -> dict:
+        entry = {k: row[k] for k in INBOX_COLUMNS if k != "queue"}
+        entry.update(json.loads(row["metadata"] or "{}"))
+        return entry
+
+    def load(self, queue_name: str) -> list:
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT * FROM inbox WHERE queue = ? ORDER BY received_at", (queue_name,)
+            ).fetchall()
+        finally:
+            conn.close()
+        return [self._row_to_entry(row) for row in rows]
+
+    def known_ids(self) -> set:
+        conn = self._connect()
+        try:
+            return {row["id"] for row in conn.execute("SELECT id FROM inbox")}
+        finally:
+            conn.close()
+
+    def query(self, queue_name: str, sender=None, status=None, limit: int = 50, offset: int = 0):
+        """Returns (entries, total) for one page"""
+        where, params = ["queue = ?"], [queue_name]
+        if sender:
+            where.append("sender = ?")
+            params.append(sender)
+        if status:
+            where.append("status = ?")
+            params.append(status)
+        clause = " AND ".join(where)
+
+        conn = self._connect()
+        try:
+            total = conn.execute(f"SELECT COUNT(*) FROM inbox WHERE {clause}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT * FROM inbox WHERE {clause} ORDER BY received_at LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+        finally:
+            conn.close()
+        return [self._row_to_entry(row) for row in rows], total
+
+
+# ======================================================
+# Receiver inbox (metadata only, payloads stay on disk)
+# ======================================================
+
+class ReceivedInbox:
+    """
+    Indexed queue of received files.
+
+    - add / next_file are O(1) (deque of ids)
+    - get / remove by id are O(1) (dict)
+    - entries hold metadata and the on-disk path, never file contents
+    - once attached to an InboxStore, every change is persisted
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.store = None
+        self._lock = threading.Lock()
+        self._pending = deque()
+        self._entries = {}
+
+    def add(self, entry: dict):
+        entry.setdefault("received_at", time.time())
+        with self._lock:
+            self._entries[entry["id"]] = entry
+            self._pending.append(entry["id"])
+        if self.store is not None:
+            self.store.upsert(self.name, entry)
+
+    def next_file(self):
+        """Oldest entry not yet handed out, or None"""
+        with self._lock:
+            while self._pending:
+                entry = self._entries.get(self._pending.popleft())
+                if entry is not None:
+                    entry["status"] = "DELIVERED"
+                    break
+            else:
+                return None
+
+        if self.store is not None:
+            self.store.set_status(entry["id"], "DELIVERED")
+        return entry
+
+    def get(self, file_id: str):
+        with self._lock:
+            return self._entries.get(file_id)
+
+    def remove(self, file_id: str, delete_file: bool = True):
+        """Forgets an entry (lazily skipped by next_file) and deletes its payload"""
+        with self._lock:
+            entry = self._entries.pop(file_id, None)
+
+        if entry is None:
+            return None
+
+        if self.store is not None:
+            self.store.delete(file_id)
+
+        if delete_file:
+            try:
+                # Received archives are unpacked into a directory
+                remove_payload(entry["path"])
+            except Exception as e:
+                print(f"Failed to delete file from disk: {e}")
+
+        return entry
+
+    def list(self, sender=None, status=None, limit: int = 50, offset: int = 0):
+        """One page of entries, oldest first. Returns (entries, total)"""
+        if self.store is not None:
+            self.store.flush()
+            return self.store.query(self.name, sender, status, limit, offset)
+
+        with self._lock:
+            entries = [
+                e for e in self._entries.values()
+                if (not sender or e.get("sender") == sender)
+                and (not status or e.get("status") == status)
+            ]
+        return entries[offset:offset + limit], len(entries)
+
+    def __len__(self):
+        """Entries still held (queued or handed out but not yet downloaded)"""
+        with self._lock:
+            return len(self._entries)
+
+    # ------------------------------------------------------
+    # Persistence / startup recovery
+    # ------------------------------------------------------
+
+    def attach(self, store: InboxStore, spool_dir: str = None):
+        """
+        Binds the inbox to `store` and rebuilds it:
+        - indexed entries whose file still exists are re-queued
+          (DELIVERED ones too: the client that fetched them is gone)
+        - indexed entries whose file is missing are dropped
+        - if spool_dir is given, received files that never made it
+          into the index are added with status RECOVERED
+        """
+        self.store = store
+        restored = dropped = recovered = 0
+
+        with self._lock:
+            self._entries.clear()
+            self._pending.clear()
+
+        for entry in store.load(self.name):
+            if entry.get("path") and os.path.exists(entry["path"]):
+                entry["status"] = "READY"
+                with self._lock:
+                    self._entries[entry["id"]] = entry
+                    self._pending.append(entry["id"])
+                store.set_status(entry["id"], "READY")
+                restored += 1
+            else:
+                store.delete(entry["id"])
+                dropped += 1
+
+        if spool_dir and os.path.isdir(spool_dir):
+            known = store.known_ids()
+            spooled = []
+            for name in os.listdir(spool_dir):
+                path = os.path.join(spool_dir, name)
+                if name.endswith(PARTIAL_SUFFIX):
+                    # Decryption was interrupted; never surface partial plaintext
+                    remove_payload(path)
+                    continue
+                match = SPOOL_NAME_PATTERN.match(name)
+                if match and match.group(1) not in known and os.path.exists(path):
+                    spooled.append((os.path.getmtime(path), match, path))
+
+            for mtime, match, path in sorted(spooled, key=lambda s: s[0]):
+                self.add({
+                    "id": match.group(1),
+                    "filename": match.group(2),
+                    "sender": None,
+                    "file_size": payload_size(path),
+                    "kind": "directory" if os.path.isdir(path) else "file",
+                    "path": path,
+                    "received_at": mtime,
+                    "status": "RECOVERED"
+                })
+                recovered += 1
+
+        print(
+            f"Inbox '{self.name}': {restored} restored, "
+            f"{recovered} recovered from spool, {dropped} dropped"
+        )
+
+
+# ======================================================
+# Paging helper for the /inbox routes
+# ======================================================
+
+INBOX_PAGE_MAX = 500
+
+
+def inbox_page(inbox: ReceivedInbox, args, download_prefix: str) -> dict:
+    """
+    One page of inbox metadata for ?sender=&status=&limit=&offset=.
+    Raises ValueError for non-numeric limit / offset.
+    """
+    limit = min(max(int(args.get("limit", 50)), 1), INBOX_PAGE_MAX)
+    offset = max(int(args.get("offset", 0)), 0)
+
+    entries, total = inbox.list(
+        sender=args.get("sender"),
+        status=args.get("status", "").upper() or None,
+        limit=limit,
+        offset=offset
+    )
+
+    return {
+        "files": [
+            {
+                "id": e["id"],
+                "filename": e.get("filename"),
+                "sender": e.get("sender"),
+                "status": e.get("status"),
+                "file_size": e.get("file_size"),
+                "kind": e.get("kind", "file"),
+                "received_at": e.get("received_at"),
+                "download_url": f"{download_prefix}/{e['id']}"
+            }
+            for e in entries
+        ],
+        "total": total,
+        "limit": limit,
+        "offset": offset
+    }
@@ -0,0 +1,180 @@
+import time
+import uuid
+import queue
+import threading
+
+
+# ======================================================
+# Background job queue (bounded, fixed worker pool)
+# ======================================================
+#
+# Requests hand work to the queue and return a job id straight away.
+# A fixed number of worker threads run the jobs inside the Flask app
+# context; each job reports the stage it is in so clients can poll
+# (or stream) progress and fetch the result when it is done.
+
+JOB_QUEUED = "QUEUED"
+JOB_RUNNING = "RUNNING"
+JOB_DONE = "DONE"
+JOB_FAILED = "FAILED"
+
+JOB_FINAL_STATES = (JOB_DONE, JOB_FAILED)
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue is at its configured depth"""
+
+
+class Job:
+    def __init__(self, kind: str, stages: tuple):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.stages = stages
+        self.status = JOB_QUEUED
+        self.stage = None
+        self.result = None
+        self.error = None
+        self.items = []
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self.version = 0
+        self.changed = threading.Condition()
+
+    def _update(self, **fields):
+        with self.changed:
+            for key, value in fields.items():
+                setattr(self, key, value)
+            self.updated_at = time.time()
+            self.version += 1
+            self.changed.notify_all()
+
+    def set_stage(self, stage: str):
+        """Progress callback handed to the workflow"""
+        self._update(stage=stage)
+
+    def add_item(self, item: dict):
+        """Partial result (e.g. one file of a batch), visible before the job ends"""
+        with self.changed:
+            self.items.append(item)
+            self.updated_at = time.time()
+            self.version += 1
+            self.changed.notify_all()
+
+    def wait_for_change(self, version: int, timeout: float) -> int:
+        """Blocks until the job changes past `version` (or timeout); returns the new version"""
+        with self.changed:
+            self.changed.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+    def to_dict(self, include_result: bool = True) -> dict:
+        data = {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "stage": self.stage,
+            "stages": list(self.stages),
+            "progress": (
+                1.0 if self.status == JOB_DONE else
+                (self.stages.index(self.stage) / len(self.stages) if self.stage in self.stages else 0.0)
+            ),
+            "created_at": self.created_at,
+            "updated_at": self.updated_at
+        }
+        if self.error is not None:
+            data["error"] = self.error
+        if self.items:
+            data["items"] = list(self.items)
+        if include_result and self.status == JOB_DONE:
+            data["result"] = self.result
+        return data
+
+
+class JobQueue:
+    """
+    Bounded FIFO of jobs served by `workers` threads.
+    Finished jobs are kept for `retention` seconds so results can be fetched.
+    """
+
+    def __init__(self, app, workers: int, depth: int, retention: float):
+        self.app = app
+        self.retention = retention
+        self._queue = queue.Queue(maxsize=depth)
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+        for i in range(workers):
+            threading.Thread(
+                target=self._worker, name=f"job-worker-{i}", daemon=True
+            ).start()
+
+    def submit(self, kind: str, stages: tuple, func, *args) -> Job:
+        """
+        Enqueues func(job, *args); its return value becomes job.result.
+        Raises QueueFullError instead of blocking the request.
+        """
+        self._expire()
+        job = Job(kind, stages)
+        with self._lock:
+            self._jobs[job.id] = job
+        try:
+            self._queue.put_nowait((job, func, args))
+        except queue.Full:
+            with self._lock:
+                self._jobs.pop(job.id, None)
+            raise QueueFullError(f"Job queue is full ({self._queue.maxsize} pending)")
+        return job
+
+    def get(self, job_id: str):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return {
+            "queued": self._queue.qsize(),
+            "depth": self._queue.maxsize,
+            "running": sum(1 for j in jobs if j.status == JOB_RUNNING),
+            "tracked": len(jobs)
+        }
+
+    def _expire(self):
+        cutoff = time.time() - self.retention
+        with self._lock:
+            for job_id in [
+                j.id for j in self._jobs.values()
+                if j.status in JOB_FINAL_STATES and j.updated_at < cutoff
+            ]:
+                del self._jobs[job_id]
+
+    def _worker(self):
+        while True:
+            job, func, args = self._queue.get()
+            job._update(status=JOB_RUNNING)
+            try:
+                with self.app.app_context():
+                    result = func(job, *args)
+                job._update(status=JOB_DONE, stage=None, result=result)
+            except Exception as e:
+                print(f"Job {job.id} ({job.kind}) failed: {e}")
+                job._update(status=JOB_FAILED, error=str(e))
+            finally:
+                self._queue.task_done()
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue(app) -> JobQueue:
+    """Process-wide job queue, sized from PQC_JOB_WORKERS / PQC_JOB_QUEUE_DEPTH"""
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue(
+                app,
+                app.config["PQC_JOB_WORKERS"],
+                app.config["PQC_JOB_QUEUE_DEPTH"],
+                app.config["PQC_JOB_RETENTION"]
+            )
+        return _job_queue
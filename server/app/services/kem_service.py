@@ -1,7 +1,7 @@
 from cryptography.hazmat.primitives.asymmetric import rsa, padding
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives import serialization
+from app.services.keystore_service import peer_key_cache
 
 def generate_rsa_keypair():
     """
@@ -20,12 +20,7 @@ def rsa_encrypt_key(aes_key, public_key_pem):
     """
     Encrypts (wraps) AES key using RSA public key.
     """
-    if isinstance(public_key_pem, str):
-        public_key_pem = public_key_pem.encode('utf-8')
-    public_key = serialization.load_pem_public_key(
-        public_key_pem,
-        backend=default_backend()
-    )
+    public_key = peer_key_cache.load_pem_public_key(public_key_pem)
     encrypted_key = public_key.encrypt(
         aes_key,
         padding.OAEP(
@@ -4,6 +4,7 @@ from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives.asymmetric import padding
 from cryptography.hazmat.primitives import hashes
+from app.services.keystore_service import keystore
 
 KEY_DIR = "keys"
 
@@ -12,6 +13,22 @@ def ensure_key_dir():
     os.makedirs(KEY_DIR, exist_ok=True)
 
 
+# Parsed key objects are cached in the keystore (re-parsed only on change)
+def _parse_private_key(pem: bytes):
+    return serialization.load_pem_private_key(
+        pem,
+        password=None,
+        backend=default_backend()
+    )
+
+
+def _parse_public_key(pem: bytes):
+    return serialization.load_pem_public_key(
+        pem,
+        backend=default_backend()
+    )
+
+
 # ---------------- RSA (Receiver) ----------------
 
 def generate_rsa_keys():
@@ -51,20 +68,19 @@ def generate_rsa_keys():
 
 
 def load_rsa_private_key():
-    with open(os.path.join(KEY_DIR, "rsa_private.pem"), "rb") as f:
-        return serialization.load_pem_private_key(
-            f.read(),
-            password=None,
-            backend=default_backend()
-        )
+    return keystore.get(
+        os.path.join(KEY_DIR, "rsa_private.pem"),
+        _parse_private_key,
+        kind="pem_private"
+    )
 
 
 def load_rsa_public_key():
-    with open(os.path.join(KEY_DIR, "rsa_public.pem"), "rb") as f:
-        return serialization.load_pem_public_key(
-            f.read(),
-            backend=default_backend()
-        )
+    return keystore.get(
+        os.path.join(KEY_DIR, "rsa_public.pem"),
+        _parse_public_key,
+        kind="pem_public"
+    )
 
 
 
@@ -106,19 +122,18 @@ def generate_signature_keys():
 
 
 def load_signature_private_key():
-    with open(os.path.join(KEY_DIR, "sign_private.pem"), "rb") as f:
-        return serialization.load_pem_private_key(
-            f.read(),
-            password=None,
-            backend=default_backend()
-        )
+    return keystore.get(
+        os.path.join(KEY_DIR, "sign_private.pem"),
+        _parse_private_key,
+        kind="pem_private"
+    )
 
 
 def load_signature_public_key():
-    with open(os.path.join(KEY_DIR, "sign_public.pem"), "rb") as f:
-        return serialization.load_pem_public_key(
-            f.read(),
-            backend=default_backend()
-        )
+    return keystore.get(
+        os.path.join(KEY_DIR, "sign_public.pem"),
+        _parse_public_key,
+        kind="pem_public"
+    )
     
 
@@ -0,0 +1,125 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.backends import default_backend
+
+
+# ======================================================
+# Process-wide key cache
+# ======================================================
+
+class KeyStore:
+    """
+    Caches key material read from disk (raw PQC keys and parsed
+    `cryptography` key objects).
+
+    An entry is reloaded only when its file changes (mtime / size / inode)
+    or when the store is cleared (role reset).
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: str, parse=None, kind: str = "raw"):
+        """
+        Returns the cached value for `path`, loading it with
+        parse(raw_bytes) when the file is new or has changed.
+
+        `kind` separates different parsed forms of the same file.
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        stamp = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        cache_key = (path, kind)
+
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None and entry[0] == stamp:
+                self.hits += 1
+                return entry[1]
+
+        with open(path, "rb") as f:
+            raw = f.read()
+        value = parse(raw) if parse else raw
+
+        with self._lock:
+            self.misses += 1
+            self._entries[cache_key] = (stamp, value)
+
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+keystore = KeyStore()
+
+
+# ======================================================
+# Parsed peer public keys (bounded LRU)
+# ======================================================
+
+class PeerKeyCache:
+    """
+    LRU cache of loaded peer public keys, keyed by the SHA-256
+    fingerprint of the PEM, so a burst of files to the same peer
+    parses its key only once.
+    """
+
+    def __init__(self, maxsize: int = 64):
+        self.maxsize = maxsize
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def load_pem_public_key(self, public_key_pem):
+        if isinstance(public_key_pem, str):
+            public_key_pem = public_key_pem.encode("utf-8")
+        fingerprint = hashlib.sha256(public_key_pem).digest()
+
+        with self._lock:
+            public_key = self._keys.get(fingerprint)
+            if public_key is not None:
+                self._keys.move_to_end(fingerprint)
+                self.hits += 1
+                return public_key
+
+        public_key = serialization.load_pem_public_key(
+            public_key_pem,
+            backend=default_backend()
+        )
+
+        with self._lock:
+            self.misses += 1
+            self._keys[fingerprint] = public_key
+            self._keys.move_to_end(fingerprint)
+            while len(self._keys) > self.maxsize:
+                self._keys.popitem(last=False)
+
+        return public_key
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._keys),
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+peer_key_cache = PeerKeyCache()
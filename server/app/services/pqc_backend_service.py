@@ -0,0 +1,447 @@
+import os
+import queue
+import shutil
+import struct
+import subprocess
+import tempfile
+import threading
+from contextlib import contextmanager
+from flask import current_app
+from app.services.keystore_service import keystore
+
+try:
+    import oqs
+except ImportError:  # liboqs Python binding not available on this node
+    oqs = None
+
+
+# ======================================================
+# Helpers
+# ======================================================
+
+def _pqc_binary(scheme: str, name: str) -> str:
+    path = os.path.join(
+        current_app.root_path,
+        "services", "PQC", scheme, "bin", name
+    )
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{name} binary not found")
+    return path
+
+
+def _read_binary(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _write_binary(path: str, data: bytes):
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+@contextmanager
+def _binary_workspace(inputs: dict = None, secret_keys: tuple = ()):
+    """
+    Private working directory for one C binary invocation.
+
+    The binaries read and write "pqc_keys/<name>" relative to their cwd,
+    so every call gets its own pqc_keys/ folder holding its inputs and
+    links to the secret keys. Concurrent requests never share a file.
+
+    Yields:
+        (cwd, workspace key folder)
+    """
+    pqc_key_folder = os.path.abspath(current_app.config["PQC_KEY_FOLDER"])
+    scratch_root = os.path.join(pqc_key_folder, "scratch")
+    os.makedirs(scratch_root, exist_ok=True)
+
+    cwd = tempfile.mkdtemp(prefix="ws_", dir=scratch_root)
+    keys = os.path.join(cwd, "pqc_keys")
+    os.makedirs(keys)
+
+    try:
+        for name in secret_keys:
+            os.symlink(os.path.join(pqc_key_folder, name), os.path.join(keys, name))
+        for name, data in (inputs or {}).items():
+            _write_binary(os.path.join(keys, name), data)
+
+        yield cwd, keys
+
+    finally:
+        shutil.rmtree(cwd, ignore_errors=True)
+
+
+# ======================================================
+# 1️⃣ In-process KEM backend (liboqs Python binding)
+# ======================================================
+
+class OqsKemBackend:
+    """
+    Runs Kyber inside the Flask process.
+    Keys, shared secrets and ciphertexts never touch the disk.
+    """
+
+    name = "oqs"
+
+    def __init__(self):
+        if oqs is None:
+            raise RuntimeError("oqs Python binding is not installed")
+        self.algorithm = current_app.config["PQC_KEM_ALGORITHM"]
+
+    def encapsulate(self, public_key: bytes):
+        with oqs.KeyEncapsulation(self.algorithm) as kem:
+            ciphertext, shared_secret = kem.encap_secret(public_key)
+        return shared_secret, ciphertext
+
+    def decapsulate(self, ciphertext: bytes, secret_key: bytes) -> bytes:
+        with oqs.KeyEncapsulation(self.algorithm, secret_key=secret_key) as kem:
+            return kem.decap_secret(ciphertext)
+
+
+# ======================================================
+# 2️⃣ Fallback KEM backend (compiled C binaries)
+# ======================================================
+
+class SubprocessKemBackend:
+    """
+    Spawns kyber_encaps / kyber_decaps for every operation,
+    each inside its own scratch workspace.
+    """
+
+    name = "subprocess"
+
+    def encapsulate(self, public_key: bytes):
+        kyber_encaps_bin = _pqc_binary("kyber", "kyber_encaps")
+
+        with _binary_workspace({"kyber_pk.bin": public_key}) as (cwd, keys):
+            print("Running kyber_encaps binary")
+            subprocess.run([kyber_encaps_bin], cwd=cwd, check=True)
+
+            shared_secret = _read_binary(os.path.join(keys, "shared_secret_sender.bin"))
+            ciphertext = _read_binary(os.path.join(keys, "kyber_ct.bin"))
+
+        return shared_secret, ciphertext
+
+    def decapsulate(self, ciphertext: bytes, secret_key: bytes) -> bytes:
+        kyber_decaps_bin = _pqc_binary("kyber", "kyber_decaps")
+
+        with _binary_workspace(
+            {"kyber_ct.bin": ciphertext},
+            secret_keys=("kyber_sk.bin",)
+        ) as (cwd, keys):
+            subprocess.run([kyber_decaps_bin], cwd=cwd, check=True)
+
+            return _read_binary(os.path.join(keys, "shared_secret_receiver.bin"))
+
+
+# ======================================================
+# 3️⃣ In-process signature backend (liboqs Python binding)
+# ======================================================
+
+class OqsSigBackend:
+    """
+    Keeps the Dilithium signer (with its secret key) resident
+    and signs / verifies in memory.
+    The signer lives in the keystore and is rebuilt only when
+    dilithium_sk.bin changes.
+    """
+
+    name = "oqs"
+
+    def __init__(self):
+        if oqs is None:
+            raise RuntimeError("oqs Python binding is not installed")
+        self.algorithm = current_app.config["PQC_SIG_ALGORITHM"]
+        self._lock = threading.Lock()
+        self._verifier = oqs.Signature(self.algorithm)
+
+    def _new_signer(self, secret_key: bytes):
+        return oqs.Signature(self.algorithm, secret_key=secret_key)
+
+    def _current_signer(self):
+        sk_path = os.path.join(
+            current_app.config["PQC_KEY_FOLDER"],
+            "dilithium_sk.bin"
+        )
+        return keystore.get(sk_path, self._new_signer, kind="oqs_signer")
+
+    def sign(self, message: bytes) -> bytes:
+        signer = self._current_signer()
+        with self._lock:
+            return signer.sign(message)
+
+    def verify(self, message: bytes, signature: bytes, public_key: bytes) -> bool:
+        with self._lock:
+            return self._verifier.verify(message, signature, public_key)
+
+
+# ======================================================
+# 4️⃣ Fallback signature backend (compiled C binaries)
+# ======================================================
+
+class SubprocessSigBackend:
+    """
+    Spawns dilithium_sign / dilithium_verify for every document,
+    each inside its own scratch workspace.
+    """
+
+    name = "subprocess"
+
+    def sign(self, message: bytes) -> bytes:
+        dilithium_sign_bin = _pqc_binary("dilithium", "dilithium_sign")
+
+        with _binary_workspace(
+            {"data_to_sign.bin": message},
+            secret_keys=("dilithium_sk.bin",)
+        ) as (cwd, keys):
+            subprocess.run([dilithium_sign_bin], cwd=cwd, check=True)
+
+            # Read generated signature
+            return _read_binary(os.path.join(keys, "signature.bin"))
+
+    def verify(self, message: bytes, signature: bytes, public_key: bytes) -> bool:
+        dilithium_verify_bin = _pqc_binary("dilithium", "dilithium_verify")
+
+        with _binary_workspace({
+            "data_to_verify.bin": message,
+            "signature.bin": signature,
+            "dilithium_pk.bin": public_key,
+        }) as (cwd, keys):
+            result = subprocess.run(
+                [dilithium_verify_bin],
+                cwd=cwd,
+                capture_output=True
+            )
+
+        # Convention: exit code 0 → valid signature
+        return result.returncode == 0
+
+
+# ======================================================
+# 5️⃣ Persistent helper daemon (services/PQC/daemon)
+# ======================================================
+
+# Same for every Kyber / ML-KEM parameter set
+KEM_SHARED_SECRET_LENGTH = 32
+
+
+def _secret_key_stamp(pqc_key_folder: str):
+    """Identifies the secret key files currently on disk"""
+    stamp = []
+    for name in ("kyber_sk.bin", "dilithium_sk.bin"):
+        try:
+            stat = os.stat(os.path.join(pqc_key_folder, name))
+            stamp.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+class _DaemonWorker:
+    """One pqc_daemon process speaking the framed stdin/stdout protocol"""
+
+    def __init__(self, command):
+        self.process = subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            bufsize=0
+        )
+        self.key_stamp = None
+
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def _read_exact(self, length: int) -> bytes:
+        data = b""
+        while len(data) < length:
+            chunk = self.process.stdout.read(length - len(data))
+            if not chunk:
+                raise BrokenPipeError("pqc_daemon exited")
+            data += chunk
+        return data
+
+    def call(self, op: bytes, payload: bytes = b"") -> bytes:
+        self.process.stdin.write(op + struct.pack(">I", len(payload)) + payload)
+
+        header = self._read_exact(5)
+        status = header[0]
+        body = self._read_exact(struct.unpack(">I", header[1:])[0])
+
+        if status != 0:
+            raise RuntimeError(f"pqc_daemon: {body.decode(errors='replace')}")
+        return body
+
+    def close(self):
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=1)
+        except Exception:
+            self.process.kill()
+
+
+class PqcDaemonPool:
+    """
+    Small pool of pqc_daemon workers.
+    Workers are spawned lazily, reused across requests and
+    told to reload their keys when the key files change.
+    """
+
+    def __init__(self, binary: str, pqc_key_folder: str, size: int):
+        self.pqc_key_folder = os.path.abspath(pqc_key_folder)
+        self.command = [
+            binary,
+            self.pqc_key_folder,
+            current_app.config["PQC_KEM_ALGORITHM"],
+            current_app.config["PQC_SIG_ALGORITHM"],
+        ]
+        self._idle = queue.Queue()
+        for _ in range(size):
+            self._idle.put(None)
+
+    def call(self, op: bytes, payload: bytes = b"") -> bytes:
+        worker = self._idle.get()
+        try:
+            if worker is None or not worker.alive():
+                worker = _DaemonWorker(self.command)
+
+            key_stamp = _secret_key_stamp(self.pqc_key_folder)
+            if worker.key_stamp != key_stamp:
+                worker.call(b"R")
+                worker.key_stamp = key_stamp
+
+            return worker.call(op, payload)
+
+        except OSError:
+            # Broken pipe: drop the worker, a fresh one is spawned next time
+            if worker is not None:
+                worker.close()
+            worker = None
+            raise
+
+        finally:
+            self._idle.put(worker)
+
+
+_daemon_pool = None
+_daemon_pool_lock = threading.Lock()
+
+
+def get_daemon_pool() -> PqcDaemonPool:
+    global _daemon_pool
+    with _daemon_pool_lock:
+        if _daemon_pool is None:
+            _daemon_pool = PqcDaemonPool(
+                _pqc_binary("daemon", "pqc_daemon"),
+                current_app.config["PQC_KEY_FOLDER"],
+                current_app.config["PQC_DAEMON_WORKERS"]
+            )
+    return _daemon_pool
+
+
+class DaemonKemBackend:
+    """Kyber through the pooled pqc_daemon (secret key loaded by the daemon)"""
+
+    name = "daemon"
+
+    def __init__(self):
+        self.pool = get_daemon_pool()
+
+    def encapsulate(self, public_key: bytes):
+        out = self.pool.call(b"E", public_key)
+        ciphertext = out[:-KEM_SHARED_SECRET_LENGTH]
+        shared_secret = out[-KEM_SHARED_SECRET_LENGTH:]
+        return shared_secret, ciphertext
+
+    def decapsulate(self, ciphertext: bytes, secret_key: bytes) -> bytes:
+        return self.pool.call(b"D", ciphertext)
+
+
+class DaemonSigBackend:
+    """Dilithium through the pooled pqc_daemon (secret key loaded by the daemon)"""
+
+    name = "daemon"
+
+    def __init__(self):
+        self.pool = get_daemon_pool()
+
+    def sign(self, message: bytes) -> bytes:
+        return self.pool.call(b"S", message)
+
+    def verify(self, message: bytes, signature: bytes, public_key: bytes) -> bool:
+        payload = public_key + struct.pack(">I", len(signature)) + signature + message
+        return self.pool.call(b"V", payload) == b"\x01"
+
+
+# ======================================================
+# 6️⃣ Backend selection (Config.PQC_*_BACKEND)
+# ======================================================
+
+KEM_BACKENDS = {
+    "oqs": OqsKemBackend,
+    "daemon": DaemonKemBackend,
+    "subprocess": SubprocessKemBackend,
+}
+
+SIG_BACKENDS = {
+    "oqs": OqsSigBackend,
+    "daemon": DaemonSigBackend,
+    "subprocess": SubprocessSigBackend,
+}
+
+_backend_cache = {}
+_backend_cache_lock = threading.Lock()
+
+
+def _auto_backend_name() -> str:
+    """
+    Prefers the in-process backend, then the pooled daemon,
+    then the one-shot C binaries.
+    """
+    if oqs is not None:
+        return "oqs"
+    try:
+        _pqc_binary("daemon", "pqc_daemon")
+        return "daemon"
+    except FileNotFoundError:
+        return "subprocess"
+
+
+def _get_backend(kind: str, registry: dict, config_key: str):
+    name = current_app.config.get(config_key, "auto")
+    if name == "auto":
+        name = _auto_backend_name()
+
+    if name not in registry:
+        raise ValueError(f"Unknown PQC {kind} backend: {name}")
+
+    with _backend_cache_lock:
+        backend = _backend_cache.get((kind, name))
+        if backend is None:
+            backend = registry[name]()
+            _backend_cache[(kind, name)] = backend
+
+    return backend
+
+
+def get_kem_backend():
+    """Returns the configured KEM backend (Config.PQC_KEM_BACKEND)"""
+    return _get_backend("KEM", KEM_BACKENDS, "PQC_KEM_BACKEND")
+
+
+def get_sig_backend():
+    """Returns the configured signature backend (Config.PQC_SIG_BACKEND)"""
+    return _get_backend("signature", SIG_BACKENDS, "PQC_SIG_BACKEND")
+
+
+def reset_backends():
+    """
+    Forgets cached backends and the daemon pool without closing them.
+    Used by forked worker processes, which must not share the
+    parent's daemon pipes.
+    """
+    global _daemon_pool
+    with _backend_cache_lock:
+        _backend_cache.clear()
+    with _daemon_pool_lock:
+        _daemon_pool = None
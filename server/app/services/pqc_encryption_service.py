@@ -1,97 +1,424 @@
 import os
+import struct
+import time
+from contextlib import nullcontext
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from cryptography.exceptions import InvalidTag
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.primitives import padding
 from cryptography.hazmat.backends import default_backend
+from app.services.compression_service import (
+    CODEC_NONE,
+    CODEC_MASK,
+    CompressingReader,
+    DecompressingWriter
+)
+from app.services.archive_service import TarExtractWriter, remove_payload
 
 
 # ======================================================
-# AES-256-CBC encryption (PQC version)
+# Container format
 # ======================================================
+#
+# Version 2 (chunked AES-256-GCM):
+#   header = MAGIC (4) | version (1) | flags (1) | chunk_size (4) | nonce_prefix (8)
+#   chunks = AES-GCM(chunk) || 16-byte tag, one per chunk_size bytes of plaintext
+#   flags  = compression codec (see compression_service); the chunks then
+#            carry the compressed stream
+#            | FLAG_TAR_ARCHIVE: the plaintext is a tar stream of a directory
+#
+# Chunk i uses nonce = nonce_prefix || i and AAD = header || i || final flag,
+# so chunks cannot be reordered, dropped or truncated without failing
+# authentication.
+#
+# Version 1 (legacy): IV (16) || AES-256-CBC ciphertext, no header.
 
-def encrypt_file_with_aes_key(input_path: str, output_dir: str, aes_key: bytes):
+CONTAINER_MAGIC = b"PQDS"
+CONTAINER_VERSION = 2
+HEADER_FORMAT = ">4sBBI8s"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+TAG_SIZE = 16
+DEFAULT_CHUNK_SIZE = 1024 * 1024  # 1 MB
+
+FLAG_TAR_ARCHIVE = 0x02
+KNOWN_FLAGS = CODEC_MASK | FLAG_TAR_ARCHIVE
+
+# Plaintext is written under this suffix and renamed once fully authenticated
+PARTIAL_SUFFIX = ".part"
+
+
+def _chunk_nonce(nonce_prefix: bytes, index: int) -> bytes:
+    return nonce_prefix + struct.pack(">I", index)
+
+
+def _chunk_aad(header: bytes, index: int, final: bool) -> bytes:
+    return header + struct.pack(">Q?", index, final)
+
+
+def read_container_header(f):
     """
-    Encrypts a file using AES-256-CBC.
-    AES key is PROVIDED (derived from Kyber).
-    
+    Reads a version 2 header from an open file.
+
     Returns:
-        encrypted_file_path
+        (header_bytes, flags, chunk_size, nonce_prefix)
+        or None for legacy CBC files (file position is restored)
     """
+    header = f.read(HEADER_SIZE)
+    if len(header) == HEADER_SIZE and header[:4] == CONTAINER_MAGIC:
+        _, version, flags, chunk_size, nonce_prefix = struct.unpack(HEADER_FORMAT, header)
+        if version != CONTAINER_VERSION:
+            raise ValueError(f"Unsupported container version: {version}")
+        return header, flags, chunk_size, nonce_prefix
 
-    os.makedirs(output_dir, exist_ok=True)
+    f.seek(-len(header), os.SEEK_CUR)
+    return None
 
-    # Read plaintext
-    with open(input_path, "rb") as f:
-        plaintext = f.read()
 
-    # Generate IV
-    iv = os.urandom(16)  # 128-bit IV
+# ======================================================
+# Parallel chunk engine
+# ======================================================
+#
+# AES-GCM calls release the GIL, so independent chunks are sealed /
+# opened on a thread pool and written straight to their offsets with
+# pwrite. At most 2 * workers chunks are in flight at any time.
 
-    # Pad plaintext
-    padder = padding.PKCS7(128).padder()
-    padded_data = padder.update(plaintext) + padder.finalize()
+def _use_parallel(workers: int, size: int, chunk_size: int) -> bool:
+    return workers > 1 and size > chunk_size and hasattr(os, "pwrite")
 
-    # Encrypt
-    cipher = Cipher(
-        algorithms.AES(aes_key),
-        modes.CBC(iv),
-        backend=default_backend()
-    )
-    encryptor = cipher.encryptor()
-    ciphertext = encryptor.update(padded_data) + encryptor.finalize()
 
-    # Save encrypted file (IV + ciphertext)
-    encrypted_filename = os.path.basename(input_path) + ".enc"
-    encrypted_path = os.path.join(output_dir, encrypted_filename)
+# Chunks timed in the calling thread (after one warm-up chunk) as the
+# serial baseline the reported speedup is measured against
+SERIAL_SAMPLE_CHUNKS = 4
 
-    with open(encrypted_path, "wb") as f:
-        f.write(iv + ciphertext)
 
-    return encrypted_path
+def _run_chunks_parallel(task, chunk_count: int, workers: int, nbytes: int, label: str,
+                         consume=None):
+    """
+    Runs task(index) -> data for every chunk and reports the speedup
+    over serial processing: the first chunks run one at a time in the
+    calling thread, and their time per chunk, scaled to every chunk,
+    is compared with the actual wall time.
+    chunk_count must be at least 2.
+    consume(data) is called for each chunk in index order.
+    """
+    started = time.perf_counter()
+    in_flight = deque()
+
+    def finish(data):
+        if consume is not None:
+            consume(data)
+
+    def collect(future):
+        finish(future.result())
+
+    # Chunk 0 warms up (first pages, cipher context) and is not timed
+    sample = max(1, min(SERIAL_SAMPLE_CHUNKS, (chunk_count - 1) // 4))
+    finish(task(0))
+    sample_started = time.perf_counter()
+    for index in range(1, 1 + sample):
+        finish(task(index))
+    serial_per_chunk = (time.perf_counter() - sample_started) / sample
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for index in range(1 + sample, chunk_count):
+            in_flight.append(pool.submit(task, index))
+            if len(in_flight) >= 2 * workers:
+                collect(in_flight.popleft())
+        while in_flight:
+            collect(in_flight.popleft())
+
+    elapsed = time.perf_counter() - started
+    speedup = serial_per_chunk * chunk_count / elapsed if elapsed > 0 else 1.0
+    throughput = nbytes / elapsed / (1024 * 1024) if elapsed > 0 else 0.0
+
+    print(
+        f"{label}: {chunk_count} chunks on {workers} workers, "
+        f"{throughput:.1f} MB/s, {speedup:.1f}x speedup over serial"
+    )
+    return speedup
 
 
 # ======================================================
-# AES-256-CBC decryption (PQC version)
+# Chunked AES-256-GCM encryption (PQC version)
 # ======================================================
 
-def decrypt_file_with_aes_key(
-    encrypted_path: str,
+def _encrypt_serial(src, dst, aead, header: bytes, chunk_size: int, nonce_prefix: bytes,
+                    hasher=None):
+    dst.write(header)
+    if hasher is not None:
+        hasher.update(header)
+
+    # Read one chunk ahead so the last chunk can be flagged as final
+    index = 0
+    chunk = src.read(chunk_size)
+    while True:
+        next_chunk = src.read(chunk_size)
+        final = not next_chunk
+
+        sealed = aead.encrypt(
+            _chunk_nonce(nonce_prefix, index),
+            chunk,
+            _chunk_aad(header, index, final)
+        )
+        dst.write(sealed)
+        if hasher is not None:
+            hasher.update(sealed)
+
+        if final:
+            break
+        chunk = next_chunk
+        index += 1
+
+
+def _encrypt_parallel(src, dst, aead, header: bytes, chunk_size: int, nonce_prefix: bytes,
+                      plaintext_size: int, workers: int, hasher=None):
+    chunk_count = max(1, -(-plaintext_size // chunk_size))
+    sealed_size = chunk_size + TAG_SIZE
+    src_fd, dst_fd = src.fileno(), dst.fileno()
+
+    os.pwrite(dst_fd, header, 0)
+    if hasher is not None:
+        hasher.update(header)
+
+    def seal_chunk(index):
+        chunk = os.pread(src_fd, chunk_size, index * chunk_size)
+        sealed = aead.encrypt(
+            _chunk_nonce(nonce_prefix, index),
+            chunk,
+            _chunk_aad(header, index, index == chunk_count - 1)
+        )
+        os.pwrite(dst_fd, sealed, HEADER_SIZE + index * sealed_size)
+        return sealed
+
+    _run_chunks_parallel(
+        seal_chunk, chunk_count, workers, plaintext_size, "Parallel encrypt",
+        consume=hasher.update if hasher is not None else None
+    )
+
+
+def encrypt_file_with_aes_key(
+    input_path: str,
     output_dir: str,
     aes_key: bytes,
-    original_filename: str
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    workers: int = 1,
+    hasher=None,
+    codec: int = CODEC_NONE,
+    compression_level: int = 6,
+    source=None,
+    archive: bool = False
 ):
     """
-    Decrypts AES-256-CBC encrypted file using PROVIDED AES key.
-    
+    Encrypts a file using chunked AES-256-GCM with constant memory.
+    AES key is PROVIDED (derived from Kyber).
+
+    workers > 1 seals chunks on a thread pool and writes them
+    in place at their computed offsets.
+    hasher (optional) is updated with every byte of the .enc file,
+    in order, as it is produced.
+    codec compresses the plaintext stream before sealing (serial
+    sealing only: compression, not AES, is the bottleneck then).
+    source (optional) is a readable stream encrypted instead of the
+    file at input_path, which then only names the .enc file; it is
+    sealed serially. archive marks the plaintext as a tar stream.
+
     Returns:
-        decrypted_file_path
+        encrypted_file_path
     """
 
     os.makedirs(output_dir, exist_ok=True)
 
-    # Read encrypted file
-    with open(encrypted_path, "rb") as f:
-        data = f.read()
+    nonce_prefix = os.urandom(8)
+    flags = codec | (FLAG_TAR_ARCHIVE if archive else 0)
+    header = struct.pack(
+        HEADER_FORMAT,
+        CONTAINER_MAGIC, CONTAINER_VERSION, flags, chunk_size, nonce_prefix
+    )
+    aead = AESGCM(aes_key)
+
+    encrypted_filename = os.path.basename(input_path) + ".enc"
+    encrypted_path = os.path.join(output_dir, encrypted_filename)
+
+    plaintext_size = os.path.getsize(input_path) if source is None else None
+
+    with (open(input_path, "rb") if source is None else nullcontext(source)) as src, \
+            open(encrypted_path, "wb") as dst:
+        if codec != CODEC_NONE:
+            reader = CompressingReader(src, compression_level)
+            _encrypt_serial(reader, dst, aead, header, chunk_size, nonce_prefix, hasher)
+            ratio = reader.bytes_in / reader.bytes_out if reader.bytes_out else 1.0
+            print(f"Compressed {reader.bytes_in} -> {reader.bytes_out} bytes ({ratio:.1f}x)")
+        elif source is None and _use_parallel(workers, plaintext_size, chunk_size):
+            _encrypt_parallel(
+                src, dst, aead, header, chunk_size, nonce_prefix,
+                plaintext_size, workers, hasher
+            )
+        else:
+            _encrypt_serial(src, dst, aead, header, chunk_size, nonce_prefix, hasher)
+
+    return encrypted_path
+
+
+# ======================================================
+# Decryption (chunked GCM, or legacy AES-256-CBC)
+# ======================================================
 
-    iv = data[:16]
-    ciphertext = data[16:]
+def _decrypt_chunked(src, dst, aes_key: bytes, header: bytes, chunk_size: int, nonce_prefix: bytes):
+    aead = AESGCM(aes_key)
+    sealed_size = chunk_size + TAG_SIZE
+
+    index = 0
+    sealed = src.read(sealed_size)
+    while True:
+        next_sealed = src.read(sealed_size)
+        final = not next_sealed
+
+        try:
+            dst.write(aead.decrypt(
+                _chunk_nonce(nonce_prefix, index),
+                sealed,
+                _chunk_aad(header, index, final)
+            ))
+        except InvalidTag:
+            raise ValueError(f"Encrypted file failed authentication at chunk {index}")
+
+        if final:
+            break
+        sealed = next_sealed
+        index += 1
+
+
+def _decrypt_parallel(src, dst, aes_key: bytes, header: bytes, chunk_size: int, nonce_prefix: bytes,
+                      workers: int, writer=None):
+    """writer (e.g. a DecompressingWriter) receives chunks in order instead of pwrite"""
+    aead = AESGCM(aes_key)
+    sealed_size = chunk_size + TAG_SIZE
+    body_size = os.fstat(src.fileno()).st_size - HEADER_SIZE
+    chunk_count = max(1, -(-body_size // sealed_size))
+    src_fd = src.fileno()
+    dst_fd = dst.fileno() if writer is None else None
+
+    def open_chunk(index):
+        sealed = os.pread(src_fd, sealed_size, HEADER_SIZE + index * sealed_size)
+        try:
+            chunk = aead.decrypt(
+                _chunk_nonce(nonce_prefix, index),
+                sealed,
+                _chunk_aad(header, index, index == chunk_count - 1)
+            )
+        except InvalidTag:
+            raise ValueError(f"Encrypted file failed authentication at chunk {index}")
+        if writer is not None:
+            return chunk
+        os.pwrite(dst_fd, chunk, index * chunk_size)
+        return None
+
+    _run_chunks_parallel(
+        open_chunk, chunk_count, workers, body_size, "Parallel decrypt",
+        consume=writer.write if writer is not None else None
+    )
+
+
+def _decrypt_legacy_cbc(src, dst, aes_key: bytes, chunk_size: int):
+    iv = src.read(16)
 
-    # Decrypt
     cipher = Cipher(
         algorithms.AES(aes_key),
         modes.CBC(iv),
         backend=default_backend()
     )
     decryptor = cipher.decryptor()
-    padded_plaintext = decryptor.update(ciphertext) + decryptor.finalize()
-
-    # Unpad
     unpadder = padding.PKCS7(128).unpadder()
-    plaintext = unpadder.update(padded_plaintext) + unpadder.finalize()
 
-    # Save decrypted file
+    while True:
+        chunk = src.read(chunk_size)
+        if not chunk:
+            break
+        dst.write(unpadder.update(decryptor.update(chunk)))
+
+    dst.write(unpadder.update(decryptor.finalize()) + unpadder.finalize())
+
+
+def _decrypt_container(src, dst, aes_key: bytes, container: tuple, workers: int, stream_out: bool = False):
+    """
+    Decrypts the chunks of a v2 container into dst.
+    stream_out: dst only accepts in-order writes (no file descriptor).
+    """
+    header, flags, chunk_size, nonce_prefix = container
+    if flags & ~KNOWN_FLAGS:
+        raise ValueError(f"Unsupported container flags: {flags:#04x}")
+    body_size = os.fstat(src.fileno()).st_size - HEADER_SIZE
+
+    if flags & CODEC_MASK:
+        writer = DecompressingWriter(dst)
+    else:
+        writer = dst if stream_out else None
+
+    if _use_parallel(workers, body_size, chunk_size + TAG_SIZE):
+        _decrypt_parallel(
+            src, dst, aes_key, header, chunk_size, nonce_prefix, workers, writer
+        )
+    else:
+        _decrypt_chunked(
+            src, writer or dst, aes_key, header, chunk_size, nonce_prefix
+        )
+
+    if isinstance(writer, DecompressingWriter):
+        writer.finish()
+
+
+def decrypt_file_with_aes_key(
+    encrypted_path: str,
+    output_dir: str,
+    aes_key: bytes,
+    original_filename: str,
+    workers: int = 1
+):
+    """
+    Decrypts a PQC container using PROVIDED AES key, streaming
+    chunk by chunk. Legacy AES-256-CBC files are still accepted.
+    Compressed containers are inflated transparently.
+    Directory archives are unpacked into a directory named
+    original_filename as they are decrypted.
+
+    workers > 1 opens chunks on a thread pool (containers only).
+
+    Returns:
+        decrypted_file_path (a directory for archives)
+    """
+
+    os.makedirs(output_dir, exist_ok=True)
+
     decrypted_path = os.path.join(output_dir, original_filename)
+    partial_path = decrypted_path + PARTIAL_SUFFIX
+
+    try:
+        with open(encrypted_path, "rb") as src:
+            container = read_container_header(src)
+
+            if container is not None and container[1] & FLAG_TAR_ARCHIVE:
+                # No .tar on disk: members land in the partial directory
+                extractor = TarExtractWriter(partial_path)
+                try:
+                    _decrypt_container(src, extractor, aes_key, container, workers, stream_out=True)
+                except Exception:
+                    extractor.abort()
+                    raise
+                extractor.finish()
+                print(f"Unpacked {extractor.files} files from archive")
+            else:
+                with open(partial_path, "wb") as dst:
+                    if container is None:
+                        _decrypt_legacy_cbc(src, dst, aes_key, DEFAULT_CHUNK_SIZE)
+                    else:
+                        _decrypt_container(src, dst, aes_key, container, workers)
 
-    with open(decrypted_path, "wb") as f:
-        f.write(plaintext)
+    except Exception:
+        # Never leave unauthenticated plaintext behind
+        remove_payload(partial_path)
+        raise
 
-    return decrypted_path
\ No newline at end of file
+    os.replace(partial_path, decrypted_path)
+    return decrypted_path
@@ -1,11 +1,14 @@
 import os
 import shutil
-import subprocess
 from flask import current_app
+from app.extensions import app_state
+from app.services.pqc_backend_service import get_kem_backend
+from app.services.keystore_service import keystore
 
 
 # ======================================================
 # 1️⃣ Load existing keys (already generated in C)
+#    Served from the keystore; re-read only when the file changes
 # ======================================================
 
 def load_kyber_public_key() -> bytes:
@@ -13,8 +16,7 @@ def load_kyber_public_key() -> bytes:
         current_app.config["PQC_KEY_FOLDER"],
         "kyber_pk.bin"
     )
-    with open(path, "rb") as f:
-        return f.read()
+    return keystore.get(path)
 
 
 def load_kyber_private_key() -> bytes:
@@ -22,8 +24,7 @@ def load_kyber_private_key() -> bytes:
         current_app.config["PQC_KEY_FOLDER"],
         "kyber_sk.bin"
     )
-    with open(path, "rb") as f:
-        return f.read()
+    return keystore.get(path)
 
 
 def load_dilithium_public_key() -> bytes:
@@ -31,8 +32,7 @@ def load_dilithium_public_key() -> bytes:
         current_app.config["PQC_KEY_FOLDER"],
         "dilithium_pk.bin"
     )
-    with open(path, "rb") as f:
-        return f.read()
+    return keystore.get(path)
 
 
 def load_dilithium_private_key() -> bytes:
@@ -40,8 +40,7 @@ def load_dilithium_private_key() -> bytes:
         current_app.config["PQC_KEY_FOLDER"],
         "dilithium_sk.bin"
     )
-    with open(path, "rb") as f:
-        return f.read()
+    return keystore.get(path)
 
 
 # ======================================================
@@ -74,39 +73,27 @@ def store_sender_dilithium_public_key(file_path: str):
 # 3️⃣ Sender side: Kyber encapsulation
 # ======================================================
 
-def sender_generate_shared_secret_and_ciphertext():
+def sender_generate_shared_secret_and_ciphertext(receiver_public_key: bytes = None):
     """
     Uses receiver's Kyber public key to generate:
     - shared secret
     - Kyber ciphertext
-    """
-    
-    kyber_encaps_bin = os.path.join(
-        current_app.root_path,
-        "services", "PQC", "kyber", "bin", "kyber_encaps"
-    )
-    
-    if not os.path.exists(kyber_encaps_bin):
-        raise FileNotFoundError("kyber_encaps binary not found")
-    print("Running kyber_encaps binary")
-    subprocess.run([kyber_encaps_bin], check=True)
-    
-    shared_secret_path = os.path.join(
-        current_app.config["PQC_KEY_FOLDER"],
-        "shared_secret_sender.bin"
-    )
-    print("Shared secret and Kyber ciphertext generated")
 
-    ciphertext_path = os.path.join(
-        current_app.config["PQC_KEY_FOLDER"],
-        "kyber_ct.bin"
-    )
+    Key: receiver_public_key, else the one received in the handshake
+    ACK (app_state.peer_kyber_public_key), else the local kyber_pk.bin.
+    The kyber_encaps binary always read kyber_pk.bin, so a sender that
+    has completed a handshake now encapsulates to the peer's key.
+    """
 
-    with open(shared_secret_path, "rb") as f:
-        shared_secret = f.read()
+    if receiver_public_key is None:
+        receiver_public_key = (
+            getattr(app_state, "peer_kyber_public_key", None)
+            or load_kyber_public_key()
+        )
 
-    with open(ciphertext_path, "rb") as f:
-        ciphertext = f.read()
+    backend = get_kem_backend()
+    shared_secret, ciphertext = backend.encapsulate(receiver_public_key)
+    print(f"Shared secret and Kyber ciphertext generated ({backend.name})")
 
     return shared_secret, ciphertext
 
@@ -115,27 +102,12 @@ def sender_generate_shared_secret_and_ciphertext():
 # 4️⃣ Receiver side: Kyber decapsulation
 # ======================================================
 
-def receiver_derive_shared_secret_from_ciphertext():
+def receiver_derive_shared_secret_from_ciphertext(kyber_ct: bytes):
     """
     Uses:
     - receiver Kyber private key
     - received Kyber ciphertext
     """
 
-    kyber_decaps_bin = os.path.join(
-        current_app.root_path,
-        "services", "PQC", "kyber", "bin", "kyber_decaps"
-    )
-
-    if not os.path.exists(kyber_decaps_bin):
-        raise FileNotFoundError("kyber_decaps binary not found")
-
-    subprocess.run([kyber_decaps_bin], check=True)
-
-    shared_secret_path = os.path.join(
-        current_app.config["PQC_KEY_FOLDER"],
-        "shared_secret_receiver.bin"
-    )
-
-    with open(shared_secret_path, "rb") as f:
-        return f.read()
\ No newline at end of file
+    backend = get_kem_backend()
+    return backend.decapsulate(kyber_ct, load_kyber_private_key())
@@ -0,0 +1,188 @@
+import os
+import pickle
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from flask import Flask, current_app
+from app.extensions import app_state
+
+from app.services.pqc_workflow_service import (
+    pqc_encrypt_file_workflow,
+    pqc_decrypt_file_workflow
+)
+from app.services.pqc_session_service import sender_session_file_secret
+
+
+# ======================================================
+# Workflow execution: in-process or worker processes
+# ======================================================
+#
+# PQC_EXECUTION_MODE = "thread" runs the workflows in the calling
+# thread. "process" hands them to a pool of PQC_PROCESS_WORKERS
+# processes so hashing / sealing / signing of different files no
+# longer share one GIL. Only paths and small metadata (Kyber ct,
+# signature, digest, manifest, peer public keys) cross the process
+# boundary; the payload never leaves the disk. Kyber sessions
+# (PQC_KEM_SESSION) stay in this process: the per-file session secret
+# is taken here and handed to the worker with the task.
+
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+
+def _worker_config(config) -> dict:
+    """Picklable subset of the app config handed to worker processes"""
+    values = {}
+    for key, value in config.items():
+        if not key.isupper():
+            continue
+        try:
+            pickle.dumps(value)
+        except Exception:
+            continue
+        values[key] = value
+    return values
+
+
+def _init_worker(config: dict):
+    """
+    Runs once in each worker process: builds a bare app context
+    (no blueprints, no inbox) and loads the key material up front.
+    """
+    from app.services.keystore_service import keystore
+    from app.services.pqc_backend_service import (
+        reset_backends,
+        get_kem_backend,
+        get_sig_backend
+    )
+    from app.services.pqc_key_service import (
+        load_kyber_public_key,
+        load_kyber_private_key,
+        load_dilithium_public_key
+    )
+
+    app = Flask("pqc_worker")
+    app.config.update(config)
+    app.app_context().push()
+
+    # Start from empty caches, whatever the start method
+    reset_backends()
+    keystore.clear()
+
+    for loader in (load_kyber_public_key, load_kyber_private_key, load_dilithium_public_key):
+        try:
+            loader()
+        except FileNotFoundError:
+            pass
+
+    try:
+        get_kem_backend()
+        signer = get_sig_backend()
+        # Keep the oqs signer (parsed secret key) resident from the start
+        if hasattr(signer, "_current_signer"):
+            signer._current_signer()
+    except (FileNotFoundError, RuntimeError) as e:
+        print(f"PQC worker {os.getpid()}: backend not ready yet ({e})")
+
+    print(f"PQC worker {os.getpid()} ready")
+
+
+def _set_peer_keys(peer_keys: dict):
+    """Each worker runs one task at a time, so app_state is safe to set"""
+    app_state.peer_kyber_public_key = peer_keys.get("kyber")
+    app_state.peer_dilithium_public_key = peer_keys.get("dilithium")
+
+
+def _encrypt_task(peer_keys: dict, input_path: str, sign: bool, session_key: tuple) -> dict:
+    _set_peer_keys(peer_keys)
+    return pqc_encrypt_file_workflow(input_path, sign=sign, session_key=session_key)
+
+
+def _decrypt_task(peer_keys: dict, kwargs: dict) -> str:
+    _set_peer_keys(peer_keys)
+    return pqc_decrypt_file_workflow(**kwargs)
+
+
+def _peer_keys() -> dict:
+    return {
+        "kyber": getattr(app_state, "peer_kyber_public_key", None),
+        "dilithium": getattr(app_state, "peer_dilithium_public_key", None)
+    }
+
+
+def get_process_pool(app) -> ProcessPoolExecutor:
+    """
+    Process-wide pool of PQC workers, sized from PQC_PROCESS_WORKERS.
+    Workers are spawned, never forked: the pool may be (re)built while
+    job, inbox and discovery threads hold locks a fork would copy.
+    A spawned worker re-imports the entry script; create_app starts
+    no background services in a worker process.
+    """
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(
+                max_workers=app.config["PQC_PROCESS_WORKERS"],
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(_worker_config(app.config),)
+            )
+        return _process_pool
+
+
+def start_process_pool(app):
+    """
+    Starts the workers at app start-up (process mode only), so they
+    load their keys ahead of the first file.
+    """
+    if app.config["PQC_EXECUTION_MODE"] != "process":
+        return
+    pool = get_process_pool(app)
+    for _ in range(app.config["PQC_PROCESS_WORKERS"]):
+        pool.submit(os.getpid)
+
+
+def _run_in_pool(task, *args):
+    global _process_pool
+    pool = get_process_pool(current_app._get_current_object())
+    try:
+        return pool.submit(task, *args).result()
+    except BrokenProcessPool:
+        # A worker died (e.g. killed); start a fresh pool next time
+        with _process_pool_lock:
+            if _process_pool is pool:
+                _process_pool = None
+        raise RuntimeError("PQC worker process exited unexpectedly")
+
+
+# ======================================================
+# Entry points used by the routes
+# ======================================================
+
+def run_encrypt_workflow(input_path: str, progress=None, sign: bool = True) -> dict:
+    """
+    pqc_encrypt_file_workflow in the configured execution mode.
+    In process mode only the first stage is reported through
+    progress; the rest complete together when the worker returns.
+    """
+    if current_app.config["PQC_EXECUTION_MODE"] != "process":
+        return pqc_encrypt_file_workflow(input_path, progress=progress, sign=sign)
+
+    if progress is not None:
+        progress("kem")
+    session_key = None
+    if current_app.config["PQC_KEM_SESSION"]:
+        session_key = sender_session_file_secret(os.path.getsize(input_path))
+    return _run_in_pool(_encrypt_task, _peer_keys(), input_path, sign, session_key)
+
+
+def run_decrypt_workflow(**kwargs) -> str:
+    """
+    pqc_decrypt_file_workflow in the configured execution mode
+    (same keyword arguments). Returns the decrypted file path.
+    """
+    if current_app.config["PQC_EXECUTION_MODE"] != "process":
+        return pqc_decrypt_file_workflow(**kwargs)
+
+    return _run_in_pool(_decrypt_task, _peer_keys(), kwargs)
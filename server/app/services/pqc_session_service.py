@@ -0,0 +1,203 @@
+import re
+import time
+import uuid
+import hashlib
+import threading
+from collections import OrderedDict
+from flask import current_app
+from app.extensions import app_state
+
+from app.services.pqc_key_service import (
+    load_kyber_public_key,
+    load_kyber_private_key,
+    sender_generate_shared_secret_and_ciphertext,
+    receiver_derive_shared_secret_from_ciphertext
+)
+
+
+# ======================================================
+# Session-level Kyber key agreement (Config.PQC_KEM_SESSION)
+# ======================================================
+#
+# The sender encapsulates once per session (at handshake time, then
+# on every rekey) and derives each file's AES key with HKDF from the
+# session secret, a random file id and the session's file counter.
+# Every file still carries the session's Kyber ciphertext, so the
+# receiver decapsulates it once, caches the secret, and can recover
+# it after a restart without any extra message.
+
+KEY_CONTEXT_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+class KemSession:
+    """One sender-side session with a receiver Kyber public key"""
+
+    def __init__(self, public_key: bytes):
+        self.id = uuid.uuid4().hex
+        self.public_key = public_key
+        self.secret, self.ciphertext = sender_generate_shared_secret_and_ciphertext(public_key)
+        self.files = 0
+        self.bytes = 0
+        self.created_at = time.time()
+
+
+class SenderSessions:
+    """Current session per receiver public key, rotated by file / byte count"""
+
+    def __init__(self):
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self.rekeys = 0
+
+    def establish(self, public_key: bytes) -> KemSession:
+        """Returns the session for public_key, encapsulating if there is none"""
+        with self._lock:
+            return self._current(public_key)
+
+    def _current(self, public_key: bytes) -> KemSession:
+        fingerprint = hashlib.sha256(public_key).digest()
+        session = self._sessions.get(fingerprint)
+        if session is None:
+            session = KemSession(public_key)
+            self._sessions[fingerprint] = session
+            print(f"KEM session {session.id} established")
+        return session
+
+    def next_file(self, public_key: bytes, nbytes: int, max_files: int, max_bytes: int):
+        """
+        Reserves the next (session, counter) for a file of nbytes,
+        rekeying first once the session reached max_files or max_bytes.
+        """
+        with self._lock:
+            session = self._current(public_key)
+            if session.files >= max_files or session.bytes >= max_bytes:
+                print(
+                    f"KEM session {session.id} rekeyed after "
+                    f"{session.files} files / {session.bytes} bytes"
+                )
+                del self._sessions[hashlib.sha256(public_key).digest()]
+                self.rekeys += 1
+                session = self._current(public_key)
+
+            counter = session.files
+            session.files += 1
+            session.bytes += nbytes
+            return session, counter
+
+    def reset(self):
+        with self._lock:
+            self._sessions.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "sessions": [
+                    {"session_id": s.id, "files": s.files, "bytes": s.bytes}
+                    for s in self._sessions.values()
+                ],
+                "rekeys": self.rekeys
+            }
+
+
+class ReceiverSessionCache:
+    """
+    Bounded LRU of decapsulated session secrets, keyed by the Kyber
+    ciphertext together with the secret key it was opened with.
+    """
+
+    def __init__(self, maxsize: int = 64):
+        self.maxsize = maxsize
+        self._secrets = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def shared_secret(self, kyber_ct: bytes, secret_key: bytes, decapsulate) -> bytes:
+        cache_key = hashlib.sha256(secret_key + kyber_ct).digest()
+
+        with self._lock:
+            secret = self._secrets.get(cache_key)
+            if secret is not None:
+                self._secrets.move_to_end(cache_key)
+                self.hits += 1
+                return secret
+
+        secret = decapsulate()
+
+        with self._lock:
+            self.misses += 1
+            self._secrets[cache_key] = secret
+            self._secrets.move_to_end(cache_key)
+            while len(self._secrets) > self.maxsize:
+                self._secrets.popitem(last=False)
+
+        return secret
+
+    def clear(self):
+        with self._lock:
+            self._secrets.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._secrets),
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+sender_sessions = SenderSessions()
+receiver_sessions = ReceiverSessionCache()
+
+
+# ======================================================
+# Workflow helpers
+# ======================================================
+
+def sender_session_file_secret(nbytes: int):
+    """
+    Session secret, session Kyber ciphertext and key context for the
+    next file of nbytes sent to the current peer.
+
+    Returns:
+        (session_secret, kyber_ct, {session_id, file_id, counter})
+    """
+    public_key = (
+        getattr(app_state, "peer_kyber_public_key", None)
+        or load_kyber_public_key()
+    )
+    config = current_app.config
+    session, counter = sender_sessions.next_file(
+        public_key,
+        nbytes,
+        config["PQC_SESSION_MAX_FILES"],
+        config["PQC_SESSION_MAX_BYTES"]
+    )
+
+    return session.secret, session.ciphertext, {
+        "session_id": session.id,
+        "file_id": uuid.uuid4().hex,
+        "counter": counter
+    }
+
+
+def receiver_session_secret(kyber_ct: bytes) -> bytes:
+    """Session secret for kyber_ct, decapsulated once and then cached"""
+    return receiver_sessions.shared_secret(
+        kyber_ct,
+        load_kyber_private_key(),
+        lambda: receiver_derive_shared_secret_from_ciphertext(kyber_ct)
+    )
+
+
+def validate_key_context(key_context) -> dict:
+    """Raises ValueError unless key_context is {session_id, file_id, counter}"""
+    if not isinstance(key_context, dict):
+        raise ValueError("key_context must be an object")
+    for key in ("session_id", "file_id"):
+        if not KEY_CONTEXT_ID_PATTERN.match(str(key_context.get(key, ""))):
+            raise ValueError(f"key_context.{key} must be 32 hex characters")
+    counter = key_context.get("counter")
+    if not isinstance(counter, int) or isinstance(counter, bool) or counter < 0:
+        raise ValueError("key_context.counter must be a non-negative integer")
+    return key_context
@@ -1,3 +1,4 @@
+import os
 from flask import current_app
 
 # Key / KEM
@@ -5,11 +6,20 @@ from app.services.pqc_key_service import (
     sender_generate_shared_secret_and_ciphertext,
     receiver_derive_shared_secret_from_ciphertext
 )
+from app.services.pqc_session_service import (
+    sender_session_file_secret,
+    receiver_session_secret
+)
 
 # Crypto
 from app.services.crypto_service import (
     derive_aes_key_from_shared_secret,
-    compute_hash_from_encrypted_file_and_kyber_ct
+    derive_file_key_from_session_secret,
+    compute_hash_from_encrypted_file_and_kyber_ct,
+    new_file_hasher,
+    MerkleHasher,
+    manifest_root,
+    verify_file_against_manifest
 )
 
 # AES encryption
@@ -18,6 +28,12 @@ from app.services.pqc_encryption_service import (
     decrypt_file_with_aes_key
 )
 
+# Batch manifests
+from app.services.batch_service import build_batch_manifest, batch_manifest_digest, check_batch_entry
+
+# Compression
+from app.services.compression_service import choose_codec, CODEC_NONE, CODEC_ZLIB
+
 # Signatures
 from app.services.pqc_signature_service import (
     sign_hash_with_dilithium,
@@ -29,49 +45,148 @@ from app.services.pqc_signature_service import (
 # SENDER WORKFLOW (Encrypt + Sign)
 # ======================================================
 
-def pqc_encrypt_file_workflow(input_path: str):
+# Stages reported through the progress callback, in order
+PQC_ENCRYPT_STAGES = ("kem", "encrypt", "hash", "sign")
+
+
+def pqc_encrypt_file_workflow(input_path: str, workers: int = None, manifest: bool = None,
+                              compression: str = None, progress=None, kem_session: bool = None,
+                              sign: bool = True, source=None, session_key: tuple = None):
     """
     PQC-based encryption workflow (Sender side)
 
+    Safe to run concurrently: nothing is shared through PQC_KEY_FOLDER.
+    workers overrides Config.PQC_CRYPTO_WORKERS for this file.
+    manifest overrides Config.PQC_MERKLE_MANIFEST: sign a Merkle root
+    over chunk digests instead of one linear SHA-512.
+    compression overrides Config.PQC_COMPRESSION ("auto" / "always" / "off").
+    progress(stage) is called as each of PQC_ENCRYPT_STAGES starts.
+    kem_session overrides Config.PQC_KEM_SESSION: reuse the current
+    Kyber session and derive a per-file key (returned as key_context).
+    sign=False skips the Dilithium signature (signature is None); the
+    batch workflow signs all file digests at once instead.
+    source: a directory archive stream (TarStreamReader) encrypted
+    instead of the file at input_path, which then only names the .enc
+    file. It cannot be sampled, so compression is on unless "off".
+    session_key: (secret, kyber_ct, key_context) from
+    sender_session_file_secret, already taken by the caller (process
+    mode: the session lives in the parent, not in the worker).
+
     Returns:
         {
             encrypted_file_path,
             kyber_ciphertext,
             file_hash,
-            signature
+            signature,
+            manifest (None unless manifest mode),
+            compressed,
+            key_context (None unless session mode)
         }
     """
     print("Starting PQC encryption workflow")
-    # 1️⃣ Kyber encapsulation (shared secret + ciphertext)
-    shared_secret, kyber_ct = sender_generate_shared_secret_and_ciphertext()
-    print("Shared secret and Kyber ciphertext generated")
-    # 2️⃣ Derive AES key from shared secret
-    aes_key = derive_aes_key_from_shared_secret(shared_secret)
+    if workers is None:
+        workers = current_app.config["PQC_CRYPTO_WORKERS"]
+    if manifest is None:
+        manifest = current_app.config["PQC_MERKLE_MANIFEST"]
+    if compression is None:
+        compression = current_app.config["PQC_COMPRESSION"]
+    if progress is None:
+        progress = lambda stage: None
+    if kem_session is None:
+        kem_session = current_app.config["PQC_KEM_SESSION"]
+
+    # 1️⃣ Kyber encapsulation (shared secret + ciphertext),
+    #    or the current session's secret and ciphertext
+    progress("kem")
+    key_context = None
+    if session_key is not None:
+        shared_secret, kyber_ct, key_context = session_key
+    elif kem_session:
+        shared_secret, kyber_ct, key_context = sender_session_file_secret(
+            os.path.getsize(input_path) if source is None else source.size
+        )
+    else:
+        shared_secret, kyber_ct = sender_generate_shared_secret_and_ciphertext()
+        print("Shared secret and Kyber ciphertext generated")
+
+    # 2️⃣ Derive AES key from shared secret (per-file subkey in session mode)
+    if key_context is not None:
+        aes_key = derive_file_key_from_session_secret(shared_secret, key_context)
+    else:
+        aes_key = derive_aes_key_from_shared_secret(shared_secret)
     
-    # 3️⃣ AES encrypt file
+    # 3️⃣ Compress (unless the input looks incompressible), then
+    #    AES encrypt file (hashing ciphertext as it is written)
+    progress("encrypt")
+    if source is None:
+        codec = choose_codec(input_path, compression)
+    else:
+        codec = CODEC_NONE if compression == "off" else CODEC_ZLIB
+    if manifest:
+        hasher = MerkleHasher(current_app.config["PQC_MERKLE_CHUNK_SIZE"])
+    else:
+        hasher = new_file_hasher()
     encrypted_path = encrypt_file_with_aes_key(
         input_path,
         current_app.config["ENCRYPTED_FOLDER"],
-        aes_key
+        aes_key,
+        current_app.config["PQC_CHUNK_SIZE"],
+        workers,
+        hasher,
+        codec,
+        current_app.config["PQC_COMPRESSION_LEVEL"],
+        source,
+        archive=source is not None
     )
 
-    # 4️⃣ Hash encrypted file + Kyber ciphertext
-    file_hash = compute_hash_from_encrypted_file_and_kyber_ct(
-        encrypted_path,
-        f"{current_app.config['PQC_KEY_FOLDER']}/kyber_ct.bin"
-    )
+    # 4️⃣ Hash encrypted file + Kyber ciphertext (linear digest or Merkle root)
+    progress("hash")
+    file_manifest = None
+    if manifest:
+        file_manifest = hasher.manifest(kyber_ct)
+        file_hash = file_manifest.pop("root")
+    else:
+        hasher.update(kyber_ct)
+        file_hash = hasher.digest()
 
-    # 5️⃣ Sign hash using Dilithium
-    signature = sign_hash_with_dilithium(file_hash)
+    # 5️⃣ Sign hash using Dilithium (batch mode: signed with the manifest)
+    progress("sign")
+    signature = sign_hash_with_dilithium(file_hash) if sign else None
 
     return {
         "encrypted_file_path": encrypted_path,
         "kyber_ciphertext": kyber_ct,
         "file_hash": file_hash,
-        "signature": signature
+        "signature": signature,
+        "manifest": file_manifest,
+        "compressed": codec != CODEC_NONE,
+        "key_context": key_context
     }
 
 
+def pqc_sign_batch(results: list):
+    """
+    One Dilithium signature over a manifest of every file's digest
+    and Kyber ciphertext (results of pqc_encrypt_file_workflow with
+    sign=False, in batch order).
+
+    Returns:
+        (manifest, signature)
+    """
+    manifest = build_batch_manifest([
+        {
+            "name": os.path.basename(result["encrypted_file_path"]),
+            "file_hash": result["file_hash"],
+            "kyber_ciphertext": result["kyber_ciphertext"]
+        }
+        for result in results
+    ])
+    signature = sign_hash_with_dilithium(batch_manifest_digest(manifest))
+    print(f"Batch {manifest['batch_id']} signed ({len(results)} files)")
+
+    return manifest, signature
+
+
 # ======================================================
 # RECEIVER WORKFLOW (Verify + Decrypt)
 # ======================================================
@@ -79,37 +194,72 @@ def pqc_encrypt_file_workflow(input_path: str):
 def pqc_decrypt_file_workflow(
     encrypted_file_path: str,
     signature: bytes,
-    original_filename: str
+    original_filename: str,
+    kyber_ct: bytes,
+    workers: int = None,
+    file_hash: bytes = None,
+    manifest: dict = None,
+    key_context: dict = None,
+    batch_entry: dict = None
 ):
     """
     PQC-based decryption workflow (Receiver side)
 
+    All per-file state (Kyber ciphertext, shared secret, signature)
+    is passed in memory, so several workflows can run concurrently.
+    workers overrides Config.PQC_CRYPTO_WORKERS for this file.
+    file_hash may be passed when the caller already hashed the
+    ciphertext while receiving it.
+    manifest (Merkle mode): the signature covers the manifest root and
+    each chunk is then checked against the manifest in parallel.
+    key_context (session mode): kyber_ct is a session ciphertext,
+    decapsulated once and cached; the AES key is the per-file subkey.
+    batch_entry: this file's entry in a batch manifest whose signature
+    was already verified; the digest is checked against it instead of
+    verifying `signature`.
+
     Returns:
         decrypted_file_path
     """
 
+    if workers is None:
+        workers = current_app.config["PQC_CRYPTO_WORKERS"]
+
     # 1️⃣ Hash encrypted file + Kyber ciphertext
-    file_hash = compute_hash_from_encrypted_file_and_kyber_ct(
-        encrypted_file_path,
-        f"{current_app.config['PQC_KEY_FOLDER']}/kyber_ct.bin"
-    )
+    if manifest is not None:
+        file_hash = manifest_root(manifest, kyber_ct)
+    elif file_hash is None:
+        file_hash = compute_hash_from_encrypted_file_and_kyber_ct(
+            encrypted_file_path,
+            kyber_ct
+        )
 
-    # 2️⃣ Verify Dilithium signature
-    if not verify_dilithium_signature(file_hash, signature):
+    # 2️⃣ Verify Dilithium signature (batch: match the verified manifest)
+    if batch_entry is not None:
+        check_batch_entry(batch_entry, file_hash, kyber_ct)
+    elif not verify_dilithium_signature(file_hash, signature):
         raise Exception("Signature verification failed")
 
-    # 3️⃣ Kyber decapsulation (derive shared secret)
-    shared_secret = receiver_derive_shared_secret_from_ciphertext()
+    # 2️⃣b Check every chunk against the signed manifest
+    if manifest is not None:
+        verify_file_against_manifest(encrypted_file_path, manifest, workers)
 
+    # 3️⃣ Kyber decapsulation (derive shared secret)
     # 4️⃣ Derive AES key from shared secret
-    aes_key = derive_aes_key_from_shared_secret(shared_secret)
+    if key_context is not None:
+        shared_secret = receiver_session_secret(kyber_ct)
+        aes_key = derive_file_key_from_session_secret(shared_secret, key_context)
+    else:
+        shared_secret = receiver_derive_shared_secret_from_ciphertext(kyber_ct)
+        aes_key = derive_aes_key_from_shared_secret(shared_secret)
 
     # 5️⃣ AES decrypt file
     decrypted_path = decrypt_file_with_aes_key(
         encrypted_file_path,
         current_app.config["DECRYPTED_FOLDER"],
         aes_key,
-        original_filename
+        original_filename,
+        workers
     )
 
     return decrypted_path
\ No newline at end of file
@@ -1,7 +1,7 @@
 from cryptography.hazmat.primitives.asymmetric import padding
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives import serialization
+from app.services.keystore_service import peer_key_cache
 
 
 def sign_hash(hash_bytes, private_key):
@@ -23,11 +23,7 @@ def verify_signature(hash_bytes, signature, public_key_pem):
     """
     Verifies RSA signature.
     """
-    if isinstance(public_key_pem, str):
-        public_key_pem = public_key_pem.encode('utf-8')
-    public_key = serialization.load_pem_public_key(
-        public_key_pem, 
-    )
+    public_key = peer_key_cache.load_pem_public_key(public_key_pem)
     try:
         public_key.verify(
             signature,
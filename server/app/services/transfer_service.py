@@ -0,0 +1,297 @@
+import os
+import re
+import json
+import time
+import shutil
+import hashlib
+import threading
+
+from app.services.crypto_service import ChunkLeafChecker
+
+
+# ======================================================
+# Resumable chunked transfers (receiver side)
+# ======================================================
+#
+# A transfer lives in three files under <ENCRYPTED_FOLDER>/transfers:
+#   <id>.enc     encrypted payload; chunks are written in place (pwrite)
+#   <id>.json    metadata: sizes, signature, Kyber ct, manifest, status
+#   <id>.bitmap  one byte per chunk, set once that chunk is stored
+# so a transfer survives dropped connections and receiver restarts.
+# Chunks may arrive in any order and in parallel.
+
+TRANSFER_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+WRITE_BLOCK_SIZE = 1024 * 1024  # 1 MB
+
+STATUS_OPEN = "OPEN"
+STATUS_FINALIZING = "FINALIZING"
+STATUS_COMPLETE = "COMPLETE"
+STATUS_FAILED = "FAILED"
+
+
+class CorruptChunkError(ValueError):
+    """A chunk does not match the signed Merkle manifest: the transfer is bad"""
+
+
+class TransferClosedError(ValueError):
+    """The transfer was finalized, failed or aborted; it takes no more chunks"""
+
+
+class ReceiveTransfer:
+    """One in-progress upload on the receiver"""
+
+    def __init__(self, directory: str, transfer_id: str, meta: dict, bitmap: bytearray):
+        self.id = transfer_id
+        self.meta = meta
+        self.bitmap = bitmap
+        self.lock = threading.Lock()
+        self._writers = 0  # chunk writes in progress; finalize waits for none
+
+        base = os.path.join(directory, transfer_id)
+        self.enc_path = base + ".enc"
+        self.meta_path = base + ".json"
+        self.bitmap_path = base + ".bitmap"
+
+    @property
+    def chunk_size(self) -> int:
+        return self.meta["chunk_size"]
+
+    @property
+    def chunk_count(self) -> int:
+        return max(1, -(-self.meta["file_size"] // self.chunk_size))
+
+    @property
+    def status(self) -> str:
+        return self.meta["status"]
+
+    def chunk_length(self, index: int) -> int:
+        if index == self.chunk_count - 1:
+            return self.meta["file_size"] - index * self.chunk_size
+        return self.chunk_size
+
+    def missing(self) -> list:
+        return [i for i, done in enumerate(self.bitmap) if not done]
+
+    def _save_meta(self):
+        tmp_path = self.meta_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.meta, f)
+        os.replace(tmp_path, self.meta_path)
+
+    def write_chunk(self, index: int, stream, expected_sha256: str = None):
+        """
+        Streams one chunk from `stream` to its offset in the spool file.
+        Raises ValueError on a bad index, wrong length or digest mismatch,
+        CorruptChunkError if it does not match the transfer's manifest,
+        TransferClosedError once the transfer no longer takes chunks.
+        """
+        if not 0 <= index < self.chunk_count:
+            raise ValueError(f"Chunk index out of range: {index}")
+
+        # Registered under the lock, so begin_finalize() never starts
+        # verifying the spool while a (retried) chunk is still written
+        with self.lock:
+            if self.status != STATUS_OPEN:
+                raise TransferClosedError(f"Transfer is {self.status}")
+            self._writers += 1
+        try:
+            self._write_chunk(index, stream, expected_sha256)
+        except FileNotFoundError:
+            # Spool removed meanwhile (failed, aborted or expired)
+            raise TransferClosedError(f"Transfer is {self.status}")
+        finally:
+            with self.lock:
+                self._writers -= 1
+
+    def _write_chunk(self, index: int, stream, expected_sha256: str):
+        length = self.chunk_length(index)
+        offset = index * self.chunk_size
+        digest = hashlib.sha256()
+        written = 0
+
+        # Manifest mode: check each Merkle chunk as it arrives, so a bad
+        # file is rejected at its first corrupt chunk (the root itself is
+        # only trusted once the signature is verified at finalize)
+        checker = None
+        if self.meta.get("manifest") is not None:
+            try:
+                checker = ChunkLeafChecker(self.meta["manifest"], offset, length)
+            except (KeyError, TypeError, ValueError, ArithmeticError):
+                pass  # malformed manifest: rejected when the file is verified
+
+        fd = os.open(self.enc_path, os.O_WRONLY)
+        try:
+            while written < length:
+                block = stream.read(min(WRITE_BLOCK_SIZE, length - written))
+                if not block:
+                    break
+                if checker is not None:
+                    try:
+                        checker.update(block)
+                    except ValueError as e:
+                        raise CorruptChunkError(str(e))
+                os.pwrite(fd, block, offset + written)
+                digest.update(block)
+                written += len(block)
+        finally:
+            os.close(fd)
+
+        if written != length or stream.read(1):
+            raise ValueError(f"Chunk {index} must be exactly {length} bytes")
+        if expected_sha256 and digest.hexdigest() != expected_sha256.lower():
+            raise ValueError(f"Chunk {index} failed its SHA-256 check")
+
+        with self.lock:
+            if self.status != STATUS_OPEN:
+                raise TransferClosedError(f"Transfer is {self.status}")
+            if not self.bitmap[index]:
+                self.bitmap[index] = 1
+                with open(self.bitmap_path, "r+b") as f:
+                    f.seek(index)
+                    f.write(b"\x01")
+
+    def begin_finalize(self) -> bool:
+        """
+        True for exactly one caller once every chunk is stored and no
+        chunk write is in progress (the last writer to leave finalizes)
+        """
+        with self.lock:
+            if self.status != STATUS_OPEN or self._writers or not all(self.bitmap):
+                return False
+            self.meta["status"] = STATUS_FINALIZING
+            self._save_meta()
+            return True
+
+    def finish(self, status: str, **result):
+        """Records the outcome and drops the payload; metadata is kept for replies"""
+        with self.lock:
+            self.meta["status"] = status
+            self.meta.update(result)
+            self._save_meta()
+        for path in (self.enc_path, self.bitmap_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def to_status(self) -> dict:
+        missing = self.missing() if self.status == STATUS_OPEN else []
+        status = {
+            "transfer_id": self.id,
+            "status": self.status,
+            "file_size": self.meta["file_size"],
+            "chunk_size": self.chunk_size,
+            "chunk_count": self.chunk_count,
+            "received_chunks": self.chunk_count - len(missing) if self.status == STATUS_OPEN else self.chunk_count,
+            "missing": missing
+        }
+        for key in ("file_id", "error"):
+            if key in self.meta:
+                status[key] = self.meta[key]
+        return status
+
+
+class TransferRegistry:
+    """Open transfers by id, reloaded from disk after a restart"""
+
+    def __init__(self):
+        self._transfers = {}
+        self._lock = threading.Lock()
+        self._open_lock = threading.Lock()
+
+    def open(self, directory: str, transfer_id: str, meta: dict) -> ReceiveTransfer:
+        """
+        Creates a transfer, or returns the existing one with the same id
+        (a sender resuming). Raises ValueError if the id is taken by a
+        different file.
+        """
+        os.makedirs(directory, exist_ok=True)
+
+        with self._open_lock:
+            return self._open(directory, transfer_id, meta)
+
+    def _open(self, directory: str, transfer_id: str, meta: dict) -> ReceiveTransfer:
+        existing = self.get(directory, transfer_id)
+        if existing is not None:
+            for key in ("file_size", "chunk_size", "signature", "kyber_ciphertext"):
+                if existing.meta.get(key) != meta.get(key):
+                    raise ValueError("Transfer id already used for a different file")
+            return existing
+
+        if shutil.disk_usage(directory).free < meta["file_size"]:
+            raise OSError("Not enough disk space for this transfer")
+
+        meta = dict(meta, status=STATUS_OPEN, created_at=time.time())
+        chunk_count = max(1, -(-meta["file_size"] // meta["chunk_size"]))
+        transfer = ReceiveTransfer(directory, transfer_id, meta, bytearray(chunk_count))
+
+        # Sparse, pre-sized spool file so chunks can land at any offset
+        with open(transfer.enc_path, "wb") as f:
+            f.truncate(meta["file_size"])
+        with open(transfer.bitmap_path, "wb") as f:
+            f.write(bytes(chunk_count))
+        transfer._save_meta()
+
+        with self._lock:
+            self._transfers[transfer_id] = transfer
+        return transfer
+
+    def get(self, directory: str, transfer_id: str):
+        if not TRANSFER_ID_PATTERN.match(transfer_id or ""):
+            return None
+
+        with self._lock:
+            transfer = self._transfers.get(transfer_id)
+            if transfer is not None:
+                return transfer
+
+            meta_path = os.path.join(directory, transfer_id + ".json")
+            if not os.path.exists(meta_path):
+                return None
+
+            with open(meta_path) as f:
+                meta = json.load(f)
+            transfer = ReceiveTransfer(directory, transfer_id, meta, bytearray())
+
+            if meta["status"] in (STATUS_OPEN, STATUS_FINALIZING):
+                if not os.path.exists(transfer.bitmap_path):
+                    return None
+                with open(transfer.bitmap_path, "rb") as f:
+                    transfer.bitmap = bytearray(f.read())
+                # Interrupted mid-finalize: allow it to run again
+                meta["status"] = STATUS_OPEN
+
+            self._transfers[transfer_id] = transfer
+            return transfer
+
+    def discard(self, transfer: ReceiveTransfer):
+        with self._lock:
+            self._transfers.pop(transfer.id, None)
+        for path in (transfer.enc_path, transfer.bitmap_path, transfer.meta_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def expire(self, directory: str, ttl_seconds: float):
+        """Removes transfers untouched for ttl_seconds"""
+        if not os.path.isdir(directory):
+            return
+        cutoff = time.time() - ttl_seconds
+        for name in os.listdir(directory):
+            transfer_id, ext = os.path.splitext(name)
+            if ext != ".json":
+                continue
+            path = os.path.join(directory, name)
+            touched = max(
+                os.path.getmtime(p)
+                for p in (path, os.path.join(directory, transfer_id + ".bitmap"))
+                if os.path.exists(p)
+            )
+            if touched < cutoff:
+                print(f"Expiring stale transfer {transfer_id}")
+                with self._lock:
+                    self._transfers.pop(transfer_id, None)
+                for ext in (".enc", ".bitmap", ".json"):
+                    stale = os.path.join(directory, transfer_id + ext)
+                    if os.path.exists(stale):
+                        os.remove(stale)
+
+
+transfers = TransferRegistry()
@@ -0,0 +1,383 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from flask import current_app
+
+from app.services.batch_service import UNKNOWN_BATCH_ERROR
+
+
+# ======================================================
+# Sender → receiver transport (pooled, streaming)
+# ======================================================
+#
+# One keep-alive Session per receiver origin, so a burst of files
+# reuses the same TCP connections. The multipart body is produced
+# lazily from disk: only one block of the .enc file is in memory.
+
+UPLOAD_BLOCK_SIZE = 1024 * 1024  # 1 MB
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_receiver_session(receiver_api: str) -> requests.Session:
+    """Returns the pooled session for the receiver's scheme://host:port"""
+    parts = urlsplit(receiver_api)
+    origin = f"{parts.scheme}://{parts.netloc}"
+
+    with _sessions_lock:
+        session = _sessions.get(origin)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=current_app.config["TRANSFER_POOL_SIZE"]
+            )
+            session.mount(origin + "/", adapter)
+            _sessions[origin] = session
+
+    return session
+
+
+class MultipartFileStream:
+    """
+    Read-only multipart/form-data body: text fields followed by one
+    file part streamed from disk. Has a known length, so requests
+    sends it with Content-Length instead of buffering it.
+    """
+
+    def __init__(self, fields: dict, file_field: str, filename: str, path: str,
+                 file_content_type: str = "application/octet-stream"):
+        boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={boundary}"
+
+        head = b""
+        for name, value in fields.items():
+            if value is None:
+                continue
+            head += (
+                f"--{boundary}\r\n"
+                f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+            ).encode("utf-8") + str(value).encode("utf-8") + b"\r\n"
+        head += (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="{file_field}"; filename="{filename}"\r\n'
+            f"Content-Type: {file_content_type}\r\n\r\n"
+        ).encode("utf-8")
+
+        self._parts = [head, None, f"\r\n--{boundary}--\r\n".encode("utf-8")]
+        self._path = path
+        self.file_size = os.path.getsize(path)
+        self.len = len(head) + self.file_size + len(self._parts[2])
+        self._file = None
+        self._index = 0
+        self._offset = 0
+
+    def __len__(self):
+        return self.len
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = UPLOAD_BLOCK_SIZE
+
+        while self._index < len(self._parts):
+            if self._index == 1:
+                if self._file is None:
+                    self._file = open(self._path, "rb")
+                data = self._file.read(size)
+                if data:
+                    return data
+                self._file.close()
+            else:
+                part = self._parts[self._index]
+                data = part[self._offset:self._offset + size]
+                self._offset += len(data)
+                if data:
+                    return data
+            self._index += 1
+            self._offset = 0
+
+        return b""
+
+    def close(self):
+        if self._file is not None and not self._file.closed:
+            self._file.close()
+
+
+def transfer_timeout(nbytes: int):
+    """
+    (connect, read) timeout for sending nbytes: the read timeout also
+    covers the receiver verifying / decrypting before it answers, so it
+    grows with the payload at TRANSFER_MIN_RATE bytes per second.
+    """
+    config = current_app.config
+    read_timeout = config["TRANSFER_BASE_TIMEOUT"] + nbytes / config["TRANSFER_MIN_RATE"]
+    return config["TRANSFER_CONNECT_TIMEOUT"], read_timeout
+
+
+def post_file_to_receiver(url: str, fields: dict, file_field: str, filename: str, path: str):
+    """
+    Streams `path` plus `fields` as multipart/form-data to `url`
+    over the receiver's pooled session.
+
+    Returns:
+        (response, transfer_stats)
+    """
+    body = MultipartFileStream(fields, file_field, filename, path)
+    session = get_receiver_session(url)
+
+    started = time.perf_counter()
+    try:
+        response = session.post(
+            url,
+            data=body,
+            headers={"Content-Type": body.content_type},
+            timeout=transfer_timeout(body.len)
+        )
+    finally:
+        body.close()
+    elapsed = time.perf_counter() - started
+
+    throughput = body.len / elapsed / (1024 * 1024) if elapsed > 0 else 0.0
+    print(f"Sent {body.file_size} bytes to {url} in {elapsed:.2f}s ({throughput:.1f} MB/s)")
+
+    return response, {
+        "bytes": body.len,
+        "seconds": round(elapsed, 3),
+        "throughput_mb_s": round(throughput, 2)
+    }
+
+
+# ======================================================
+# Resumable chunked send (see pqc_transfer_routes)
+# ======================================================
+#
+# The transfer id is remembered in <file>.transfer.json, so calling
+# send again after a failure resumes the same receiver-side transfer
+# and only uploads the chunks it is still missing. At most
+# TRANSFER_PARALLEL_CHUNKS chunks are held in memory at once.
+
+TRANSFER_FINAL_STATES = ("COMPLETE", "FAILED")
+
+
+def _transfer_sidecar_path(path: str) -> str:
+    return path + ".transfer.json"
+
+
+def _transfer_id_for(path: str, receiver_api: str) -> str:
+    sidecar = _transfer_sidecar_path(path)
+    if os.path.exists(sidecar):
+        with open(sidecar) as f:
+            saved = json.load(f)
+        if saved.get("receiver_api") == receiver_api:
+            return saved["transfer_id"]
+
+    transfer_id = uuid.uuid4().hex
+    with open(sidecar, "w") as f:
+        json.dump({"receiver_api": receiver_api, "transfer_id": transfer_id}, f)
+    return transfer_id
+
+
+class TransferError(Exception):
+    """Resumable send could not complete (safe to call send again)"""
+
+    def __init__(self, message: str, status_code: int = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _transfer_status(response) -> dict:
+    """Status body of a /pqc/transfer reply; raises TransferError for anything else"""
+    try:
+        status = response.json()
+    except ValueError:
+        status = None
+    if not isinstance(status, dict) or "status" not in status:
+        error = status.get("error") if isinstance(status, dict) else None
+        raise TransferError(error or f"Receiver returned {response.status_code}", response.status_code)
+    return status
+
+
+def send_file_resumable(receiver_api: str, fields: dict, path: str):
+    """
+    Sends `path` to the receiver's /pqc/transfer endpoints in numbered
+    chunks, several in parallel, retrying failed chunks and resuming
+    a previous attempt for the same file.
+
+    fields: signature, kyber_ciphertext, original_filename, manifest
+
+    Returns:
+        (final receiver status, transfer_stats)
+    Raises:
+        TransferError if chunks are still missing after all retries
+    """
+    config = current_app.config
+    session = get_receiver_session(receiver_api)
+    base_url = f"{receiver_api}/pqc/transfer"
+    file_size = os.path.getsize(path)
+    chunk_size = config["TRANSFER_CHUNK_SIZE"]
+    manifest = fields.get("manifest")
+    if isinstance(manifest, dict) and manifest["chunk_size"] <= chunk_size:
+        # Whole Merkle chunks per transfer chunk: the receiver can check
+        # every one of them as it arrives
+        chunk_size -= chunk_size % manifest["chunk_size"]
+    timeout = transfer_timeout(file_size)
+    sent_bytes = 0
+    sent_lock = threading.Lock()
+
+    open_payload = dict(
+        fields,
+        transfer_id=_transfer_id_for(path, receiver_api),
+        file_size=file_size,
+        chunk_size=chunk_size
+    )
+
+    started = time.perf_counter()
+    response = session.post(f"{base_url}/open", json=open_payload, timeout=timeout)
+    if response.status_code == 409:
+        # Receiver has that id for another file (e.g. re-encrypted): start fresh
+        os.remove(_transfer_sidecar_path(path))
+        open_payload["transfer_id"] = _transfer_id_for(path, receiver_api)
+        response = session.post(f"{base_url}/open", json=open_payload, timeout=timeout)
+    status = _transfer_status(response)
+    if response.status_code not in (200, 400):
+        raise TransferError(status.get("error", f"Receiver returned {response.status_code}"))
+
+    transfer_id = status["transfer_id"]
+    chunk_size = status["chunk_size"]
+    resumed_chunks = status["chunk_count"] - len(status["missing"])
+
+    def put_chunk(index):
+        nonlocal sent_bytes
+        with open(path, "rb") as f:
+            f.seek(index * chunk_size)
+            chunk = f.read(chunk_size)
+
+        for attempt in range(config["TRANSFER_CHUNK_RETRIES"]):
+            try:
+                r = session.put(
+                    f"{base_url}/{transfer_id}/chunks/{index}",
+                    data=chunk,
+                    headers={
+                        "Content-Type": "application/octet-stream",
+                        "X-Chunk-Sha256": hashlib.sha256(chunk).hexdigest()
+                    },
+                    timeout=timeout
+                )
+                if r.status_code == 200:
+                    with sent_lock:
+                        sent_bytes += len(chunk)
+                    return r.json()
+                print(f"Chunk {index} rejected ({r.status_code}): {r.text}")
+                if 400 <= r.status_code < 500:
+                    # Same answer on every retry; a FAILED transfer reports its status
+                    try:
+                        body = r.json()
+                    except ValueError:
+                        return None
+                    return body if isinstance(body, dict) else None
+            except requests.exceptions.RequestException as e:
+                print(f"Chunk {index} attempt {attempt + 1} failed: {e}")
+            time.sleep(min(2 ** attempt, 10))
+        return None
+
+    for _ in range(config["TRANSFER_CHUNK_RETRIES"]):
+        if status["status"] in TRANSFER_FINAL_STATES or not status["missing"]:
+            break
+        with ThreadPoolExecutor(max_workers=config["TRANSFER_PARALLEL_CHUNKS"]) as pool:
+            for result in pool.map(put_chunk, status["missing"]):
+                if result and result.get("status") in TRANSFER_FINAL_STATES:
+                    status = result
+        if status["status"] not in TRANSFER_FINAL_STATES:
+            status = _transfer_status(session.get(f"{base_url}/{transfer_id}", timeout=timeout))
+
+    # All chunks stored but the finishing reply was lost, or another
+    # request is still verifying: finalize is idempotent. Verifying
+    # takes at most about as long as the read timeout allows.
+    deadline = time.monotonic() + timeout[1]
+    while status["status"] not in TRANSFER_FINAL_STATES:
+        if status["status"] == "OPEN" and status["missing"]:
+            raise TransferError(
+                f"{len(status['missing'])} chunks still missing for transfer {transfer_id}"
+            )
+        if time.monotonic() > deadline:
+            raise TransferError(f"Receiver still {status['status']} for transfer {transfer_id}")
+        if status["status"] == "FINALIZING":
+            time.sleep(1)
+            status = _transfer_status(session.get(f"{base_url}/{transfer_id}", timeout=timeout))
+        else:
+            status = _transfer_status(
+                session.post(f"{base_url}/{transfer_id}/finalize", timeout=timeout)
+            )
+
+    elapsed = time.perf_counter() - started
+    os.remove(_transfer_sidecar_path(path))
+
+    throughput = sent_bytes / elapsed / (1024 * 1024) if elapsed > 0 else 0.0
+    print(
+        f"Transfer {transfer_id}: {sent_bytes} bytes in {elapsed:.2f}s "
+        f"({throughput:.1f} MB/s), {resumed_chunks} chunks resumed"
+    )
+
+    return status, {
+        "bytes": sent_bytes,
+        "seconds": round(elapsed, 3),
+        "throughput_mb_s": round(throughput, 2),
+        "transfer_id": transfer_id,
+        "chunks": status.get("chunk_count"),
+        "resumed_chunks": resumed_chunks
+    }
+
+
+# ======================================================
+# Batch manifests (see pqc_batch_routes)
+# ======================================================
+
+# (receiver_api, batch_id) -> time the receiver accepted the batch.
+# Entries expire with the receiver's copy (PQC_BATCH_TTL); a receiver
+# that lost the batch earlier (restart) is handled by the caller
+# through forget_batch_on_receiver().
+_opened_batches = {}
+_opened_batches_lock = threading.Lock()
+
+
+def open_batch_on_receiver(receiver_api: str, batch: dict):
+    """
+    Sends a signed batch manifest to the receiver once per receiver,
+    so it verifies the signature a single time for the whole batch.
+    Raises TransferError if the receiver rejects it.
+    """
+    key = (receiver_api, batch["manifest"]["batch_id"])
+    with _opened_batches_lock:
+        opened = _opened_batches.get(key)
+        if opened is not None and time.monotonic() - opened < current_app.config["PQC_BATCH_TTL"]:
+            return
+
+    response = get_receiver_session(receiver_api).post(
+        f"{receiver_api}/pqc/batch/open",
+        json=batch,
+        timeout=transfer_timeout(0)
+    )
+    if response.status_code != 200:
+        raise TransferError(f"Receiver rejected batch ({response.status_code}): {response.text}", response.status_code)
+
+    with _opened_batches_lock:
+        _opened_batches[key] = time.monotonic()
+
+
+def forget_batch_on_receiver(receiver_api: str, batch_id: str):
+    """Makes the next open_batch_on_receiver() send the manifest again"""
+    with _opened_batches_lock:
+        _opened_batches.pop((receiver_api, batch_id), None)
+
+
+def receiver_lost_batch(status_code: int, error: str) -> bool:
+    """True for the receiver's reply to a batch it no longer holds (expired, restarted)"""
+    return status_code == 404 and error == UNKNOWN_BATCH_ERROR
@@ -2,6 +2,7 @@ from app.services.encryption_service import aes_encrypt_file,aes_decrypt_file
 from app.services.kem_service import rsa_encrypt_key, rsa_decrypt_key
 from app.services.signature_service import sign_hash,verify_signature
 from app.utils.helpers import sha256_hash_file
+from cryptography.hazmat.primitives import hashes
 
 
 def encrypt_file_workflow(
@@ -10,14 +11,15 @@ def encrypt_file_workflow(
     rsa_public_key,
     signing_private_key
 ):
-    # 1. AES encrypt file
-    encrypted_path, aes_key = aes_encrypt_file(input_path, output_dir)
+    # 1. AES encrypt file (hashing ciphertext in the same pass)
+    digest = hashes.Hash(hashes.SHA256())
+    encrypted_path, aes_key = aes_encrypt_file(input_path, output_dir, digest)
 
     # 2. RSA encrypt AES key (KEM)
     encrypted_aes_key = rsa_encrypt_key(aes_key, rsa_public_key)
 
-    # 3. Hash encrypted file
-    file_hash = sha256_hash_file(encrypted_path)
+    # 3. Hash of encrypted file
+    file_hash = digest.finalize()
 
     # 4. Sign hash
     signature = sign_hash(file_hash, signing_private_key)
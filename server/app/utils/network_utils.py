@@ -1,7 +1,10 @@
 import socket
 import json
 import time
+import uuid
 import threading
+from collections import OrderedDict
+import requests
 from app.services.pqc_key_service import load_dilithium_public_key
 from app.services.pqc_key_service import load_kyber_public_key
 from app.utils.helpers import bin_to_b64
@@ -11,6 +14,16 @@ from cryptography.hazmat.primitives import serialization
 DISCOVERY_PORT = 9999
 BROADCAST_ADDR = "255.255.255.255"
 
+# Reliable handshake messages: resent with exponential backoff until
+# the peer answers MSG_ACK, then sent over HTTP if UDP stays silent
+MSG_ACK = "MSG_ACK"
+RETRANSMIT_INITIAL = 0.05   # seconds before the first resend
+RETRANSMIT_MAX = 0.4        # longest gap between resends
+UDP_DEADLINE = 1.5          # seconds of UDP attempts before the fallback
+HTTP_FALLBACK_TIMEOUT = 3
+HANDSHAKE_LINGER = 2.0      # seconds a listener keeps acking resends
+SEEN_MESSAGES_MAX = 256
+
 
 def get_local_ip():
     s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -24,12 +37,173 @@ def get_local_ip():
     return ip
 
 
+# ======================================================
+# Reliable delivery (message ids, acks, retransmits, dedup)
+# ======================================================
+
+class SeenMessages:
+    """Recently handled message ids, so a resent message is acked but not re-applied"""
+
+    def __init__(self, limit: int = SEEN_MESSAGES_MAX):
+        self.limit = limit
+        self._ids = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, msg_id) -> bool:
+        with self._lock:
+            return msg_id in self._ids
+
+    def check_and_add(self, msg_id) -> bool:
+        """True if msg_id was seen before (messages without an id never are)"""
+        if not msg_id:
+            return False
+        with self._lock:
+            if msg_id in self._ids:
+                return True
+            self._ids[msg_id] = True
+            if len(self._ids) > self.limit:
+                self._ids.popitem(last=False)
+        return False
+
+
+def handshake_fallback_url(peer_ip: str, api_port) -> str:
+    """Peer's HTTP endpoint for handshake messages when UDP is blocked"""
+    return f"http://{peer_ip}:{api_port}/pqc/handshake/message"
+
+
+def ack_message(sock, message: dict, addr):
+    """Answers MSG_ACK for a message carrying a msg_id (older peers send none)"""
+    if message.get("msg_id"):
+        sock.sendto(
+            json.dumps({"type": MSG_ACK, "ack_id": message["msg_id"]}).encode(),
+            addr
+        )
+
+
+def send_reliable(payload: dict, addr, fallback_url: str = None, deadline: float = UDP_DEADLINE):
+    """
+    Sends payload to addr over UDP with a fresh msg_id, resending with
+    exponential backoff until the peer acks it. If no ack arrives
+    within `deadline` seconds, POSTs it to fallback_url (if given).
+
+    Returns "udp" or "http" (how it was delivered), or None.
+    """
+    payload = dict(payload, msg_id=uuid.uuid4().hex)
+    data = json.dumps(payload).encode()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        started = time.monotonic()
+        end = started + deadline
+        interval = RETRANSMIT_INITIAL
+        next_send = started
+        attempts = 0
+
+        while True:
+            now = time.monotonic()
+            if now >= end:
+                break
+            if now >= next_send:
+                try:
+                    sock.sendto(data, addr)
+                except OSError as e:
+                    print(f"UDP send to {addr} failed: {e}")
+                    break
+                attempts += 1
+                next_send = now + interval
+                interval = min(interval * 2, RETRANSMIT_MAX)
+
+            sock.settimeout(max(min(next_send, end) - now, 0.001))
+            try:
+                reply, _ = sock.recvfrom(4096)
+                reply = json.loads(reply.decode())
+            except socket.timeout:
+                continue
+            except (OSError, ValueError):
+                continue
+
+            if reply.get("type") == MSG_ACK and reply.get("ack_id") == payload["msg_id"]:
+                elapsed = (time.monotonic() - started) * 1000
+                print(f"{payload['type']} acked by {addr[0]} after {attempts} send(s), {elapsed:.0f} ms")
+                return "udp"
+    finally:
+        sock.close()
+
+    if not fallback_url:
+        print(f"{payload['type']} to {addr} not acknowledged over UDP")
+        return None
+
+    print(f"{payload['type']}: no UDP ack from {addr}, falling back to {fallback_url}")
+    try:
+        response = requests.post(fallback_url, json=payload, timeout=HTTP_FALLBACK_TIMEOUT)
+        if response.status_code == 200:
+            return "http"
+        print(f"HTTP fallback rejected ({response.status_code}): {response.text}")
+    except requests.RequestException as e:
+        print(f"HTTP fallback failed: {e}")
+    return None
+
+
 # Shared state for stopping threads
 class BroadcastState:
     def __init__(self):
         self.should_stop = False
         self.handshake_received = False
+        self.ack_received = False
         self.sender_info = {}
+        self.receiver_info = {}
+        # Shared by the UDP listener and the HTTP fallback route
+        self.seen_messages = SeenMessages()
+
+
+def accept_handshake(state, message: dict) -> bool:
+    """Applies a SENDER_HANDSHAKE (once per msg_id) to the receiver state"""
+    if message.get("type") != "SENDER_HANDSHAKE":
+        return False
+    if state.seen_messages.check_and_add(message.get("msg_id")):
+        return True
+
+    state.sender_info = {
+        "ip": message["ip"],
+        "port": message["port"],
+        "name": message["name"],
+        "dilithium_public_key": message["dilithium_public_key"]
+    }
+    state.handshake_received = True
+    state.should_stop = True  # Stop broadcasting
+    return True
+
+
+def accept_acknowledgment(state, message: dict) -> bool:
+    """Applies a RECEIVER_ACK (once per msg_id) to the sender state"""
+    if message.get("type") != "RECEIVER_ACK":
+        return False
+    if state.seen_messages.check_and_add(message.get("msg_id")):
+        return True
+
+    state.receiver_info = {
+        "ip": message["ip"],
+        "port": message["port"],
+        "name": message["name"],
+        "kyber_public_key": message["kyber_public_key"]
+    }
+    state.ack_received = True
+    state.should_stop = True
+    return True
+
+
+def _linger(sock, seconds: float = HANDSHAKE_LINGER):
+    """Keeps acking resends in case our MSG_ACK was lost"""
+    end = time.time() + seconds
+    sock.settimeout(0.2)
+    while time.time() < end:
+        try:
+            data, addr = sock.recvfrom(4096)
+            ack_message(sock, json.loads(data.decode()), addr)
+        except socket.timeout:
+            continue
+        except Exception:
+            continue
 
 
 def broadcast_receiver(ip, port, name, state, interval=3):
@@ -67,29 +241,25 @@ def listen_for_handshake(port, state, timeout=60):
             data, addr = sock.recvfrom(4096)
             message = json.loads(data.decode())
             print("Handshake message received:", message)
-            if message.get("type") == "SENDER_HANDSHAKE":
-                state.sender_info = {
-                    "ip": message["ip"],
-                    "port": message["port"],
-                    "name": message["name"], 
-                    "dilithium_public_key": message["dilithium_public_key"]
-                }
-                state.handshake_received = True
-                state.should_stop = True  # Stop broadcasting
-                break
+            if accept_handshake(state, message):
+                ack_message(sock, message, addr)
 
         except socket.timeout:
             continue  # Keep looping
         except Exception as e:
             print(f"Error receiving handshake: {e}")
             continue
-    
+
+    if state.handshake_received:
+        _linger(sock)
     sock.close()
 
 
-def send_handshake(receiver_ip, receiver_port, sender_ip, sender_port, sender_name):
-    """Sender sends handshake to receiver"""
-    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+def send_handshake(receiver_ip, receiver_port, sender_ip, sender_port, sender_name, fallback_url=None):
+    """
+    Sender sends handshake to receiver (reliably, see send_reliable).
+    Returns "udp" / "http" once acknowledged, else None.
+    """
     # sign_public_key = load_signature_public_key()
     dilithium_pk = load_dilithium_public_key()
     payload = {
@@ -106,16 +276,10 @@ def send_handshake(receiver_ip, receiver_port, sender_ip, sender_port, sender_na
     print("Sending handshake payload:", payload)
 
     try:
-        sock.sendto(
-            json.dumps(payload).encode(),
-            (receiver_ip, receiver_port)
-        )
-        return True
+        return send_reliable(payload, (receiver_ip, int(receiver_port)), fallback_url)
     except Exception as e:
         print(f"Handshake failed: {e}")
-        return False
-    finally:
-        sock.close()
+        return None
 
 
 def listen_for_receiver(timeout=10):
@@ -137,9 +301,11 @@ def listen_for_receiver(timeout=10):
         sock.close()
     return None, None, None
 
-def send_acknowledgment(sender_ip, sender_port, receiver_ip, receiver_port, receiver_name):
-    """Receiver sends acknowledgment back to sender"""
-    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+def send_acknowledgment(sender_ip, sender_port, receiver_ip, receiver_port, receiver_name, fallback_url=None):
+    """
+    Receiver sends acknowledgment back to sender (reliably).
+    Returns "udp" / "http" once acknowledged, else None.
+    """
     # rsa_public_key = load_rsa_public_key()
     kyber_pk = load_kyber_public_key()
     payload = {
@@ -156,16 +322,10 @@ def send_acknowledgment(sender_ip, sender_port, receiver_ip, receiver_port, rece
 
     print("sending",sender_ip, sender_port, "acknowledgment with payload:", payload)
     try:
-        sock.sendto(
-            json.dumps(payload).encode(),
-            (sender_ip, sender_port)
-        )
-        return True
+        return send_reliable(payload, (sender_ip, int(sender_port)), fallback_url)
     except Exception as e:
         print(f"Acknowledgment failed: {e}")
-        return False
-    finally:
-        sock.close()
+        return None
 
 def listen_for_acknowledgment(port, state, timeout=30):
     """Sender listens for receiver's acknowledgment"""
@@ -180,21 +340,15 @@ def listen_for_acknowledgment(port, state, timeout=30):
             data, addr = sock.recvfrom(4096)
             message = json.loads(data.decode())
 
-            if message.get("type") == "RECEIVER_ACK":
-                state.ack_received = True
-                state.receiver_info = {
-                    "ip": message["ip"],
-                    "port": message["port"],
-                    "name": message["name"],
-                    "kyber_public_key": message["kyber_public_key"]
-                }
-                state.should_stop = True
-                break
+            if accept_acknowledgment(state, message):
+                ack_message(sock, message, addr)
 
         except socket.timeout:
             continue
         except Exception as e:
             print(f"Error receiving acknowledgment: {e}")
             continue
-    
+
+    if state.ack_received:
+        _linger(sock)
     sock.close()
\ No newline at end of file